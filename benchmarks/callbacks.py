@@ -0,0 +1,58 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright 2016 Brecht Baeten
+#    This file is part of jsonopt.
+#
+#    jsonopt is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    jsonopt is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with jsonopt.  If not, see <http://www.gnu.org/licenses/>.
+################################################################################
+"""
+Measures the time to compile ocp1 with a growing horizon into the numpy
+callbacks of the scipy backend and the time of one evaluation of each
+callback.
+
+Usage:
+	python callbacks.py
+"""
+
+from __future__ import print_function
+import time
+
+import numpy as np
+
+import jsonopt
+
+from suite import ocp1
+
+
+def timeit(function,x,repeat=10):
+	t0 = time.time()
+	for i in range(repeat):
+		# the callbacks cache the values of the last x
+		function(x+i*1e-9)
+	return (time.time()-t0)/repeat
+
+
+if __name__ == '__main__':
+
+	print('{:>10s} {:>12s} {:>14s} {:>14s} {:>14s} {:>14s}'.format('horizon','compile (s)','objective (s)','gradient (s)','constr. (s)','jacobian (s)'))
+	for horizon in [24,240,2400,24000]:
+		problem = jsonopt.Problem(ocp1(horizon),backend='scipy')
+
+		t0 = time.time()
+		callbacks = jsonopt.callbacks.Callbacks(problem.model)
+		t1 = time.time()
+
+		x = np.random.uniform(0.5,2.,len(callbacks.x0))
+		times = [timeit(f,x) for f in [callbacks.objective,callbacks.gradient,callbacks.constraints,callbacks.jacobian]]
+		print('{:10d} {:12.3f} {:14.6f} {:14.6f} {:14.6f} {:14.6f}'.format(horizon,t1-t0,*times))
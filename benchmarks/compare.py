@@ -0,0 +1,80 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright 2016 Brecht Baeten
+#    This file is part of jsonopt.
+#
+#    jsonopt is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    jsonopt is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with jsonopt.  If not, see <http://www.gnu.org/licenses/>.
+################################################################################
+"""
+Compares two result files written by suite.py and reports the ratio of each
+measured quantity. A nonzero exit status is returned when a quantity of a
+case became slower or larger than the threshold ratio.
+
+Usage:
+	python compare.py base.json new.json [--threshold 1.25] [--minimum 0.05] [--minimum-memory 1e7]
+"""
+
+from __future__ import print_function
+import sys
+import json
+import argparse
+
+quantities = ['json','parse','construct','solve','extract','peak_memory']
+
+
+def cases(filename):
+	with open(filename) as resultfile:
+		data = json.load(resultfile)
+	return data,{(r['family'],r['size']):r for r in data['results'] if not 'error' in r}
+	
+	
+if __name__ == '__main__':
+	
+	parser = argparse.ArgumentParser()
+	parser.add_argument('base')
+	parser.add_argument('new')
+	parser.add_argument('--threshold',type=float,default=1.25,help='the ratio above which a quantity is a regression')
+	parser.add_argument('--minimum',type=float,default=0.05,help='times in seconds below which differences are ignored')
+	parser.add_argument('--minimum-memory',type=float,default=1e7,help='memory in bytes below which differences are ignored')
+	args = parser.parse_args()
+	
+	(basedata,base) = cases(args.base)
+	(newdata,new) = cases(args.new)
+	
+	print('base: {}\nnew:  {}\n'.format(basedata['commit'],newdata['commit']))
+	print('{:>10s} {:>8s} '.format('family','size') + ' '.join('{:>12s}'.format(q) for q in quantities))
+	
+	regressions = []
+	for key in sorted(set(base) & set(new)):
+		ratios = []
+		for quantity in quantities:
+			(b,n) = (base[key].get(quantity),new[key].get(quantity))
+			if b is None or n is None or b <= 0:
+				ratios.append('-')
+				continue
+				
+			ratio = n/b
+			ratios.append('{:.2f}'.format(ratio))
+			
+			significant = max(b,n) >= (args.minimum_memory if quantity == 'peak_memory' else args.minimum)
+			if ratio > args.threshold and significant:
+				regressions.append((key,quantity,ratio))
+				
+		print('{:>10s} {:8d} '.format(*key) + ' '.join('{:>12s}'.format(r) for r in ratios))
+		
+	if len(regressions) > 0:
+		print('\nregressions:')
+		for (family,size),quantity,ratio in regressions:
+			print('  {} {} {}: {:.2f}x'.format(family,size,quantity,ratio))
+		sys.exit(1)
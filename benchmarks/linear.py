@@ -0,0 +1,91 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright 2016 Brecht Baeten
+#    This file is part of jsonopt.
+#
+#    jsonopt is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    jsonopt is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with jsonopt.  If not, see <http://www.gnu.org/licenses/>.
+################################################################################
+"""
+Compares building a sparse lp with one string constraint per row and with a
+linear_constraints block in matrix form.
+
+Usage:
+	python linear.py [nonzeros]
+"""
+
+from __future__ import print_function
+import sys
+import time
+
+import numpy as np
+
+import jsonopt
+
+
+def random_lp(rows,columns,nonzeros,seed=0):
+	random = np.random.RandomState(seed)
+	row = random.randint(0,rows,nonzeros)
+	col = random.randint(0,columns,nonzeros)
+	data = np.round(random.uniform(0.1,2.,nonzeros),3)
+	upper = np.round(random.uniform(1.,10.,rows),3)
+	return (row,col,data,upper)
+	
+	
+def build_strings(columns,row,col,data,upper):
+	problem = jsonopt.Problem()
+	problem.add_variable('NonNegativeReals x[j] for j in range({})'.format(columns))
+	
+	terms = [[] for r in range(len(upper))]
+	for r,c,d in zip(row.tolist(),col.tolist(),data.tolist()):
+		terms[r].append('{}*x[{}]'.format(d,c))
+		
+	for r,t in enumerate(terms):
+		if len(t) > 0:
+			problem.add_constraint('{} <= {}'.format(' + '.join(t),upper[r]))
+	return problem
+	
+	
+def build_matrix(columns,row,col,data,upper):
+	problem = jsonopt.Problem()
+	problem.add_variable('NonNegativeReals x[j] for j in range({})'.format(columns))
+	problem.add_linear_constraints(['x'],{'row':row, 'col':col, 'data':data, 'shape':[len(upper),columns]},upper=upper)
+	return problem
+	
+	
+if __name__ == '__main__':
+	
+	# import pyomo outside of the measurement
+	jsonopt.Problem().add_variable('Reals x[j] for j in range(2)')
+	
+	maximum = int(float(sys.argv[1])) if len(sys.argv) > 1 else 1000000
+	
+	print('{:>10s} {:>8s} {:>14s} {:>14s} {:>10s}'.format('nonzeros','rows','strings (s)','matrix (s)','speedup'))
+	for nonzeros in [10**k for k in range(3,8) if 10**k <= maximum]:
+		rows = nonzeros//10
+		columns = nonzeros//10
+		lp = random_lp(rows,columns,nonzeros)
+		
+		t0 = time.time()
+		problem = build_matrix(columns,*lp)
+		matrix = time.time()-t0
+		
+		strings = None
+		if nonzeros <= 100000:
+			t0 = time.time()
+			build_strings(columns,*lp)
+			strings = time.time()-t0
+			
+		print('{:10d} {:8d} {:>14s} {:14.3f} {:>10s}'.format(nonzeros,rows,
+			'-' if strings is None else '{:.3f}'.format(strings),matrix,
+			'-' if strings is None else '{:.1f}'.format(strings/matrix)))
@@ -0,0 +1,79 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright 2016 Brecht Baeten
+#    This file is part of jsonopt.
+#
+#    jsonopt is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    jsonopt is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with jsonopt.  If not, see <http://www.gnu.org/licenses/>.
+################################################################################
+"""
+Compares the time and peak memory of building ocp1 with a growing horizon
+and writing it to an .nl file with the pyomo and the nl backend. The solver
+itself is not run.
+
+Usage:
+	python nl.py
+"""
+
+from __future__ import print_function
+import os
+import time
+import shutil
+import tempfile
+import multiprocessing
+
+import jsonopt
+
+from suite import ocp1, peak_memory, reset_peak_memory
+
+
+def run_case(backend,horizon,connection):
+	jsonstring = ocp1(horizon)
+	directory = tempfile.mkdtemp()
+	try:
+		# import pyomo and construct a first model outside of the measurement
+		jsonopt.Problem(backend=backend).add_variable('Reals x[j] for j in range(2)')
+
+		reset_peak_memory()
+		memory = peak_memory()
+
+		t0 = time.time()
+		problem = jsonopt.Problem(jsonstring,backend=backend)
+		t1 = time.time()
+		if backend == 'nl':
+			jsonopt.nl.write(problem.model,os.path.join(directory,'problem.nl'))
+		else:
+			problem.model.write(os.path.join(directory,'problem.nl'))
+		t2 = time.time()
+
+		connection.send((t1-t0,t2-t1,peak_memory()-memory))
+	finally:
+		shutil.rmtree(directory)
+
+
+def run(backend,horizon):
+	(connection,childconnection) = multiprocessing.Pipe()
+	process = multiprocessing.Process(target=run_case,args=(backend,horizon,childconnection))
+	process.start()
+	result = connection.recv()
+	process.join()
+	return result
+
+
+if __name__ == '__main__':
+
+	print('{:>10s} {:>8s} {:>14s} {:>10s} {:>10s} {:>12s}'.format('horizon','backend','construct (s)','write (s)','total (s)','memory (MB)'))
+	for horizon in [24,240,2400,24000]:
+		for backend in ['pyomo','nl']:
+			(construct,write,memory) = run(backend,horizon)
+			print('{:10d} {:>8s} {:14.3f} {:10.3f} {:10.3f} {:12.1f}'.format(horizon,backend,construct,write,construct+write,memory/1e6))
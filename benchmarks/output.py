@@ -0,0 +1,103 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright 2016 Brecht Baeten
+#    This file is part of jsonopt.
+#
+#    jsonopt is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    jsonopt is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with jsonopt.  If not, see <http://www.gnu.org/licenses/>.
+################################################################################
+"""
+Compares writing a solution with get_json_values and with save_solution in
+the npz, json and jsonl formats. Each method runs in a forked process so the
+reported peak memory is the memory added by serialization only.
+
+Usage:
+	python output.py [rows]
+"""
+
+from __future__ import print_function
+import os
+import sys
+import time
+import shutil
+import tempfile
+import multiprocessing
+
+import jsonopt
+
+
+def status(field):
+	# memory in MB from /proc/self/status
+	with open('/proc/self/status') as status:
+		for line in status:
+			if line.startswith(field+':'):
+				return int(line.split()[1])/1e3
+				
+				
+def reset_peak():
+	# linux resets VmHWM to the current rss when 5 is written to clear_refs
+	with open('/proc/self/clear_refs','w') as clear_refs:
+		clear_refs.write('5')
+		
+		
+def measure(function,connection):
+	reset_peak()
+	start = status('VmHWM')
+	t0 = time.time()
+	function()
+	connection.send((time.time()-t0,status('VmHWM')-start))
+	
+	
+def run(function):
+	(connection,childconnection) = multiprocessing.Pipe()
+	process = multiprocessing.Process(target=measure,args=(function,childconnection))
+	process.start()
+	result = connection.recv()
+	process.join()
+	return result
+	
+	
+if __name__ == '__main__':
+	
+	rows = int(sys.argv[1]) if len(sys.argv) > 1 else 8760
+	
+	problem = jsonopt.Problem()
+	problem.add_variable('Reals x[i,j] = 0.5*i for i in range({}) for j in range(10)'.format(rows))
+	problem.add_parameter('p[i,j] = 0.1*i + 0.01*j for i in range({}) for j in range(50)'.format(rows))
+	problem.add_parameter('q[j] = 1.0/(j+1) for j in range({})'.format(rows))
+	problem.set_objective('x[0,0]')
+	
+	# extract the values once so only serialization is measured
+	problem.get_values()
+	
+	datadir = tempfile.mkdtemp()
+	try:
+		def get_json_values():
+			with open(os.path.join(datadir,'get_json_values.json'),'w') as myfile:
+				myfile.write(problem.get_json_values())
+				
+		methods = [('get_json_values',get_json_values)]
+		for format in ['npz','json','jsonl']:
+			methods.append(('save_solution {}'.format(format),lambda format=format: problem.save_solution(os.path.join(datadir,'solution.'+format),format=format)))
+			
+		print('{} values'.format(sum(v.size for v in problem._values.values() if hasattr(v,'size'))))
+		print('{:>22s} {:>10s} {:>14s} {:>10s}'.format('method','time (s)','peak (MB)','size (MB)'))
+		for name,function in methods:
+			(duration,peak) = run(function)
+			size = sum(os.path.getsize(os.path.join(datadir,f)) for f in os.listdir(datadir))/1e6
+			for f in os.listdir(datadir):
+				os.remove(os.path.join(datadir,f))
+			print('{:>22s} {:10.3f} {:14.1f} {:10.1f}'.format(name,duration,peak,size))
+			
+	finally:
+		shutil.rmtree(datadir)
@@ -0,0 +1,90 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright 2016 Brecht Baeten
+#    This file is part of jsonopt.
+#
+#    jsonopt is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    jsonopt is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with jsonopt.  If not, see <http://www.gnu.org/licenses/>.
+################################################################################
+"""
+Compares the construction time and the peak and retained memory of a large
+indexed parameter of which only a few indices are used in constraints. The
+array storage uses range loops, which are backed by the numpy array. The
+dict storage writes the same index set as a list, which creates the
+component data for every index.
+
+Usage:
+	python parameters.py
+"""
+
+from __future__ import print_function
+import gc
+import time
+import multiprocessing
+
+import jsonopt
+
+from suite import peak_memory, reset_peak_memory
+
+
+loops = {
+	'array': 'for i in range({}) for j in range(24)',
+	'dict': 'for i in list(range({})) for j in range(24)',
+}
+
+def current_memory():
+	"""
+	returns the resident memory of the process in bytes
+	"""
+	with open('/proc/self/status') as status:
+		for line in status:
+			if line.startswith('VmRSS:'):
+				return int(line.split()[1])*1024
+				
+				
+def run_case(backend,storage,size,connection):
+	# import pyomo and construct a first model outside of the measurement
+	jsonopt.Problem(backend=backend).add_parameter('p[j] = 0 for j in range(2)')
+	
+	gc.collect()
+	reset_peak_memory()
+	memory = current_memory()
+	
+	t0 = time.time()
+	problem = jsonopt.Problem(backend=backend)
+	problem.add_variable('Reals x[j] for j in range(24)')
+	problem.add_parameter('p[i,j] = 0.20 + 0.01*j '+loops[storage].format(size//24))
+	problem.add_constraint('x[j] <= p[0,j] for j in range(24)')
+	t1 = time.time()
+	
+	gc.collect()
+	connection.send((t1-t0,peak_memory()-memory,current_memory()-memory))
+	
+	
+def run(backend,storage,size):
+	(connection,childconnection) = multiprocessing.Pipe()
+	process = multiprocessing.Process(target=run_case,args=(backend,storage,size,childconnection))
+	process.start()
+	result = connection.recv()
+	process.join()
+	return result
+	
+	
+if __name__ == '__main__':
+	
+	print('{:>10s} {:>8s} {:>8s} {:>14s} {:>10s} {:>14s}'.format('size','backend','storage','construct (s)','peak (MB)','retained (MB)'))
+	for size in [24000,240000,2400000]:
+		for backend in ['pyomo','nl']:
+			for storage in ['dict','array']:
+				(construct,peak,retained) = run(backend,storage,size)
+				print('{:10d} {:>8s} {:>8s} {:14.3f} {:10.1f} {:14.1f}'.format(size,backend,storage,construct,peak/1e6,retained/1e6))
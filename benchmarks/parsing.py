@@ -0,0 +1,136 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright 2016 Brecht Baeten
+#    This file is part of jsonopt.
+#
+#    jsonopt is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    jsonopt is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with jsonopt.  If not, see <http://www.gnu.org/licenses/>.
+################################################################################
+"""
+Compares the single pass scanner in jsonopt.parse with the previous regular
+expression and list based implementation on long generated expressions, and
+the ast based statement front end with the string based for_array_creation
+and equation functions on the example problems.
+
+Usage:
+	python parsing.py
+"""
+
+from __future__ import print_function
+import os
+import re
+import json
+import timeit
+
+import jsonopt
+
+
+def legacy_matching_braces(expression,braces):
+	openpos = [p.start(0) for p in re.finditer(re.escape(braces[0]),expression)]
+	closepos = [p.start(0) for p in re.finditer(re.escape(braces[1]),expression)]
+	
+	openclosepos = [p.start(0) for p in re.finditer(re.escape(braces[0])+'|'+re.escape(braces[1]),expression)]
+	
+	pairs = []
+	for i,o in enumerate(openclosepos):
+		if o in openpos:
+			num_open = 0
+			num_close = 0
+			
+			for c in openclosepos[i:]:
+				if c in openpos:
+					num_open = num_open+1
+				if c in closepos:
+					num_close = num_close+1
+					
+				if num_open == num_close:
+					pairs.append([o,c])
+					break
+	
+	return pairs
+	
+	
+def legacy_forpos(expression):
+	bracepos = legacy_matching_braces(expression,['(',')'])
+	forpos = [p.start(0) for p in re.finditer('for .*? in ',expression)]
+	
+	tempforpos = []
+	for p in forpos:
+		add = True
+		for b in bracepos:
+			if b[0] <= p and p <= b[1]:
+				add = False
+				break
+		if add:
+			tempforpos.append(p)
+	
+	return tempforpos
+	
+	
+def generate(terms):
+	"""
+	generates a constraint with a long sum of nested calls
+	"""
+	content = ' + '.join('exp(x[j]*(y[{0}]+sin(z[{0}]*(a-b))))'.format(k) for k in range(terms))
+	return 'w[j] = ' + content + ' for j in range(10)'
+	
+	
+def legacy_front_end(expression):
+	(content,loop,indexlist,indexvalue) = jsonopt.parse.for_array_creation(expression)
+	(lhs,rhs,type) = jsonopt.parse.equation(content)
+	code = jsonopt.expr.code(lhs + '==' + rhs,indexlist)
+	return (indexvalue,code)
+	
+	
+def front_end(expression):
+	statement = jsonopt.parse.statement(expression)
+	indexvalue = statement.indexvalue()
+	code = jsonopt.expr.code(statement.expression,statement.indexlist)
+	return (indexvalue,code)
+	
+	
+def benchmark(function,number=3):
+	return min(timeit.repeat(function,number=1,repeat=number))
+	
+	
+if __name__ == '__main__':
+	
+	print('{:>8s} {:>10s} {:>14s} {:>14s} {:>10s}'.format('terms','length','legacy (s)','scan (s)','speedup'))
+	for terms in [10,50,100,200,400]:
+		expression = generate(terms)
+		
+		# check the results are the same
+		(pairs,forpos,operators) = jsonopt.parse.scan(expression)
+		assert pairs['('] == legacy_matching_braces(expression,['(',')'])
+		assert forpos == legacy_forpos(expression)
+		
+		legacy = benchmark(lambda: (legacy_matching_braces(expression,['(',')']),legacy_forpos(expression)))
+		new = benchmark(lambda: jsonopt.parse.scan(expression))
+		
+		print('{:8d} {:10d} {:14.6f} {:14.6f} {:10.1f}'.format(terms,len(expression),legacy,new,legacy/new))
+	
+	
+	# statement front end
+	statements = []
+	for name in ['hs071','hs101','ocp1']:
+		with open(os.path.join(os.path.dirname(os.path.abspath(__file__)),'..','examples','json',name+'.json')) as jsonfile:
+			statements += json.loads(jsonfile.read())['constraints']
+	statements += [generate(terms) for terms in [10,50]]
+	
+	number = 20
+	legacy = benchmark(lambda: [legacy_front_end(s) for s in statements for k in range(number)])
+	new = benchmark(lambda: [front_end(s) for s in statements for k in range(number)])
+	
+	print('')
+	print('{:>12s} {:>20s} {:>20s}'.format('statements','legacy (stmt/s)','statement (stmt/s)'))
+	print('{:12d} {:20.0f} {:20.0f}'.format(len(statements)*number,len(statements)*number/legacy,len(statements)*number/new))
@@ -0,0 +1,77 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright 2016 Brecht Baeten
+#    This file is part of jsonopt.
+#
+#    jsonopt is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    jsonopt is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with jsonopt.  If not, see <http://www.gnu.org/licenses/>.
+################################################################################
+"""
+Measures the startup time of fresh python processes which import jsonopt,
+parse a statement without pyomo and construct a first problem. With
+--max-parse a nonzero exit status is returned when the parse only startup
+takes longer than the given number of seconds.
+
+Usage:
+	python startup.py [--repeat 5] [--max-parse 1.0]
+"""
+
+from __future__ import print_function
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)),'..')
+
+scripts = [
+	('python','pass'),
+	('import jsonopt','import jsonopt'),
+	('parse only','import jsonopt.parse; jsonopt.parse.variable("p[j] = 0.2*j for j in range(24)")'),
+	('first problem','import jsonopt; p = jsonopt.Problem(); p.add_variable("Reals x[j] for j in range(24)")'),
+]
+
+def startup(script):
+	"""
+	returns the time a fresh process takes to run a script including the
+	interpreter startup, and the time spent in the script itself
+	"""
+	script = 'import sys, time; t = time.time()\n{}\nsys.stdout.write(repr(time.time()-t))'.format(script)
+	env = dict(os.environ,PYTHONPATH=root)
+	
+	t = time.time()
+	output = subprocess.check_output([sys.executable,'-c',script],env=env)
+	total = time.time()-t
+	
+	return (total,float(output))
+	
+	
+if __name__ == '__main__':
+	
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--repeat',type=int,default=5)
+	parser.add_argument('--max-parse',type=float,default=None)
+	args = parser.parse_args()
+	
+	results = {}
+	print('{:>16s} {:>12s} {:>12s}'.format('','total (s)','script (s)'))
+	for name,script in scripts:
+		times = sorted(startup(script) for i in range(args.repeat))
+		(total,duration) = times[len(times)//2]
+		results[name] = total
+		print('{:>16s} {:12.3f} {:12.3f}'.format(name,total,duration))
+		
+	if args.max_parse is not None and results['parse only'] > args.max_parse:
+		print('parse only startup {:.3f} s exceeds {:.3f} s'.format(results['parse only'],args.max_parse))
+		sys.exit(1)
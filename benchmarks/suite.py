@@ -0,0 +1,229 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright 2016 Brecht Baeten
+#    This file is part of jsonopt.
+#
+#    jsonopt is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    jsonopt is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with jsonopt.  If not, see <http://www.gnu.org/licenses/>.
+################################################################################
+"""
+Benchmark suite on scaled problem families. For each family and size the
+json parse time, the statement parse and model construction time, the
+solver time, the value extraction time and the peak memory are measured and
+written to a json file which can be compared across commits with
+compare.py.
+
+Each case runs in a forked process so the peak memory of one case does not
+include the others. Solver phases are skipped when the solver executable is
+not available.
+
+Families:
+	ocp1:		examples/json/ocp1.json with a horizon of n hours, solved with ipopt
+	denselp:	an lp with n variables and n dense constraints, solved with glpk or ipopt
+	sparselp:	an lp with n variables and a banded constraint matrix, solved with glpk or ipopt
+
+Usage:
+	python suite.py [--quick] [--families ocp1,sparselp] [--output results.json]
+"""
+
+from __future__ import print_function
+import os
+import json
+import time
+import platform
+import argparse
+import subprocess
+import multiprocessing
+from distutils.spawn import find_executable
+
+import jsonopt
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)),'..')
+
+sizes = {
+	'ocp1': [24,240,2400,24000,100000],
+	'denselp': [10,30,100,300],
+	'sparselp': [100,1000,10000,100000],
+}
+quicksizes = {
+	'ocp1': [24,240],
+	'denselp': [10,30],
+	'sparselp': [100,1000],
+}
+
+
+def ocp1(n):
+	"""
+	returns ocp1 with a horizon of n hours as a json string
+	"""
+	with open(os.path.join(root,'examples','json','ocp1.json')) as jsonfile:
+		jsonstring = jsonfile.read()
+	
+	return jsonstring.replace('range(25)','range({})'.format(n+1)).replace('range(24)','range({})'.format(n)).replace('T[24]','T[{}]'.format(n))
+	
+	
+def denselp(n):
+	"""
+	returns a dense lp with n variables and n constraints as a json string
+	"""
+	return json.dumps({
+		'variables': ['NonNegativeReals x[j] = 0 for j in range({})'.format(n)],
+		'parameters': [
+			'A[i,j] = 1.0 + ((7*i+13*j)%11)/10. for i in range({n}) for j in range({n})'.format(n=n),
+			'b[i] = 10.0 + i%5 for i in range({})'.format(n),
+			'c[j] = 1.0 + j%3 for j in range({})'.format(n),
+		],
+		'constraints': ['sum(A[i,j]*x[j] for j in range({n})) <= b[i] for i in range({n})'.format(n=n)],
+		'objective': '-sum(c[j]*x[j] for j in range({}))'.format(n),
+	})
+	
+	
+def sparselp(n):
+	"""
+	returns an lp with n variables and a banded constraint matrix as a json string
+	"""
+	return json.dumps({
+		'variables': ['NonNegativeReals x[j] = 0 for j in range({})'.format(n)],
+		'parameters': [
+			'd[j] = 1.0 + j%7 for j in range({})'.format(n-1),
+			'c[j] = 1.0 + j%3 for j in range({})'.format(n),
+		],
+		'constraints': ['x[j] + x[j+1] >= d[j] for j in range({})'.format(n-1)],
+		'objective': 'sum(c[j]*x[j] for j in range({}))'.format(n),
+	})
+	
+	
+families = {'ocp1':ocp1, 'denselp':denselp, 'sparselp':sparselp}
+solvers = {'ocp1':['ipopt'], 'denselp':['glpk','ipopt'], 'sparselp':['glpk','ipopt']}
+executables = {'ipopt':'ipopt', 'glpk':'glpsol'}
+
+
+def available_solver(family):
+	"""
+	returns the first available solver for a family or None
+	"""
+	for solver in solvers[family]:
+		if find_executable(executables[solver]) is not None:
+			return solver
+	return None
+	
+	
+def peak_memory():
+	"""
+	returns the peak resident memory of the process in bytes
+	"""
+	with open('/proc/self/status') as status:
+		for line in status:
+			if line.startswith('VmHWM:'):
+				return int(line.split()[1])*1024
+				
+				
+def reset_peak_memory():
+	# linux resets VmHWM to the current rss when 5 is written to clear_refs
+	try:
+		with open('/proc/self/clear_refs','w') as clear_refs:
+			clear_refs.write('5')
+	except (IOError,OSError):
+		pass
+		
+		
+def run_case(family,size,solver,connection):
+	"""
+	runs a single case and sends a result dict through the connection
+	"""
+	try:
+		jsonstring = families[family](size)
+		
+		# import pyomo and construct a first model outside of the measurement
+		jsonopt.Problem().add_variable('Reals x[j] for j in range(2)')
+		
+		reset_peak_memory()
+		memory = peak_memory()
+		
+		t0 = time.time()
+		json.loads(jsonstring)
+		jsontime = time.time()-t0
+		
+		stats = jsonopt.stats.Stats()
+		problem = jsonopt.Problem(jsonstring,stats=stats)
+		
+		status = None
+		if solver is not None:
+			results = problem.solve(solver=solver,verbosity=0)
+			status = str(results.solver.termination_condition)
+			
+		t0 = time.time()
+		problem.get_values()
+		extracttime = time.time()-t0
+		
+		phases = stats.phases
+		connection.send({
+			'family': family,
+			'size': size,
+			'solver': solver,
+			'status': status,
+			'json': jsontime,
+			'parse': phases['parse']['time'],
+			'construct': phases['construct']['time'],
+			'solve': phases['solve']['time'] if 'solve' in phases else None,
+			'extract': extracttime,
+			'peak_memory': peak_memory()-memory,
+		})
+	except Exception as e:
+		connection.send({'family':family, 'size':size, 'solver':solver, 'error':'{}: {}'.format(type(e).__name__,e)})
+		
+		
+def run(family,size,solver):
+	(connection,childconnection) = multiprocessing.Pipe()
+	process = multiprocessing.Process(target=run_case,args=(family,size,solver,childconnection))
+	process.start()
+	result = connection.recv()
+	process.join()
+	return result
+	
+	
+def commit():
+	try:
+		return subprocess.check_output(['git','rev-parse','HEAD'],cwd=root).decode().strip()
+	except (OSError,subprocess.CalledProcessError):
+		return None
+		
+		
+if __name__ == '__main__':
+	
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--quick',action='store_true',help='only run the small sizes')
+	parser.add_argument('--families',default=','.join(sorted(families)))
+	parser.add_argument('--output',default='benchmark_results.json')
+	args = parser.parse_args()
+	
+	results = []
+	
+	print('{:>10s} {:>8s} {:>8s} {:>10s} {:>10s} {:>10s} {:>10s} {:>10s} {:>12s}'.format('family','size','solver','json (s)','parse (s)','build (s)','solve (s)','extract (s)','memory (MB)'))
+	for family in args.families.split(','):
+		solver = available_solver(family)
+		for size in (quicksizes if args.quick else sizes)[family]:
+			result = run(family,size,solver)
+			results.append(result)
+			
+			if 'error' in result:
+				print('{:>10s} {:8d} {}'.format(family,size,result['error']))
+			else:
+				print('{:>10s} {:8d} {:>8s} {:10.3f} {:10.3f} {:10.3f} {:>10s} {:10.3f} {:12.1f}'.format(
+					family,size,str(solver),result['json'],result['parse'],result['construct'],
+					'-' if result['solve'] is None else '{:.3f}'.format(result['solve']),result['extract'],result['peak_memory']/1e6))
+					
+	with open(args.output,'w') as outputfile:
+		json.dump({'commit':commit(), 'python':platform.python_version(), 'time':time.time(), 'results':results},outputfile,indent=1)
+		
+	print('results written to {}'.format(args.output))
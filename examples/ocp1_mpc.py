@@ -0,0 +1,43 @@
+#!/usr/bin/python3
+
+#    This file is part of parsenlp.
+#
+#    parsenlp is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    parsenlp is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with parsenlp.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import numpy as np
+import jsonopt
+
+# load the problem from a file in json format
+with open('json/ocp1.json', 'r') as jsonfile:
+    jsonstring=jsonfile.read()
+
+# parse the problem once
+problem = jsonopt.Problem(jsonstring=jsonstring)
+
+# price and ambient temperature forecasts for the next 2 days
+j = np.arange(48)
+prices = np.where(j%24 < 8, 0.15, 0.25)
+Ta = 2.0 + 2.0*np.sin(2*3.14159*j/24.)
+
+# shift the horizon by one hour and solve again every hour
+mpc = jsonopt.mpc.MPC(problem,['T','P','Q','COP','p','Ta'])
+problem.set_values({'p':prices[:24], 'Ta':Ta[:24]})
+mpc.solve()
+for k in range(24):
+    mpc.step({'p':[prices[24+k]], 'Ta':[Ta[24+k]]})
+    print(k, problem.get_value('P')[0])
+
+for entry in mpc.log:
+    print(entry['step'], entry['time'], entry['status'])
@@ -0,0 +1,348 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright 2016 Brecht Baeten
+#    This file is part of jsonopt.
+#
+#    jsonopt is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    jsonopt is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with jsonopt.  If not, see <http://www.gnu.org/licenses/>.
+################################################################################
+
+import os
+import re
+import gc
+import sys
+import json
+import errno
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+try:
+	import cPickle as pickle
+except ImportError:
+	# python 3
+	import pickle
+
+import numpy as np
+
+import __version__
+
+structuresections = ['variables','constraints','objective']
+
+def structure_key(problem,sections=structuresections,backend='pyomo',datadir=None):
+	"""
+	computes a hash of the structural sections of a problem definition, the
+	backend and the files these sections reference
+
+	Parameters:
+		problem: 		dict, the parsed json problem definition
+		sections:		list, the sections which define the structure
+		backend:		string, the backend of the problem
+		datadir:		string, the directory of relative file references
+
+	Returns:
+		key:			string, hexadecimal sha1 hash
+
+	Example:
+		key = jsonopt.caching.structure_key(json.loads(jsonstring))
+	"""
+
+	structure = {section:problem.get(section) for section in sections}
+	definition = {'structure':structure, 'backend':backend, 'files':_file_stats(structure,datadir)}
+	return hashlib.sha1( json.dumps(definition,sort_keys=True).encode('utf-8') ).hexdigest()
+
+
+class LRUCache(object):
+	"""
+	Thread safe dictionary like cache which holds at most maxsize items and
+	evicts the least recently used item when full
+	"""
+
+	def __init__(self,maxsize=128):
+		"""
+		Parameters:
+			maxsize:		int, the maximum number of items in the cache
+		"""
+
+		self.maxsize = maxsize
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+		self._data = OrderedDict()
+		self._lock = threading.Lock()
+
+	def get(self,key,default=None):
+		"""
+		returns the item stored under key and marks it as most recently used
+		or default when the key is not in the cache
+		"""
+		with self._lock:
+			try:
+				value = self._data.pop(key)
+			except KeyError:
+				self.misses += 1
+				return default
+
+			self._data[key] = value
+			self.hits += 1
+			return value
+
+	def put(self,key,value):
+		"""
+		stores an item in the cache, evicting the least recently used items
+		when the cache is full
+		"""
+		with self._lock:
+			self._data.pop(key,None)
+			self._data[key] = value
+
+			while len(self._data) > self.maxsize:
+				self._data.popitem(last=False)
+				self.evictions += 1
+
+	def clear(self):
+		"""
+		removes all items and resets the counters
+		"""
+		with self._lock:
+			self._data.clear()
+			self.hits = 0
+			self.misses = 0
+			self.evictions = 0
+
+	def info(self):
+		"""
+		returns a dict with the cache counters
+		"""
+		return {'hits':self.hits, 'misses':self.misses, 'evictions':self.evictions, 'size':len(self._data), 'maxsize':self.maxsize}
+
+	def __contains__(self,key):
+		return key in self._data
+
+	def __len__(self):
+		return len(self._data)
+
+
+
+def model_key(problem,backend='pyomo',datadir=None):
+	"""
+	computes a hash of a whole problem definition, the backend, the versions
+	which affect the built model and the size and modification time of the
+	files it references
+
+	Parameters:
+		problem: 		dict, the parsed json problem definition
+		backend:		string, the backend of the problem
+		datadir:		string, the directory of relative file references
+
+	Returns:
+		key:			string, hexadecimal sha1 hash
+
+	Example:
+		key = jsonopt.caching.model_key(json.loads(jsonstring),'pyomo')
+	"""
+
+	versions = [__version__.version, np.__version__, list(sys.version_info[:2])]
+	if backend == 'pyomo':
+		import pyomo.version
+		versions.append(pyomo.version.version)
+
+	definition = {'problem':problem, 'backend':backend, 'versions':versions, 'files':_file_stats(problem,datadir)}
+	return hashlib.sha1( json.dumps(definition,sort_keys=True).encode('utf-8') ).hexdigest()
+
+
+def _file_stats(problem,datadir=None):
+	"""
+	returns the absolute path, size and modification time of the files
+	referenced by a problem definition
+	"""
+
+	files = []
+	for path in sorted(_file_references(problem)):
+		if datadir is not None:
+			path = os.path.join(datadir,path)
+		try:
+			stat = os.stat(path)
+			files.append([os.path.abspath(path),stat.st_size,stat.st_mtime])
+		except OSError:
+			files.append([os.path.abspath(path),None,None])
+	return files
+
+
+def _file_references(value):
+	"""
+	returns the set of file paths referenced by @file: in the strings or by
+	the file key of the linear blocks of a problem definition
+	"""
+
+	if isinstance(value,dict):
+		references = set([value['file']]) if isinstance(value.get('file'),(str,type(u''))) else set()
+		for item in value.values():
+			references.update(_file_references(item))
+		return references
+	if isinstance(value,list):
+		return set().union(*[_file_references(item) for item in value])
+	if isinstance(value,(str,type(u''))):
+		return set(re.sub(r'(\.npz):\w+$',r'\1',reference) for reference in re.findall(r'@file:([^\s,\]\)]+)',value))
+	return set()
+
+
+class DiskCache(object):
+	"""
+	Cache of pickled items in a directory which can be shared by several
+	processes, holds at most maxsize bytes and evicts the least recently used
+	items when full
+
+	Items are written to a temporary file which is renamed when complete, so
+	readers never see partially written items. Items are marked as used by
+	their modification time.
+	"""
+
+	extension = '.pkl'
+
+	def __init__(self,directory,maxsize=1<<30):
+		"""
+		Parameters:
+			directory:		string, the cache directory, which is created when it does not exist
+			maxsize:		int, the maximum total size of the items in bytes
+		"""
+
+		self.directory = directory
+		self.maxsize = maxsize
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+		try:
+			os.makedirs(directory)
+		except OSError as e:
+			if e.errno != errno.EEXIST:
+				raise
+
+	def _path(self,key):
+		return os.path.join(self.directory,key+self.extension)
+
+	def get(self,key,default=None):
+		"""
+		returns the item stored under key and marks it as most recently used
+		or default when the key is not in the cache
+		"""
+
+		path = self._path(key)
+		try:
+			with open(path,'rb') as f:
+				# loading many small objects is much faster without garbage collection
+				enabled = gc.isenabled()
+				gc.disable()
+				try:
+					value = pickle.load(f)
+				finally:
+					if enabled:
+						gc.enable()
+		except (IOError,OSError):
+			self.misses += 1
+			return default
+		except Exception:
+			# an item written by an incompatible version
+			self._remove(path)
+			self.misses += 1
+			return default
+
+		try:
+			os.utime(path,None)
+		except OSError:
+			pass
+
+		self.hits += 1
+		return value
+
+	def put(self,key,value):
+		"""
+		stores an item in the cache, evicting the least recently used items
+		when the cache is full
+		"""
+
+		(fd,temporary) = tempfile.mkstemp(suffix='.tmp',dir=self.directory)
+		try:
+			with os.fdopen(fd,'wb') as f:
+				pickle.dump(value,f,pickle.HIGHEST_PROTOCOL)
+			try:
+				os.rename(temporary,self._path(key))
+			except OSError:
+				# the target exists on windows, written by another process
+				os.remove(temporary)
+		except:
+			self._remove(temporary)
+			raise
+
+		self._evict()
+
+	def _entries(self):
+		"""
+		returns (modification time,size,path) for all items
+		"""
+		entries = []
+		for name in os.listdir(self.directory):
+			if name.endswith(self.extension):
+				path = os.path.join(self.directory,name)
+				try:
+					stat = os.stat(path)
+				except OSError:
+					continue
+				entries.append((stat.st_mtime,stat.st_size,path))
+		return entries
+
+	def _evict(self):
+		entries = sorted(self._entries())
+		size = sum(entry[1] for entry in entries)
+		for (mtime,entrysize,path) in entries:
+			if size <= self.maxsize:
+				break
+			if self._remove(path):
+				self.evictions += 1
+			size -= entrysize
+
+	def _remove(self,path):
+		"""
+		removes a file, which may have been removed by another process already
+		"""
+		try:
+			os.remove(path)
+			return True
+		except OSError:
+			return False
+
+	def clear(self):
+		"""
+		removes all items and resets the counters
+		"""
+		for (mtime,size,path) in self._entries():
+			self._remove(path)
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def info(self):
+		"""
+		returns a dict with the cache counters of this process and the number and total size of the items
+		"""
+		entries = self._entries()
+		return {'hits':self.hits, 'misses':self.misses, 'evictions':self.evictions, 'size':len(entries), 'bytes':sum(entry[1] for entry in entries), 'maxsize':self.maxsize}
+
+	def __contains__(self,key):
+		return os.path.exists(self._path(key))
+
+	def __len__(self):
+		return len(self._entries())
@@ -0,0 +1,497 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright 2016 Brecht Baeten
+#    This file is part of jsonopt.
+#
+#    jsonopt is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    jsonopt is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with jsonopt.  If not, see <http://www.gnu.org/licenses/>.
+################################################################################
+
+# Compiles a jsonopt.nl model into numpy callbacks for the objective, its
+# gradient, the constraints and their sparse jacobian, which are solved in
+# process with scipy.optimize.minimize.
+#
+# The linear parts of all constraints and the objective form a constant
+# sparse matrix. The nonlinear parts are stored as a tape of nodes ordered by
+# their height in the expression trees, so all nodes of an operator at the
+# same height are evaluated by a single numpy operation. Derivatives are
+# computed in reverse mode over the same tape: as every node has one parent,
+# the derivative of a tree with respect to a variable occurrence is the
+# product of the partial derivatives along its path to the root.
+
+from __future__ import division
+
+import numpy as np
+
+import util
+import nl
+import stats
+
+scipy_optimize = util.LazyModule('scipy.optimize')
+scipy_sparse = util.LazyModule('scipy.sparse')
+
+
+# operators with their value and the partial derivatives with respect to
+# their arguments as functions of the argument values and the node value
+_binary = {
+	nl.Product: (np.multiply, lambda l,r,v: (r,l)),
+	nl.Division: (np.true_divide, lambda l,r,v: (1/r,-v/r)),
+	nl.Power: (np.power, lambda l,r,v: (r*l**(r-1),v*np.log(l))),
+}
+_unary = {
+	'neg': (np.negative, lambda a,v: -np.ones_like(a)),
+	'sin': (np.sin, lambda a,v: np.cos(a)),
+	'cos': (np.cos, lambda a,v: -np.sin(a)),
+	'tan': (np.tan, lambda a,v: 1/np.cos(a)**2),
+	'asin': (np.arcsin, lambda a,v: 1/np.sqrt(1-a**2)),
+	'acos': (np.arccos, lambda a,v: -1/np.sqrt(1-a**2)),
+	'atan': (np.arctan, lambda a,v: 1/(1+a**2)),
+	'exp': (np.exp, lambda a,v: v),
+	'log': (np.log, lambda a,v: 1/a),
+	'sqrt': (np.sqrt, lambda a,v: 0.5/v),
+	'abs': (np.abs, lambda a,v: np.sign(a)),
+}
+
+methods = ['trust-constr','SLSQP']
+
+
+class Tape(object):
+	"""
+	The nonlinear terms of a model as nodes ordered by height, which are
+	evaluated and differentiated with a numpy operation per operator and height
+	"""
+
+	def __init__(self,columns):
+		"""
+		Parameters:
+			columns: 		dict, the column of each variable data
+		"""
+		self.columns = columns
+		self.size = 0
+
+		self._varnodes = []
+		self._varcolumns = []
+		self._varrows = []
+		self._constnodes = []
+		self._constvalues = []
+		self._roots = []
+		self._rootrows = []
+		self._rootcoefs = []
+		self._groups = {}
+
+	def add(self,row,coef,node):
+		"""
+		adds a term coef*node to a row
+
+		Parameters:
+			row: 			int, the row index
+			coef: 			number, the coefficient of the term
+			node: 			jsonopt.nl expression
+		"""
+
+		self._row = row
+		value = self._add(node)
+		if not isinstance(value,tuple):
+			value = (self._constant(value),0)
+
+		self._roots.append(value[0])
+		self._rootrows.append(row)
+		self._rootcoefs.append(coef)
+
+	def _constant(self,value):
+		index = self.size
+		self.size += 1
+		self._constnodes.append(index)
+		self._constvalues.append(value)
+		return index
+
+	def _node(self,key,arguments):
+		"""
+		adds an operator node with arguments which are numbers or (index,height) tuples and returns its (index,height)
+		"""
+		arguments = [a if isinstance(a,tuple) else (self._constant(a),0) for a in arguments]
+		index = self.size
+		self.size += 1
+		height = 1 + max(a[1] for a in arguments)
+		self._groups.setdefault((height,key),[]).append([index]+[a[0] for a in arguments])
+		return (index,height)
+
+	def _add(self,node):
+		"""
+		adds an expression and returns its value when it is constant or its (index,height)
+		"""
+
+		t = type(node)
+		if t in nl._numbers:
+			return node
+		if isinstance(node,nl.ParamData):
+			return nl.value(node)
+		if isinstance(node,nl.VarData):
+			index = self.size
+			self.size += 1
+			self._varnodes.append(index)
+			self._varcolumns.append(self.columns[node])
+			self._varrows.append(self._row)
+			return (index,0)
+
+		if t is nl.Sum or t is nl.LinearExpression:
+			if t is nl.Sum:
+				arguments = [self._add(arg) for arg in node.terms()]
+			else:
+				arguments = [self._add(node.constant)] + [self._add(nl.Product(c,v)) for c,v in zip(node.linear_coefs,node.linear_vars)]
+			if not any(isinstance(a,tuple) for a in arguments):
+				return sum(arguments)
+			return self._node('sum',arguments)
+
+		if t is nl.Negation or t is nl.Function:
+			key = 'neg' if t is nl.Negation else node.name
+			argument = self._add(node.arg)
+			if not isinstance(argument,tuple):
+				return _unary[key][0](argument)
+			return self._node(key,[argument])
+
+		arguments = [self._add(node.left),self._add(node.right)]
+		if not any(isinstance(a,tuple) for a in arguments):
+			return _binary[t][0](*arguments)
+		return self._node(t,arguments)
+
+	def compile(self):
+		"""
+		converts the nodes to arrays, after which no nodes can be added
+		"""
+
+		self._varnodes = np.array(self._varnodes,dtype=int)
+		self._varcolumns = np.array(self._varcolumns,dtype=int)
+		self._varrows = np.array(self._varrows,dtype=int)
+		self._constnodes = np.array(self._constnodes,dtype=int)
+		self._constvalues = np.array(self._constvalues,dtype=float)
+		self._roots = np.array(self._roots,dtype=int)
+		self._rootrows = np.array(self._rootrows,dtype=int)
+		self._rootcoefs = np.array(self._rootcoefs,dtype=float)
+
+		# (key,out,arguments) for each height in increasing order
+		self.levels = []
+		for (height,key) in sorted(self._groups,key=lambda k: k[0]):
+			nodes = self._groups[(height,key)]
+			out = np.array([n[0] for n in nodes],dtype=int)
+			if key == 'sum':
+				arguments = np.array([a for n in nodes for a in n[1:]],dtype=int)
+				segments = np.repeat(np.arange(len(nodes)),[len(n)-1 for n in nodes])
+				self.levels.append((key,out,(arguments,segments)))
+			else:
+				self.levels.append((key,out,tuple(np.array([n[i] for n in nodes],dtype=int) for i in range(1,len(nodes[0])))))
+		self._groups = None
+
+	def forward(self,x):
+		"""
+		returns the values of all nodes for the variable values x
+		"""
+
+		v = np.empty(self.size)
+		v[self._varnodes] = x[self._varcolumns]
+		v[self._constnodes] = self._constvalues
+		with np.errstate(all='ignore'):
+			for (key,out,arguments) in self.levels:
+				if key == 'sum':
+					v[out] = np.bincount(arguments[1],weights=v[arguments[0]],minlength=len(out))
+				elif key in _unary:
+					v[out] = _unary[key][0](v[arguments[0]])
+				else:
+					v[out] = _binary[key][0](v[arguments[0]],v[arguments[1]])
+		return v
+
+	def rows(self,v,nrows):
+		"""
+		returns the value of the nonlinear part of each row
+		"""
+		return np.bincount(self._rootrows,weights=self._rootcoefs*v[self._roots],minlength=nrows)
+
+	def reverse(self,v):
+		"""
+		returns the derivative of the row of each variable occurrence with respect to the occurrence
+		"""
+
+		p = np.zeros(self.size)
+		p[self._roots] = self._rootcoefs
+		# the derivatives with respect to constants are not used and may be nan, like log(l) of l**2 with a negative l
+		with np.errstate(all='ignore'):
+			for (key,out,arguments) in reversed(self.levels):
+				if key == 'sum':
+					p[arguments[0]] = p[out][arguments[1]]
+				elif key in _unary:
+					p[arguments[0]] = p[out]*_unary[key][1](v[arguments[0]],v[out])
+				else:
+					(dl,dr) = _binary[key][1](v[arguments[0]],v[arguments[1]],v[out])
+					p[arguments[0]] = p[out]*dl
+					p[arguments[1]] = p[out]*dr
+		return p[self._varnodes]
+
+
+def _add_bounds(bounds,data,repn):
+	"""
+	tightens the bounds of the variable of a constraint coef*var + constant with bounds
+	"""
+	(constant,linear,nonlinear) = repn
+	(var,coef) = list(linear.items())[0]
+	(lb,ub) = bounds.get(var,(-np.inf,np.inf))
+	lower = -np.inf if data.lower is None else (nl.value(data.lower)-constant)/coef
+	upper = np.inf if data.upper is None else (nl.value(data.upper)-constant)/coef
+	if coef < 0:
+		(lower,upper) = (upper,lower)
+	bounds[var] = (max(lb,lower),min(ub,upper))
+
+
+class Callbacks(object):
+	"""
+	Objective, gradient, constraint and jacobian functions of a model with
+	the variables used in the model as a vector x
+
+	The constraints are lower <= constraints(x) <= upper where bounds which
+	do not exist are infinite. Constraints on a single variable are not
+	included but are applied to the variable bounds lb <= x <= ub.
+	"""
+
+	def __init__(self,model):
+		"""
+		Parameters:
+			model: 			jsonopt.nl.ConcreteModel
+		"""
+
+		# the constant, linear and nonlinear part of the constraints and the objective,
+		# constraints on a single variable become bounds of the variable
+		rows = []
+		bounds = {}
+		self.labels = []
+		for component in model.components(nl.Constraint):
+			for key,data in component.items():
+				repn = nl._repn(data.body)
+				if len(repn[1]) == 1 and len(repn[2]) == 0 and list(repn[1].values())[0] != 0:
+					_add_bounds(bounds,data,repn)
+				else:
+					rows.append((data,repn))
+					self.labels.append(component.label(key))
+		objectives = model.components(nl.Objective)
+		if len(objectives) != 1:
+			raise ValueError('A model requires one objective, not {}'.format(len(objectives)))
+		objective = nl._repn(objectives[0].expr)
+
+		# the variables in order of creation
+		used = set(bounds)
+		for (constant,linear,nonlinear) in [r[1] for r in rows] + [objective]:
+			used.update(linear)
+			for term in nonlinear:
+				used.update(term[2])
+
+		self.variables = []
+		for component in model.components((nl.IndexedVar,nl._ScalarVar)):
+			self.variables += [data for data in component.values() if data in used]
+		columns = dict((var,i) for i,var in enumerate(self.variables))
+
+		for var in self.variables:
+			if var.domain.kind != 'continuous':
+				raise ValueError('Only continuous variables are supported, {} is {}'.format(var.label(),var.domain))
+
+		n = len(self.variables)
+		m = len(rows)
+
+		# the objective is the last row of the linear part and the tape
+		tape = Tape(columns)
+		(linearrows,linearcols,lineardata) = ([],[],[])
+		self.constant = np.zeros(m+1)
+		self.lower = np.full(m,-np.inf)
+		self.upper = np.full(m,np.inf)
+
+		for i,(data,(constant,linear,nonlinear)) in enumerate(rows+[(None,objective)]):
+			self.constant[i] = constant
+			for var,coef in linear.items():
+				linearrows.append(i)
+				linearcols.append(columns[var])
+				lineardata.append(coef)
+			for (coef,node,variables) in nonlinear:
+				tape.add(i,coef,node)
+			if data is not None:
+				if data.lower is not None:
+					self.lower[i] = nl.value(data.lower)-constant
+				if data.upper is not None:
+					self.upper[i] = nl.value(data.upper)-constant
+
+		tape.compile()
+		self.tape = tape
+		self.linear = scipy_sparse.csr_matrix((lineardata,(linearrows,linearcols)),shape=(m+1,n))
+
+		# the jacobian entries of the linear part and of the variable occurrences in the tape
+		# sorted by row and column, so the objective entries are last and the others are in csr order
+		coo = self.linear.tocoo()
+		entryrows = np.concatenate([coo.row,tape._varrows]).astype(np.int64)
+		entrycols = np.concatenate([coo.col,tape._varcolumns]).astype(np.int64)
+		(unique,self._positions) = np.unique(entryrows*n+entrycols,return_inverse=True)
+		(self._rows,self._cols) = (unique//n,unique%n)
+		self._objective = self._rows == m
+		self._entries = np.count_nonzero(~self._objective)
+		self._indptr = np.searchsorted(self._rows,np.arange(m+1))
+		self._lineardata = coo.data
+		self._shape = (m,n)
+
+		# the initial values, projected on the bounds
+		self.lb = np.array([-np.inf if var.domain.lb is None else var.domain.lb for var in self.variables],dtype=float)
+		self.ub = np.array([np.inf if var.domain.ub is None else var.domain.ub for var in self.variables],dtype=float)
+		for var,(lb,ub) in bounds.items():
+			self.lb[columns[var]] = max(self.lb[columns[var]],lb)
+			self.ub[columns[var]] = min(self.ub[columns[var]],ub)
+		self.x0 = np.clip(np.array([0. if var.value is None else var.value for var in self.variables],dtype=float),self.lb,self.ub)
+
+		self._x = None
+
+	def _evaluate(self,x):
+		"""
+		returns the tape node values, cached for the last x
+		"""
+		if self._x is None or not np.array_equal(x,self._x):
+			self._x = np.array(x,dtype=float)
+			self._v = self.tape.forward(self._x)
+			self._rowvalues = self.linear.dot(self._x) + self.tape.rows(self._v,self._shape[0]+1)
+			self._derivatives = None
+		return self._v
+
+	def _derivative(self,x):
+		"""
+		returns the values of the jacobian entries of all rows including the objective
+		"""
+		v = self._evaluate(x)
+		if self._derivatives is None:
+			weights = np.concatenate([self._lineardata,self.tape.reverse(v)])
+			self._derivatives = np.bincount(self._positions,weights=weights,minlength=len(self._rows))
+		return self._derivatives
+
+	def objective(self,x):
+		"""
+		returns the objective value
+		"""
+		self._evaluate(x)
+		return self._rowvalues[-1] + self.constant[-1]
+
+	def gradient(self,x):
+		"""
+		returns the objective gradient as an array
+		"""
+		gradient = np.zeros(self._shape[1])
+		gradient[self._cols[self._objective]] = self._derivative(x)[self._objective]
+		return gradient
+
+	def constraints(self,x):
+		"""
+		returns the constraint values without the constant parts, which are in the bounds
+		"""
+		self._evaluate(x)
+		return self._rowvalues[:-1].copy()
+
+	def structure(self):
+		"""
+		returns the row and column indices of the nonzero jacobian entries
+		"""
+		return (self._rows[:self._entries],self._cols[:self._entries])
+
+	def jacobian(self,x):
+		"""
+		returns the constraint jacobian as a scipy.sparse.csr_matrix
+		"""
+		return scipy_sparse.csr_matrix((self._derivative(x)[:self._entries],self._cols[:self._entries],self._indptr),shape=self._shape)
+
+	def violation(self,x):
+		"""
+		returns the largest violation of the constraints and the bounds
+		"""
+		values = self.constraints(x)
+		return max([0.]+[np.max(v) for v in [self.lower-values,values-self.upper,self.lb-x,x-self.ub] if len(v) > 0])
+
+	def load(self,x):
+		"""
+		sets the variable values
+		"""
+		for var,value in zip(self.variables,np.asarray(x).tolist()):
+			var.value = value
+
+
+def minimize(callbacks,method='trust-constr',options={},disp=False):
+	"""
+	minimizes the objective of compiled callbacks with scipy.optimize.minimize
+	and loads the solution in the variables
+
+	Parameters:
+		callbacks: 		Callbacks
+		method: 		string, 'trust-constr' or 'SLSQP'
+		options: 		dict, options passed to scipy.optimize.minimize
+		disp: 			boolean, print the solver output
+
+	Returns:
+		results: 		jsonopt.stats.SolveResult, with the iteration log and the scipy.optimize.OptimizeResult as results
+
+	Example:
+		results = jsonopt.callbacks.minimize(jsonopt.callbacks.Callbacks(problem.model),method='SLSQP')
+	"""
+
+	if not method in methods:
+		raise ValueError('The method {} is not supported. Supported methods are:\n{}'.format(method,methods))
+
+	(m,n) = callbacks._shape
+	(lower,upper) = (callbacks.lower,callbacks.upper)
+	options = dict(options)
+	log = []
+
+	if method == 'trust-constr':
+		if disp:
+			options.setdefault('verbose',2)
+		constraints = []
+		if m > 0:
+			constraints.append(scipy_optimize.NonlinearConstraint(callbacks.constraints,lower,upper,jac=callbacks.jacobian,hess=scipy_optimize.BFGS()))
+		# scipy 1.2 fails on bounds which are all infinite
+		bounds = None
+		if np.isfinite(callbacks.lb).any() or np.isfinite(callbacks.ub).any():
+			bounds = scipy_optimize.Bounds(callbacks.lb,callbacks.ub)
+		def callback(x,state):
+			log.append({'iter':state.nit, 'objective':state.fun, 'inf_pr':state.constr_violation, 'inf_du':state.optimality})
+		result = scipy_optimize.minimize(callbacks.objective,callbacks.x0,method=method,jac=callbacks.gradient,hess=scipy_optimize.BFGS(),
+		                                 bounds=bounds,constraints=constraints,options=options,callback=callback)
+		maxiter = result.status == 0
+
+	else:
+		if disp:
+			options.setdefault('disp',True)
+		equal = np.isfinite(lower) & (lower == upper)
+		lowers = np.isfinite(lower) & ~equal
+		uppers = np.isfinite(upper) & ~equal
+		constraints = []
+		if equal.any():
+			constraints.append({'type':'eq', 'fun':lambda x: callbacks.constraints(x)[equal]-lower[equal], 'jac':lambda x: callbacks.jacobian(x)[equal].toarray()})
+		if lowers.any() or uppers.any():
+			constraints.append({'type':'ineq',
+			                    'fun':lambda x: np.concatenate([callbacks.constraints(x)[lowers]-lower[lowers],upper[uppers]-callbacks.constraints(x)[uppers]]),
+			                    'jac':lambda x: np.concatenate([callbacks.jacobian(x)[lowers].toarray(),-callbacks.jacobian(x)[uppers].toarray()])})
+		bounds = [(None if np.isinf(l) else l,None if np.isinf(u) else u) for l,u in zip(callbacks.lb,callbacks.ub)]
+		def callback(x):
+			log.append({'iter':len(log)+1, 'objective':callbacks.objective(x), 'inf_pr':callbacks.violation(x)})
+		result = scipy_optimize.minimize(callbacks.objective,callbacks.x0,method=method,jac=callbacks.gradient,bounds=bounds,constraints=constraints,options=options,callback=callback)
+		maxiter = result.status == 9
+
+	if np.all(np.isfinite(result.x)):
+		callbacks.load(result.x)
+
+	if result.success:
+		(status,termination_condition) = ('ok','optimal')
+	elif maxiter:
+		(status,termination_condition) = ('warning','maxIterations')
+	else:
+		(status,termination_condition) = ('warning','other')
+
+	return stats.SolveResult(status,termination_condition,str(result.message),name=method,iterations=int(result.nit),objective=float(result.fun),
+	                         infeasibility=callbacks.violation(result.x),log=log,results=result)
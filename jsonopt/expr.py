@@ -0,0 +1,76 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright 2016 Brecht Baeten
+#    This file is part of jsonopt.
+#
+#    jsonopt is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    jsonopt is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with jsonopt.  If not, see <http://www.gnu.org/licenses/>.
+################################################################################
+
+from __future__ import division
+import __future__
+import ast
+
+def code(expression,indexlist=[],division=True):
+	"""
+	compiles an expression string or ast node once into a code object which
+	evaluates to a function of the index variables
+
+	Parameters:
+		expression: 	string or ast node, python expression
+		indexlist: 		list, a list of index names as strings which become the function arguments
+		division: 		boolean, compile with true division
+
+	Returns:
+		code: 			code object
+
+	Example:
+		c = jsonopt.expr.code('x[j+1]-x[j]',['j'])
+	"""
+
+	if isinstance(expression,ast.AST):
+		source = ast.parse('lambda {}: 0'.format(','.join(indexlist)),mode='eval')
+		source.body.body = expression
+		if not hasattr(expression,'lineno'):
+			ast.fix_missing_locations(source)
+	else:
+		source = 'lambda {}: {}'.format(','.join(indexlist),expression.strip())
+		
+	flags = __future__.division.compiler_flag if division else 0
+	return compile(source,'<jsonopt>','eval',flags,True)
+
+
+def function(code,namespace):
+	"""
+	binds a compiled expression to a namespace and returns the function
+
+	The namespace is used as the globals of the function, index values are
+	passed as arguments and are never written into the namespace.
+
+	Parameters:
+		code: 			code object, as returned by code
+		namespace: 		dict, names available in the expression
+
+	Returns:
+		function: 		function of the index variables
+
+	Example:
+		f = jsonopt.expr.function(jsonopt.expr.code('x[j+1]-x[j]',['j']),{'x':range(10)})
+		f(2)
+
+		returns
+		1
+	"""
+
+	return eval(code,namespace)
+
@@ -18,44 +18,106 @@
 ################################################################################
 
 from __future__ import division
+import os
 import json
 import re
+import shutil
+import tempfile
+import contextlib
 
 import numpy as np
 
-import pyomo.environ as pm
-import pyomo.core.base.set_types
-
 import parse
 import util
+import expr
+import caching
+import parallel
+import stream
+import solution
+import stats as stats_module
+import linear
+import nl
+import callbacks
+import mpc
+
+# pyomo is imported on first use, so parsing works without it
+pm = util.LazyModule('pyomo.environ')
+pm_expr = util.LazyModule('pyomo.core.expr.current')
+
+# the modules which provide the model components of each backend
+backends = {'pyomo':pm, 'nl':nl, 'scipy':nl}
+
+def _domain_expressions():
+	import pyomo.core.base.set_types
+	return [v for v in dir(pyomo.core.base.set_types) if v[0].isupper()]
+	
 
 class Problem:
 	"""
 	Class for defining a non-linear program
 	"""
 	
-	validDomainExpressions = [v for v in dir(pyomo.core.base.set_types) if v[0].isupper()]
+	validDomainExpressions = util.LazyAttribute(_domain_expressions)
+	structure_cache = caching.LRUCache(maxsize=64)
+	ipopt_warm_start_options = {'warm_start_init_point':'yes', 'warm_start_bound_push':1e-6, 'warm_start_mult_bound_push':1e-6, 'mu_init':1e-6}
 	
-	def __init__(self,jsonstring=None):
+	def __init__(self,jsonstring=None,datadir=None,stats=None,backend='pyomo',cache_dir=None):
 		"""
 		create an optimization problem from a jsonstring
 		
+		With a cache_dir, the built problem is stored in the cache directory
+		under a hash of the whole definition, the backend, the jsonopt, numpy
+		and pyomo versions and the size and modification time of the files it
+		references. Later problems with the same key are loaded from the
+		cache instead of being parsed and built again, also in other
+		processes.
+		
 		Parameters:
 			jsonstring:		nlp definition in json format
+			datadir:		string, the directory of relative @file: references, defaults to the working directory
+			stats:			jsonopt.stats.Stats or True, record the time and memory of each phase in problem.stats
+			backend:		string, 'pyomo', 'nl' or 'scipy', the nl backend writes the problem directly to an AMPL .nl file for the solver without building a pyomo model, the scipy backend solves it in process with scipy.optimize.minimize
+			cache_dir:		string or jsonopt.caching.DiskCache, the directory of the cache of built problems, the cache is not used when None
+			
+		Example:
+			problem = jsonopt.Problem(jsonstring,cache_dir='.jsonopt_cache')
 		"""
 		
-		self.model = pm.ConcreteModel()
+		if not backend in backends:
+			raise ValueError('The backend {} is not supported. Supported backends are:\n{}'.format(backend,sorted(backends.keys())))
+		
+		self.backend = backend
+		self._components = backends[backend]
+		self.model = self._components.ConcreteModel()
+		self.datadir = datadir
+		self.stats = stats if not stats is True else stats_module.Stats()
 		
 		self.variables = {}
 		self.parameters = {}
 		self.constraints = {}
 		self.objective = None
 		
+		self._indexmaps = {}
+		self._arrays = {}
+		self._componentdata = {}
+		self._values = {}
+		self._solvers = {}
+		self._warm_start = False
+		self._statements = []
 		
 		if jsonstring != None:
 			# parse the json nlp definition .read().decode('utf-8')
 			problem = json.loads(jsonstring)
 			
+			if cache_dir is not None:
+				cache = cache_dir if isinstance(cache_dir,caching.DiskCache) else caching.DiskCache(cache_dir)
+				key = caching.model_key(problem,backend,datadir)
+				with self._measure('cache.load'):
+					state = cache.get(key)
+				if state is not None:
+					self.__dict__.update(state)
+					return
+					
 			# create variables list
 			for expression in problem['variables']:
 				self.add_variable(expression)
@@ -68,10 +130,159 @@ class Problem:
 			for expression in problem['constraints']:
 				self.add_constraint(expression)
 			
+			# add blocks of linear constraints in matrix form
+			for block in problem.get('linear_constraints',[]):
+				self._add_linear_block(block)
+				
 			# set the objective
 			self.set_objective(problem['objective'])
+			
+			if cache_dir is not None:
+				with self._measure('cache.store'):
+					self._store(cache,key)
+	
+	
+	def _store(self,cache,key):
+		"""
+		stores the model and the attributes which describe it in a cache
+		"""
+		
+		state = dict((name,value) for name,value in self.__dict__.items() if not name in ['_components','datadir','stats','_values','_solvers','_warm_start'])
+		
+		# pyomo keeps the rules of constructed components, which can not be pickled
+		rules = []
+		if self.backend == 'pyomo':
+			for component in self.model.component_objects():
+				if getattr(component,'rule',None) is not None:
+					rules.append((component,component.rule))
+					component.rule = None
+		try:
+			cache.put(key,state)
+		finally:
+			for component,rule in rules:
+				component.rule = rule
+	
+	
+	@classmethod
+	def from_json(cls,jsonstring,cache=None,datadir=None,stats=None,backend='pyomo'):
+		"""
+		create an optimization problem from a jsonstring, reusing the parsed
+		variables, constraints and objective of previously seen problems with
+		the same structure
+		
+		The problems are looked up in a least recently used cache by a hash of
+		the variables, constraints and objective sections, the backend and the
+		files these sections reference. Only the parameters section is parsed
+		again on a cache hit.
+		
+		Parameters:
+			jsonstring:		nlp definition in json format
+			cache:			jsonopt.caching.LRUCache, defaults to Problem.structure_cache
+			datadir:		string, the directory of relative @file: references
+			stats:			jsonopt.stats.Stats or True, record the time and memory of each phase
+			backend:		string, 'pyomo', 'nl' or 'scipy'
+			
+		Example:
+			problem = jsonopt.Problem.from_json(jsonstring)
+			jsonopt.Problem.structure_cache.info()
+		"""
+		
+		if cache is None:
+			cache = cls.structure_cache
+			
+		problem = json.loads(jsonstring)
+		key = caching.structure_key(problem,backend=backend,datadir=datadir)
+		
+		instance = cls(datadir=datadir,stats=stats,backend=backend)
+		
+		structure = cache.get(key)
+		if structure is None:
+			structure = {
+				'variables': [instance._parse_variable(expression) for expression in problem['variables']],
+				'constraints': [instance._parse_constraint(expression) for expression in problem['constraints']],
+				'objective': instance._parse_objective(problem['objective']),
+			}
+			cache.put(key,structure)
+		
+		for expression,parsed in zip(problem['variables'],structure['variables']):
+			instance._add_variable(*parsed)
+			instance._statements.append(('variable',expression,None))
+			
+		for expression in problem['parameters']:
+			instance.add_parameter(expression)
+		
+		for expression,parsed in zip(problem['constraints'],structure['constraints']):
+			instance._add_constraint(*parsed)
+			instance._statements.append(('constraint',expression,None))
+			
+		for block in problem.get('linear_constraints',[]):
+			instance._add_linear_block(block)
+			
+		instance._set_objective(structure['objective'])
+		instance._statements.append(('objective',problem['objective'],None))
+		
+		return instance
+		
+		
+	@classmethod
+	def from_file(cls,path_or_fileobj,chunksize=1<<16,datadir=None,stats=None,backend='pyomo'):
+		"""
+		create an optimization problem from a json file which is parsed
+		incrementally
+		
+		Each statement is added to the problem as soon as it is read, so the
+		whole file and its parsed contents are never held in memory at once.
+		Constraints and the objective which appear in the file before the
+		variables and parameters sections are kept until those are complete.
+		
+		Parameters:
+			path_or_fileobj:	string or file like object, nlp definition in json format
+			chunksize:			int, the number of characters read at a time
+			datadir:			string, the directory of relative @file: references, defaults to the directory of the file
+			stats:				jsonopt.stats.Stats or True, record the time and memory of each phase
+			backend:			string, 'pyomo', 'nl' or 'scipy'
+			
+		Example:
+			problem = jsonopt.Problem.from_file('examples/json/ocp1.json')
+		"""
+		
+		if not hasattr(path_or_fileobj,'read'):
+			with open(path_or_fileobj,'r') as fileobj:
+				return cls.from_file(fileobj,chunksize=chunksize,datadir=datadir,stats=stats,backend=backend)
+				
+		if datadir is None and hasattr(path_or_fileobj,'name'):
+			datadir = os.path.dirname(os.path.abspath(path_or_fileobj.name))
+			
+		instance = cls(datadir=datadir,stats=stats,backend=backend)
+		
+		definitions = {'variables':instance.add_variable, 'parameters':instance.add_parameter}
+		declarations = {'constraints':instance.add_constraint, 'linear_constraints':instance._add_linear_block, 'objective':instance.set_objective}
+		pending = []
+		
+		for section,expressions in stream.sections(path_or_fileobj,chunksize=chunksize):
+			if section in definitions:
+				for expression in expressions:
+					definitions[section](expression)
+				del definitions[section]
 				
+			elif section in declarations:
+				for expression in expressions:
+					if len(definitions) == 0:
+						declarations[section](expression)
+					else:
+						pending.append((section,expression))
+			
+			if len(definitions) == 0:
+				for section,expression in pending:
+					declarations[section](expression)
+				pending = []
 				
+		for section,expression in pending:
+			declarations[section](expression)
+			
+		return instance
+		
+		
 	def add_variable(self,expression):
 		"""
 		Adds a variable to the problem from a string expression
@@ -83,34 +294,71 @@ class Problem:
 			problem = jsonipopt.Problem()
 			problem.add_variable('Reals x[j] for j in range(25)')
 			problem.add_variable('Reals p[i,j] = 0.20 if j==0 else 0.30 for i in range(24) for j in range(5)')
+			problem.add_variable('Reals T[j] = @file:initial.npy for j in range(24)')
 		"""
 		
-		# get the domain of the variable
-		splitexpression = expression.split(' ')
-		domainexpr = splitexpression[0]
-		if domainexpr in self.validDomainExpressions:
-			domain = eval('pm.'+domainexpr)
-		else:
-			raise ValueError('The domain {} is not a valid domain. Valid domains are:\n{}'.format(domainexpr,self.validDomainExpressions))
+		with self._measure('variable') as record:
+			parsed = self._parse_variable(expression)
+			record['name'] = parsed[1]
+			self._add_variable(*parsed)
+			
+		self._statements.append(('variable',expression,None))
+		
+		
+	def _parse_variable(self,expression):
+		"""
+		parses a variable expression into a (domainexpr,name,indexvalue,initial) tuple
+		"""
+		
+		with self._measure('parse') as record:
+			statement = parse.statement(expression,domain=True,datadir=self.datadir)
+			
+			# check the domain of the variable
+			domainexpr = statement.domain
+			domains = nl.domains if self._components is nl else self.validDomainExpressions
+			if not domainexpr in domains:
+				raise ValueError('The domain {} is not a valid domain. Valid domains are:\n{}'.format(domainexpr,domains))
+			
+			# parse the rest of the expression
+			(name,indexvalue,initial) = parse.variable(statement)
+			record['name'] = name
+		
+		return (domainexpr,name,indexvalue,initial)
 		
-		restexpression = ' '.join(splitexpression[1:])
 		
-		# parse the rest of the expression
-		(name,indexvalue,initial) = parse.variable(restexpression)
+	def _add_variable(self,domainexpr,name,indexvalue,initial):
+		"""
+		adds a parsed variable to the model
+		"""
+		
+		domain = getattr(self._components,domainexpr)
 		
 		# add the variable
-		if len(indexvalue)==0:
-			if initial == []:
-				setattr(self.model, name, pm.Var(domain=domain))
-			else:
-				setattr(self.model, name, pm.Var(domain=domain,initialize=initial))
-		else:
-			if initial == []:
-				setattr(self.model, name, pm.Var(indexvalue,domain=domain))
+		with self._measure('construct',name):
+			if len(indexvalue)==0:
+				if util.isempty(initial):
+					setattr(self.model, name, self._components.Var(domain=domain))
+				else:
+					setattr(self.model, name, self._components.Var(domain=domain,initialize=initial))
 			else:
-				setattr(self.model, name, pm.Var(indexvalue,domain=domain,initialize=lambda model,*args: initial[args]))
+				if util.isempty(initial):
+					setattr(self.model, name, self._components.Var(indexvalue,domain=domain))
+				else:
+					setattr(self.model, name, self._components.Var(indexvalue,domain=domain,initialize=util.initializer(indexvalue,initial)))
 		
 		self.variables[name] = getattr(self.model, name)
+		self._values.clear()
+		indexmap = self._indexmaps[name] = util.IndexMap(indexvalue)
+		
+		# the component data in the order of the index map and the array positions, for extracting values
+		self._componentdata.pop(name,None)
+		if not indexmap.scalar:
+			self._componentdata[name] = [self.variables[name][key] for key in indexmap.keys]
+			try:
+				indexmap.positions
+			except ValueError:
+				# other indices can not be mapped to an array
+				pass
 		
 		
 	def add_parameter(self,expression):
@@ -123,21 +371,57 @@ class Problem:
 		Example:
 			problem.add_parameter('A = 5')
 			problem.add_parameter('p[i,j] = 0.20 if j==0 else 0.30 for i in range(24) for j in range(5)')
+			
+			# load the value from a .npy file or from an array in a .npz file
+			problem.add_parameter('p[i,j] = @file:prices.npy')
+			problem.add_parameter('p[j] = @file:profiles.npz:prices for j in range(8760)')
+			
+		Parameters indexed by ranges, like the examples above, are backed by a
+		numpy array which is the only store of the values. Component data is
+		only created for the indices used in constraints and the objective.
 		"""
 		
-		# parse the rest of the expression
-		(name,indexvalue,value) = parse.variable(expression)
+		with self._measure('parameter') as record:
+			# parse the rest of the expression
+			with self._measure('parse') as parserecord:
+				statement = parse.statement(expression,datadir=self.datadir)
+				ranges = parse.ranges(statement.loops) if len(statement.loops) > 0 else None
+				
+				# the indices of range loops are not listed
+				indexmap = util.RangeIndexMap(ranges) if ranges is not None else None
+				(name,indexvalue,value) = parse.variable(statement,indexvalue=indexmap)
+				record['name'] = parserecord['name'] = name
+			
+			if util.isempty(value):
+				raise ValueError('Parameters are required to have a value. {}'.format(expression))
+			
+			# add the parameter
+			with self._measure('construct',name):
+				self._arrays.pop(name,None)
+				if len(indexvalue)==0:
+					indexmap = util.IndexMap(indexvalue)
+					setattr(self.model, name, self._components.Param(default=value,mutable=True))
+				elif indexmap is None:
+					indexmap = util.IndexMap(indexvalue)
+					setattr(self.model, name, self._components.Param(indexvalue,default=util.initializer(indexvalue,value),mutable=True))
+				else:
+					# the values are looked up in the array by a virtual index set
+					self._arrays[name] = util.ArrayValues(indexmap.array(value))
+					index = None
+					for (start,stop,step),end in zip(ranges,indexmap.shape):
+						rangeset = self._components.RangeSet(start,end-1,step)
+						index = rangeset if index is None else index*rangeset
+					setattr(self.model, name, self._components.Param(index,default=self._arrays[name],mutable=True))
 		
-		if value == []:
-			raise ValueError('Parameters are required to have a value. {}'.format(expression))
+		self.parameters[name] = getattr(self.model, name)
+		self._values.clear()
+		self._indexmaps[name] = indexmap
 		
-		# add the parameter
-		if len(indexvalue)==0:
-			setattr(self.model, name, pm.Param(default=value,mutable=True))
-		else:
-			setattr(self.model, name, pm.Param(indexvalue,default=lambda model,*args: value[args],mutable=True))
+		# parameter data is created on first use, so it is only listed when extracting values
+		self._componentdata.pop(name,None)
 		
-		self.parameters[name] = getattr(self.model, name)
+		# the values are pickled separately, so the data is not kept in the statement
+		self._statements.append(('parameter',statement.declaration(),None))
 		
 		
 		
@@ -153,44 +437,146 @@ class Problem:
 			problem.add_constraint('Tmin <= T[j] for j in range(24)')
 		"""	
 		
-		content,loop,indexlist,indexvalue = parse.for_array_creation(expression)
+		with self._measure('constraint') as record:
+			record['name'] = self._add_constraint(*self._parse_constraint(expression),name=name)
+			
+		self._statements.append(('constraint',expression,name))
 		
-		# parse the equation type
-		(lhs,rhs,type) = parse.equation(content)
-
-		if type == 'E':
-			pmtype = '=='
-		elif type == 'G':
-			pmtype = '>='
-		elif type == 'L':
-			pmtype = '<='			
-		else:
-			raise Exception('A constraint must contain an "=", "<=" or ">=" operator: {}'.format(expression))
 		
-		# add self.model to all variables and parameter in the expression
-		pmexpression = lhs+pmtype+rhs
+	def _parse_constraint(self,expression):
+		"""
+		parses a constraint expression into an (indexlist,indexvalue,code) tuple
+		"""
+		
+		with self._measure('parse'):
+			statement = parse.statement(expression)
+			
+			if statement.relation is None:
+				raise Exception('A constraint must contain an "=", "<=" or ">=" operator: {}'.format(expression))
+			if statement.data is not None:
+				raise ValueError('Data files can only be used in variables and parameters: {}'.format(expression))
+			
+			# compile the expression once to a function of the indices
+			code = expr.code(statement.expression,statement.indexlist)
+			
+			return (statement.indexlist,statement.indexvalue(),code)
+		
+		
+	def _add_constraint(self,indexlist,indexvalue,code,name=None):
+		"""
+		adds a parsed constraint to the model
+		"""
 		
 		# check the constraint name
 		if name==None:
 			name = 'unnamed_constraint{}'.format( len(self.constraints) )
 		
-		# create a vars dict
-		pmvars = dict(self.variables)
-		pmvars.update(self.parameters)
-		pmvars.update(util.specialfunctions)
+		function = expr.function(code,self._namespace())
 		
 		# add the constraint
-		if len(indexvalue)==0:
-			setattr(self.model, name, pm.Constraint(expr=eval(pmexpression,pmvars)))
-		else:
-			def rule(model,*args):
-				indexvars = {key:val for key,val in zip(indexlist,args)}
-				pmvars.update(indexvars)
-				return eval( pmexpression, pmvars )
-				
-			setattr(self.model, name, pm.Constraint(indexvalue,rule=rule))
+		with self._measure('construct',name):
+			if len(indexvalue)==0:
+				setattr(self.model, name, self._components.Constraint(expr=function()))
+			else:
+				setattr(self.model, name, self._components.Constraint(indexvalue,rule=lambda model,*args: function(*args)))
+		
+		self.constraints[name] = getattr(self.model,name)
+		return name
+		
+	def add_linear_constraints(self,variables,matrix,lower=None,upper=None,name=None):
+		"""
+		Adds a block of linear constraints lower <= A*x <= upper where x are
+		the values of the given variables, flattened and concatenated in order
+		
+		The constraints are built directly as linear expressions, without
+		parsing or evaluating an expression for each row. Rows without bounds
+		or without nonzeros are skipped. In json the blocks are given in a
+		linear_constraints section, with the matrix keys in the block.
+		
+		Parameters:
+			variables:		list, the variable names which correspond to the columns
+			matrix:			dict with row, col and data (coo) or indptr, indices and data (csr) lists and an optional shape or a file key with a .npz file, a scipy sparse matrix or a dense numpy array
+			lower:			None, number, list or '@file:' reference, the lower bound of each row
+			upper:			None, number, list or '@file:' reference, the upper bound of each row
+			name:			string, the constraint name
+			
+		Returns:
+			name:			string, the constraint name
+			
+		Example:
+			problem.add_linear_constraints(['x','y'],{'row':[0,0,1], 'col':[0,2,1], 'data':[1.,2.,3.]},upper=[4.,5.])
+			
+			json:
+			"linear_constraints": [
+				{"name": "capacity", "variables": ["x","y"], "format": "csr", "indptr": [0,2,3], "indices": [0,2,1], "data": [1.0,2.0,3.0], "upper": [4.0,5.0]},
+				{"variables": ["x"], "file": "A.npz", "lower": "@file:b.npy"}
+			]
+		"""
+		
+		with self._measure('linear_constraint') as record:
+			(shape,indptr,indices,data) = linear.matrix(matrix,self.datadir)
+			lower = linear.bounds(lower,shape[0],self.datadir)
+			upper = linear.bounds(upper,shape[0],self.datadir)
+			
+			name = self._add_linear_constraints(variables,shape,indptr,indices,data,lower,upper,name)
+			record['name'] = name
+			
+		block = {'name':name, 'variables':list(variables), 'format':'csr', 'shape':list(shape), 'indptr':indptr, 'indices':indices, 'data':data, 'lower':lower, 'upper':upper}
+		self._statements.append(('linear',block,name))
+		
+		return name
+		
+		
+	def _add_linear_block(self,block):
+		"""
+		adds a block of linear constraints from a json linear_constraints section item
+		"""
+		
+		self.add_linear_constraints(block['variables'],block,lower=block.get('lower'),upper=block.get('upper'),name=block.get('name'))
+		
+		
+	def _add_linear_constraints(self,variables,shape,indptr,indices,data,lower,upper,name=None):
+		"""
+		adds linear constraints in compressed sparse row form to the model
+		"""
+		
+		# the variable data of each column
+		columns = []
+		for variable in variables:
+			if not variable in self.variables:
+				raise KeyError('{} is not a variable'.format(variable))
+			var = self.variables[variable]
+			indexmap = self._indexmaps[variable]
+			columns += [var] if indexmap.scalar else [var[key] for key in indexmap.keys]
+			
+		if len(columns) != shape[1]:
+			raise ValueError('The matrix has {} columns but the variables {} have {} values'.format(shape[1],variables,len(columns)))
+			
+		if name==None:
+			name = 'unnamed_constraint{}'.format( len(self.constraints) )
+			
+		LinearExpression = nl.LinearExpression if self._components is nl else pm_expr.LinearExpression
+		
+		indptr = indptr.tolist()
+		indices = indices.tolist()
+		data = data.tolist()
 		
+		def rule(model,i):
+			(start,end) = (indptr[i],indptr[i+1])
+			if start == end or (lower[i] is None and upper[i] is None):
+				return self._components.Constraint.Skip
+				
+			body = LinearExpression(constant=0.,linear_coefs=data[start:end],linear_vars=[columns[k] for k in indices[start:end]])
+			if lower[i] is not None and lower[i] == upper[i]:
+				return body == lower[i]
+			return (lower[i],body,upper[i])
+			
+		with self._measure('construct',name):
+			setattr(self.model, name, self._components.Constraint(range(shape[0]),rule=rule))
+			
 		self.constraints[name] = getattr(self.model,name)
+		return name
+		
 		
 	def set_objective(self,expression):		
 		"""
@@ -203,22 +589,91 @@ class Problem:
 			problem.set_objective('sum(p[j]*P[j] for j in range(24))')
 		"""
 		
-		# create a vars dict
-		pmvars = dict(self.variables)
-		pmvars.update(self.parameters)
-		pmvars.update(util.specialfunctions)
+		with self._measure('objective','objective'):
+			self._set_objective(self._parse_objective(expression))
+			
+		self._statements.append(('objective',expression,None))
 		
-		def rule(model,*args):
-			return eval( expression, pmvars )
-				
-		setattr(self.model, 'objective', pm.Objective(rule=rule))
+		
+	def _parse_objective(self,expression):
+		"""
+		parses and compiles an objective expression
+		"""
+		
+		with self._measure('parse','objective'):
+			return expr.code(parse.statement(expression).expression)
+		
+		
+	def _set_objective(self,code):
+		"""
+		sets a compiled objective expression as the model objective
+		"""
+		
+		function = expr.function(code,self._namespace())
+		
+		with self._measure('construct','objective'):
+			setattr(self.model, 'objective', self._components.Objective(rule=lambda model: function()))
 		self.objective = getattr(self.model,'objective')
+		self._values.clear()
 	
 	
-	def solve(self,solver='ipopt',solveroptions={},verbosity=1):
+	def _measure(self,phase,name=None):
+		"""
+		returns a context manager which records a phase in the stats when they are enabled
+		"""
+		if self.stats is None:
+			return stats_module.disabled
+		return self.stats.measure(phase,name)
+		
+		
+	def _namespace(self):
+		"""
+		returns a new dict with all names which can be used in expressions
+		"""
+		namespace = dict(self.variables)
+		namespace.update(self.parameters)
+		namespace.update(util.specialfunctions)
+		
+		return namespace
+		
+		
+	def solve(self,solver=None,solveroptions={},verbosity=1,warm_start=False):
 		"""
 		solves the problem
+		
+		Parameters:
+			solver:			string, the solver name, defaults to ipopt or to trust-constr for the scipy backend
+			solveroptions:	dict, options passed to the solver
+			verbosity:		int, print the solver output when larger than 0
+			warm_start:		boolean, reuse the solver of the previous solve and start from its solution
+			
+		With warm_start and ipopt, the bound multipliers and constraint duals of
+		the previous solve are passed back to ipopt through the ipopt_zL_in,
+		ipopt_zU_in and dual suffixes of the model and ipopt's warm start
+		options are set unless they are given in solveroptions.
+		
+		With the nl backend the solver executable is called directly on the
+		.nl file with the solveroptions as keyword=value arguments and the
+		solve always starts from the current variable values.
+		
+		With the scipy backend the solver is a scipy.optimize.minimize method,
+		'trust-constr' or 'SLSQP', and the solveroptions are passed as its
+		options.
+		
+		The returned result has the solver status and termination condition,
+		the wall time of the solve and of its write, solver and read phases
+		in result.times and, for ipopt, the number of iterations, the final
+		objective and constraint violation, the cpu time reported by ipopt and
+		the iteration log parsed from its output, also when it is not printed.
+		
+		Returns:
+			result:			jsonopt.stats.SolveResult
 			
+		Example:
+			result = problem.solve(verbosity=0)
+			print(result.termination_condition,result.iterations,result.times['solver'])
+			problem.set_values({'p': p})
+			problem.solve(verbosity=0,warm_start=True)
 		"""
 		
 		# parse inputs
@@ -226,9 +681,204 @@ class Problem:
 		if verbosity>0:
 			tee = True
 			
-		optimizer = pm.SolverFactory(solver)
-		results = optimizer.solve(self.model,options=solveroptions,tee=tee)
+		if solver is None:
+			solver = 'trust-constr' if self.backend == 'scipy' else 'ipopt'
+			
+		self._values.clear()
+		
+		with self._timing() as (stats,times):
+			if self.backend == 'nl':
+				result = self._solve_nl(stats,solver,solveroptions,tee)
+			elif self.backend == 'scipy':
+				result = self._solve_scipy(stats,solver,solveroptions,tee)
+			else:
+				result = self._solve_pyomo(stats,solver,solveroptions,tee,warm_start)
+				
+		result.name = solver
+		result.times = dict(('total' if phase == 'solve' else phase[6:],time) for phase,time in times.items() if phase == 'solve' or phase.startswith('solve.'))
+		return result
+		
+		
+	@contextlib.contextmanager
+	def _timing(self):
+		"""
+		returns a context manager which yields the stats used to measure a
+		solve and a dict which collects the time of each phase measured in it
+		"""
+		
+		stats = self.stats if self.stats is not None else stats_module.Stats()
+		times = {}
+		def hook(record):
+			times[record['phase']] = times.get(record['phase'],0.) + record['time']
+			
+		stats.hooks.append(hook)
+		try:
+			yield (stats,times)
+		finally:
+			stats.hooks.remove(hook)
+			
+			
+	def _solve_pyomo(self,stats,solver,solveroptions,tee,warm_start):
+		"""
+		solves the problem with a pyomo solver
+		"""
+		
+		if warm_start and solver in self._solvers:
+			optimizer = self._solvers[solver]
+		else:
+			optimizer = pm.SolverFactory(solver)
+			self._solvers[solver] = optimizer
+		
+		options = {}
+		kwargs = {}
+		if warm_start:
+			if solver == 'ipopt':
+				self._add_warm_start_suffixes()
+				if self._warm_start:
+					self.model.ipopt_zL_in.update(self.model.ipopt_zL_out)
+					self.model.ipopt_zU_in.update(self.model.ipopt_zU_out)
+					options.update(self.ipopt_warm_start_options)
+			elif optimizer.warm_start_capable():
+				kwargs['warmstart'] = True
+				
+		options.update(solveroptions)
+		
+		with stats.measure('solve'):
+			stats_module.instrument_solver(stats,optimizer)
+			results = optimizer.solve(self.model,options=options,tee=tee,**kwargs)
+		
+		self._warm_start = warm_start and solver == 'ipopt' and results.solver.status == pm.SolverStatus.ok
+		
+		# shell solvers keep their output, also when it is not printed
+		(log,summary) = stats_module.parse_ipopt_log(getattr(optimizer,'_log',None) or '')
+		message = summary.pop('message',None) or getattr(results.solver,'message',None) or ''
+		return stats_module.SolveResult(str(results.solver.status),str(results.solver.termination_condition),str(message),log=log,results=results,**summary)
+		
+		
+	def _solve_nl(self,stats,solver,solveroptions,tee):
+		"""
+		solves the problem by writing an .nl file, running the solver executable on it and reading the .sol file
+		"""
+		
+		directory = tempfile.mkdtemp(prefix='jsonopt')
+		path = os.path.join(directory,'problem.nl')
+		try:
+			with stats.measure('solve'):
+				with stats.measure('solve.write'):
+					(columns,rows) = nl.write(self.model,path)
+				with stats.measure('solve.solver'):
+					output = nl.run(solver,path,solveroptions,tee=tee)
+				if not os.path.exists(os.path.join(directory,'problem.sol')):
+					raise RuntimeError('The solver {} did not write a solution:\n{}'.format(solver,output))
+				with stats.measure('solve.read'):
+					result = nl.read(os.path.join(directory,'problem.sol'),columns)
+		finally:
+			shutil.rmtree(directory)
+			
+		(result.log,summary) = stats_module.parse_ipopt_log(output)
+		summary.pop('message',None)
+		for key,value in summary.items():
+			setattr(result,key,value)
+			
+		return result
+		
+		
+	def _solve_scipy(self,stats,solver,solveroptions,tee):
+		"""
+		solves the problem in process with scipy.optimize.minimize using compiled numpy callbacks
+		"""
+		
+		with stats.measure('solve'):
+			with stats.measure('solve.compile'):
+				problemcallbacks = callbacks.Callbacks(self.model)
+			with stats.measure('solve.solver'):
+				result = callbacks.minimize(problemcallbacks,method=solver,options=solveroptions,disp=tee)
+				
+		return result
+		
+		
+	def reset_warm_start(self):
+		"""
+		stops passing the bound multipliers and constraint duals of the
+		previous solve to the next warm started ipopt solve, which still
+		starts from the current variable values
+		
+		Example:
+			problem.set_values({'T': shifted})
+			problem.reset_warm_start()
+			problem.solve(verbosity=0,warm_start=True)
+		"""
+		
+		self._warm_start = False
+		
+		
+	def _add_warm_start_suffixes(self):
+		"""
+		adds the suffixes to import and export duals and bound multipliers
+		"""
+		
+		if not hasattr(self.model,'ipopt_zL_out'):
+			self.model.ipopt_zL_out = pm.Suffix(direction=pm.Suffix.IMPORT)
+			self.model.ipopt_zU_out = pm.Suffix(direction=pm.Suffix.IMPORT)
+			self.model.ipopt_zL_in = pm.Suffix(direction=pm.Suffix.EXPORT)
+			self.model.ipopt_zU_in = pm.Suffix(direction=pm.Suffix.EXPORT)
+			self.model.dual = pm.Suffix(direction=pm.Suffix.IMPORT_EXPORT)
 	
+	def solve_batch(self,scenarios,workers=None,solver=None,solveroptions={},warm_start=False):
+		"""
+		solves the problem for many parameter scenarios in a pool of worker
+		processes and yields the results in order of completion
+		
+		Each worker receives the problem once. Before a scenario is solved the
+		worker restores the values the problem had when solve_batch was called
+		and applies the scenario with set_values.
+		
+		Parameters:
+			scenarios:		list, a list of dicts with variable or parameter names as keys and numbers or arrays as values
+			workers:		int, the number of worker processes, defaults to the number of cpus
+			solver:			string, the solver name, defaults to ipopt or to trust-constr for the scipy backend
+			solveroptions:	dict, options passed to the solver
+			warm_start:		boolean, warm start each solve of a worker from its previous solve
+			
+		Returns:
+			generator of (index,values,status) tuples with the index of the scenario, a dict with the values of all variables, the objective and the solve result as a dict under 'result', and the solver status as a string
+			
+		Example:
+			for index,values,status in problem.solve_batch([{'p':p1},{'p':p2}],workers=2):
+				print(index,values['objective'],values['result']['iterations'])
+		"""
+		
+		return parallel.solve_batch(self,scenarios,workers=workers,solver=solver,solveroptions=solveroptions,warm_start=warm_start)
+		
+		
+	def solve_async(self,solver=None,solveroptions={},timeout=None):
+		"""
+		starts solving the problem in a separate process and returns immediately
+		
+		The returned future can be waited for with its result method or a done
+		callback. It is not an asyncio future, asyncio integration is not
+		provided. When the solve finishes the variable values are loaded into
+		the problem. The number of solves running at the same time is limited,
+		see jsonopt.parallel.set_max_concurrent_solves.
+		
+		Parameters:
+			solver:			string, the solver name, defaults to ipopt or to trust-constr for the scipy backend
+			solveroptions:	dict, options passed to the solver
+			timeout:		float, terminate the solve after this many seconds
+			
+		Returns:
+			future:			jsonopt.parallel.SolveFuture
+			
+		Example:
+			status = problem.solve_async(timeout=60).result()
+			
+			future = problem.solve_async()
+			future.cancel()
+		"""
+		
+		return parallel.SolveFuture(self,solver=solver,solveroptions=solveroptions,timeout=timeout)
+		
+		
 	def get_variable(self,name):
 		"""
 		gets a variable
@@ -260,6 +910,8 @@ class Problem:
 			problem.set_value('x[3]',1)
 		"""
 		
+		self._values.clear()
+		
 		# check if the name is an indexed string
 		(varname,indexlist) = parse.indexed_expression(name)
 		var = self.get_variable(varname)
@@ -272,45 +924,195 @@ class Problem:
 			except:
 				var[eval('(' + ','.join(indexlist) + ',)')].value = value
 
-				
-	def get_value(self,name):
+	
+	def set_values(self,values):
 		"""
-		gets the value of a variable or parameter
+		sets the values of whole variables or parameters at once
+		
+		Indexed variables and parameters require an array with the shape
+		returned by get_value or a scalar which is assigned to all indices.
+		For variables the values are used as initial guess.
 		
 		Parameters:
-			name:		string
+			values:		dict, variable or parameter names as keys and numbers or arrays as values
+		
+		Example:
+			problem.set_values({'p': np.ones(24), 'A': 5.0})
+			problem['p'] = np.ones(24)
+			problem.p[...] = np.ones(24)
 		"""
 		
-		var = self.get_variable(name)
-	
-		if len(var)==1:
-			if var.__class__.__name__== 'SimpleObjective':
-				return var.expr()
+		self._values.clear()
+		
+		for name,value in values.items():
+			var = self.get_variable(name)
+			indexmap = self._indexmaps.get(name)
+			
+			if indexmap is None:
+				raise KeyError('{} is not a variable or parameter'.format(name))
+			
+			if indexmap.scalar:
+				var.set_value(np.asarray(value).item())
+			elif name in self._arrays:
+				self._set_array(name,indexmap.broadcast(value))
 			else:
-				return var.value
+				data = dict(zip(indexmap.keys,indexmap.values(value)))
+				if name in self.parameters:
+					var.store_values(data,check=False)
+				else:
+					var.set_values(data)
+					
+				
+	def update_parameters(self,parameters):
+		"""
+		replaces the values of existing parameters in place, without rebuilding
+		the model
+		
+		Parameters are given as statements in the add_parameter syntax or as
+		arrays. Statements must define the same index set as the parameter,
+		arrays must have the shape returned by get_value. All updates are
+		checked before any parameter is changed.
+		
+		Parameters:
+			parameters:		json string, dict or list, a json object with a parameters list, a list of statements or a dict with parameter names as keys and statements, numbers or arrays as values
+			
+		Example:
+			problem.update_parameters('{"parameters": ["p[j] = 0.30 for j in range(24)", "C = 2e6"]}')
+			problem.update_parameters(['p[j] = 0.25 if j < 12 else 0.35 for j in range(24)'])
+			problem.update_parameters({'p': np.ones(24), 'Ta': 'Ta[j] = 5.0 for j in range(24)'})
+			problem.solve(warm_start=True)
+		"""
+		
+		if isinstance(parameters,(str,type(u''))):
+			parameters = json.loads(parameters)
+		if isinstance(parameters,dict) and 'parameters' in parameters and isinstance(parameters['parameters'],list):
+			parameters = parameters['parameters']
+		if isinstance(parameters,dict):
+			parameters = list(parameters.items())
 		else:
-			dim = var.keys()[0]
-			if isinstance( dim, int ):
-				dim = [dim]
+			parameters = [(None,expression) for expression in parameters]
+			
+		# check all updates before changing the model
+		updates = []
+		for name,value in parameters:
+			if isinstance(value,(str,type(u''))):
+				with self._measure('parse') as record:
+					statement = parse.statement(value,datadir=self.datadir)
+					indexmap = self._indexmaps.get(statement.target)
+					if not isinstance(indexmap,util.RangeIndexMap) or parse.ranges(statement.loops) != indexmap.ranges:
+						indexmap = None
+					(target,indexvalue,value) = parse.variable(statement,indexvalue=indexmap)
+					record['name'] = target
+					
+				if name is not None and target != name:
+					raise ValueError('The statement {} does not define {}'.format(statement.source,name))
+				if not target in self.parameters:
+					raise KeyError('{} is not a parameter'.format(target))
+				if util.isempty(value):
+					raise ValueError('Parameters are required to have a value. {}'.format(statement.source))
+					
+				indexmap = self._indexmaps[target]
+				if indexmap.scalar:
+					if len(indexvalue) > 0:
+						raise ValueError('{} is a scalar parameter but the statement defines an index set: {}'.format(target,statement.source))
+					data = value
+				elif target in self._arrays:
+					if parse.ranges(statement.loops) != indexmap.ranges and list(indexvalue) != list(indexmap.keys):
+						raise ValueError('The index set of {} does not match the index set of the parameter'.format(statement.source))
+					data = indexmap.array(value)
+				else:
+					if list(indexvalue) != list(indexmap.keys):
+						raise ValueError('The index set of {} does not match the index set of the parameter'.format(statement.source))
+					data = util.initializer(indexvalue,value)
+					
+			else:
+				target = name
+				if not target in self.parameters:
+					raise KeyError('{} is not a parameter'.format(target))
+					
+				indexmap = self._indexmaps[target]
+				if indexmap.scalar:
+					data = np.asarray(value).item()
+				elif target in self._arrays:
+					data = indexmap.broadcast(value)
+				else:
+					data = dict(zip(indexmap.keys,indexmap.values(value)))
+					
+			updates.append((target,data))
+			
+		self._values.clear()
+		for name,data in updates:
+			if self._indexmaps[name].scalar:
+				self.parameters[name].set_value(data)
+			elif name in self._arrays:
+				self._set_array(name,data)
 			else:
-				dim = list(dim)
+				self.parameters[name].store_values(data,check=False)
 				
-			for k in var.keys():
-				if isinstance( k, int ):
-					k = (k,)
 				
-				for i,v in enumerate(k):
-					if v+1 > dim[i]:
-						dim[i] = v+1
+	def _set_array(self,name,array):
+		"""
+		replaces the array of an array backed parameter and updates the component data which was created from it
+		"""
+		
+		self._arrays[name].array = array
+		param = self.parameters[name]
+		param.store_values(dict((key,float(array[key])) for key in param.sparse_keys()),check=False)
 			
-
-			value = np.zeros(dim)
-			for key in var.keys():
-				try:
-					value[key] = var[key].value
-				except:
-					value[key] = var[key]
 				
+	def get_value(self,name):
+		"""
+		gets the value of a variable or parameter
+		
+		Values are extracted from the model in bulk and cached until they are
+		changed through the problem, by solve, set_value or set_values.
+		
+		Parameters:
+			name:		string
+		"""
+		
+		value = self._value(name)
+		if isinstance(value,np.ndarray):
+			value = value.copy()
+			
+		return value
+		
+		
+	def _value(self,name):
+		"""
+		returns the cached value of a variable, parameter or the objective without copying it
+		"""
+		
+		if not name in self._values:
+			with self._measure('extract',name):
+				self._values[name] = self._extract_value(name)
+			
+		return self._values[name]
+		
+		
+	def _extract_value(self,name):
+		"""
+		extracts the value of a variable, parameter or the objective from the model
+		"""
+		
+		var = self.get_variable(name)
+		
+		if var is self.objective:
+			return self._components.value(var)
+		
+		indexmap = self._indexmaps[name]
+		if indexmap.scalar:
+			return var.value
+		elif name in self._arrays:
+			return self._arrays[name].array
+		else:
+			data = self._componentdata.get(name)
+			if data is None:
+				data = self._componentdata[name] = [var[key] for key in indexmap.keys]
+			value = np.zeros(indexmap.shape)
+			# uninitialized values are None, which becomes nan
+			value[indexmap.positions] = np.array([d.value for d in data],dtype=float)
+			
 			return value
 			
 			
@@ -351,9 +1153,119 @@ class Problem:
 		return json.dumps(values)
 	
 	
+	def save_solution(self,path,format='npz',chunksize=1<<16):
+		"""
+		writes the values of all variables and parameters and the objective to a file
+		
+		The npz format stores the arrays directly. The json format writes a
+		single object like get_json_values and the jsonl format writes a
+		{"name": ..., "value": ...} object per line. The json formats are
+		written one component at a time, converting at most chunksize values
+		to text at once.
+		
+		Parameters:
+			path:			string or file like object
+			format:			string, 'npz', 'json' or 'jsonl'
+			chunksize:		int, the maximum number of array elements converted to text at a time
+			
+		Example:
+			problem.solve()
+			problem.save_solution('solution.npz')
+			problem.save_solution('solution.jsonl',format='jsonl')
+		"""
+		
+		writers = {'npz':solution.write_npz, 'json':solution.write_json, 'jsonl':solution.write_jsonl}
+		if not format in writers:
+			raise ValueError('The format {} is not supported. Supported formats are:\n{}'.format(format,sorted(writers.keys())))
+		
+		names = sorted(self.variables) + sorted(self.parameters) + ['objective']
+		values = ((name,self._value(name)) for name in names)
+		
+		with self._measure('save_solution'):
+			if format == 'npz':
+				solution.write_npz(path,values)
+			elif hasattr(path,'write'):
+				writers[format](path,values,chunksize=chunksize)
+			else:
+				with open(path,'w') as fileobj:
+					writers[format](fileobj,values,chunksize=chunksize)
+				
+				
+	def __getstate__(self):
+		# pickle the statements and the current values instead of the pyomo model
+		values = {}
+		for name in self._indexmaps:
+			var = self.get_variable(name)
+			if name in self._arrays:
+				values[name] = self._arrays[name].array
+			else:
+				values[name] = {key:data.value for key,data in var.iteritems()}
+		
+		return {'statements':self._statements, 'values':values, 'datadir':self.datadir, 'backend':self.backend}
+		
+	def __setstate__(self,state):
+		self.__init__(datadir=state.get('datadir'),backend=state.get('backend','pyomo'))
+		
+		for (kind,expression,name) in state['statements']:
+			if kind == 'variable':
+				self.add_variable(expression)
+			elif kind == 'parameter':
+				self.add_parameter(expression)
+			elif kind == 'constraint':
+				self.add_constraint(expression,name=name)
+			elif kind == 'linear':
+				self._add_linear_block(expression)
+			elif kind == 'objective':
+				self.set_objective(expression)
+				
+		for name,data in state['values'].items():
+			var = self.get_variable(name)
+			if name in self._arrays:
+				self._set_array(name,data)
+			elif name in self.parameters:
+				var.store_values(data,check=False)
+			else:
+				for key,value in data.items():
+					if value is not None:
+						var[key].value = value
+						
 	def __getitem__(self,name):
 		return self.get_value(name)
+		
+	def __setitem__(self,name,value):
+		self.set_values({name:value})
 			
 	def __getattr__(self,name):
-		return self.get_value(name)
+		if name.startswith('_'):
+			raise AttributeError(name)
+			
+		value = self.get_value(name)
+		if name in self._indexmaps and isinstance(value,np.ndarray):
+			# allow problem.p[...] = array
+			value = value.view(ValueArray)
+			value._problem = self
+			value._name = name
+			
+		return value
+		
+
+class ValueArray(np.ndarray):
+	"""
+	Array of variable or parameter values which writes assignments back to
+	the problem
+	
+	Example:
+		problem.p[...] = np.ones(24)
+		problem.p[3] = 0.5
+	"""
+	
+	def __array_finalize__(self,obj):
+		# arrays derived from a value array do not write back
+		self._problem = None
+		self._name = None
+		
+	def __setitem__(self,index,value):
+		np.ndarray.__setitem__(self,index,value)
+		if self._problem is not None:
+			self._problem.set_values({self._name:np.asarray(self)})
 	
\ No newline at end of file
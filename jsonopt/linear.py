@@ -0,0 +1,150 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright 2016 Brecht Baeten
+#    This file is part of jsonopt.
+#
+#    jsonopt is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    jsonopt is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with jsonopt.  If not, see <http://www.gnu.org/licenses/>.
+################################################################################
+
+import os
+import numpy as np
+
+import util
+
+def matrix(spec,datadir=None):
+	"""
+	converts a sparse matrix specification to compressed sparse row arrays
+	
+	The specification is a dict in coordinate format with row, col and data
+	lists, or in compressed sparse row format with indptr, indices and data
+	lists, an optional shape and an optional format ('coo' or 'csr', derived
+	from the keys when omitted). The arrays can also be loaded from a .npz
+	file given by a file key, for instance one written by scipy.sparse.save_npz.
+	Dense numpy arrays and objects with a tocsr method, like scipy sparse
+	matrices, are also accepted.
+	
+	Parameters:
+		spec: 			dict, numpy.array or scipy sparse matrix
+		datadir: 		string, the directory of a relative file path
+		
+	Returns:
+		shape: 			tuple, the number of rows and columns
+		indptr: 		numpy.array, the start of each row in indices and data
+		indices: 		numpy.array, column indices
+		data: 			numpy.array, values
+		
+	Example:
+		(shape,indptr,indices,data) = jsonopt.linear.matrix({'row':[0,0,1], 'col':[0,2,1], 'data':[1.,2.,3.]})
+	"""
+	
+	if hasattr(spec,'tocsr'):
+		spec = spec.tocsr()
+		return (tuple(spec.shape),np.asarray(spec.indptr),np.asarray(spec.indices),np.asarray(spec.data,dtype=float))
+		
+	if isinstance(spec,np.ndarray):
+		(row,col) = np.nonzero(spec)
+		return _coo(spec.shape,row,col,spec[row,col])
+		
+	spec = dict(spec)
+	if 'file' in spec:
+		data = np.load(spec['file'] if datadir is None else os.path.join(datadir,spec['file']))
+		with data:
+			for key in data.files:
+				if not key in spec:
+					spec[key] = data[key]
+					
+	format = spec.get('format')
+	if isinstance(format,np.ndarray):
+		format = format.item()
+	if isinstance(format,bytes) and not isinstance(format,str):
+		format = format.decode()
+	if format is None:
+		format = 'csr' if 'indptr' in spec else 'coo'
+		
+	shape = spec.get('shape')
+	if shape is not None:
+		shape = tuple(int(s) for s in np.asarray(shape).ravel())
+		
+	if format == 'coo':
+		row = np.asarray(spec['row'],dtype=int)
+		col = np.asarray(spec['col'],dtype=int)
+		if shape is None:
+			shape = (int(row.max())+1 if row.size > 0 else 0, int(col.max())+1 if col.size > 0 else 0)
+		return _coo(shape,row,col,spec['data'])
+		
+	elif format == 'csr':
+		indptr = np.asarray(spec['indptr'],dtype=int)
+		indices = np.asarray(spec['indices'],dtype=int)
+		data = np.asarray(spec['data'],dtype=float)
+		if shape is None:
+			shape = (len(indptr)-1, int(indices.max())+1 if indices.size > 0 else 0)
+		if len(indptr) != shape[0]+1 or indptr[-1] != len(indices) or len(indices) != len(data):
+			raise ValueError('Inconsistent csr matrix with shape {}, {} row pointers, {} indices and {} values'.format(shape,len(indptr),len(indices),len(data)))
+		_check_columns(shape,indices)
+		return (shape,indptr,indices,data)
+		
+	else:
+		raise ValueError('The matrix format {} is not supported, use coo or csr'.format(format))
+		
+		
+def _coo(shape,row,col,data):
+	"""
+	converts coordinate arrays to compressed sparse row arrays
+	"""
+	
+	row = np.asarray(row,dtype=int)
+	col = np.asarray(col,dtype=int)
+	data = np.asarray(data,dtype=float)
+	if not len(row) == len(col) == len(data):
+		raise ValueError('Inconsistent coo matrix with {} rows, {} columns and {} values'.format(len(row),len(col),len(data)))
+	if row.size > 0 and (row.min() < 0 or row.max() >= shape[0]):
+		raise ValueError('Row indices out of range for shape {}'.format(shape))
+	_check_columns(shape,col)
+		
+	order = np.argsort(row,kind='mergesort')
+	indptr = np.concatenate(([0],np.cumsum(np.bincount(row,minlength=shape[0]))))
+	
+	return (tuple(shape),indptr,col[order],data[order])
+	
+	
+def _check_columns(shape,indices):
+	if indices.size > 0 and (indices.min() < 0 or indices.max() >= shape[1]):
+		raise ValueError('Column indices out of range for shape {}'.format(shape))
+		
+		
+def bounds(value,rows,datadir=None):
+	"""
+	converts a constraint bound to a list with a float or None for each row
+	
+	Parameters:
+		value: 			None, number, list or numpy.array or an '@file:' reference, None, nan and infinite values are no bound
+		rows: 			int, the number of rows
+		datadir: 		string, the directory of a relative file path
+	"""
+	
+	if value is None:
+		return [None]*rows
+		
+	if isinstance(value,(str,type(u''))):
+		if not value.strip().startswith('@file:'):
+			raise ValueError('Bounds must be numbers, lists or @file: references, not {}'.format(value))
+		value = util.load(value.strip()[6:],datadir)
+		
+	value = np.asarray(value,dtype=float)
+	if value.ndim > 0 and value.shape != (rows,):
+		raise ValueError('The bound shape {} does not match the number of rows {}'.format(value.shape,rows))
+		
+	# None in a list becomes nan, infinite and nan bounds are omitted
+	value = np.broadcast_to(value,(rows,))
+	return [v if finite else None for v,finite in zip(value.tolist(),np.isfinite(value).tolist())]
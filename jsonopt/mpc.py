@@ -0,0 +1,154 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright 2016 Brecht Baeten
+#    This file is part of jsonopt.
+#
+#    jsonopt is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    jsonopt is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with jsonopt.  If not, see <http://www.gnu.org/licenses/>.
+################################################################################
+
+import time
+
+import numpy as np
+
+
+class MPC(object):
+	"""
+	Receding horizon driver which shifts the time indexed variables and
+	parameters of a problem and solves it again at every step
+
+	The values are changed in place with set_values, so the model is built
+	only once and each solve can be warm started from the previous one.
+	Only the primal values are shifted, so the ipopt bound multipliers and
+	constraint duals of the previous solve are not passed on after a shift.
+	"""
+
+	def __init__(self,problem,timeindexed,axis=0,solver=None,solveroptions={},warm_start=True):
+		"""
+		Parameters:
+			problem:		jsonopt.Problem
+			timeindexed:	list or dict, the names of the time indexed variables and parameters or a dict with the names as keys and the time axis of each as values
+			axis:			int, the time axis of the names given in a list
+			solver:			string, the solver name, defaults to the default of problem.solve
+			solveroptions:	dict, options passed to the solver
+			warm_start:		boolean, reuse the solver and start each solve from the shifted solution of the previous one
+
+		Example:
+			mpc = jsonopt.mpc.MPC(problem,['T','P','Q','COP','p','Ta'])
+		"""
+
+		self.problem = problem
+		if isinstance(timeindexed,dict):
+			self.timeindexed = dict(timeindexed)
+		else:
+			self.timeindexed = dict((name,axis) for name in timeindexed)
+		self.solver = solver
+		self.solveroptions = solveroptions
+		self.warm_start = warm_start
+
+		for name,axis in self.timeindexed.items():
+			shape = np.shape(problem.get_value(name))
+			if not -len(shape) <= axis < len(shape):
+				raise ValueError('{} has no time axis {}, its shape is {}'.format(name,axis,shape))
+
+		self.steps = 0
+		self.log = []
+
+	def shift(self,forecasts={},steps=1):
+		"""
+		shifts the values of all time indexed variables and parameters by a
+		number of steps, the last value is repeated at the end unless a
+		forecast is given
+
+		Parameters:
+			forecasts:		dict, names as keys and the values of the last steps time indices, with a shape which broadcasts to the shifted in part, or of the whole horizon as values
+			steps:			int, the number of time steps to shift
+
+		Example:
+			mpc.shift({'p':[0.25], 'Ta':[4.2]})
+		"""
+
+		for name in forecasts:
+			if not name in self.timeindexed:
+				raise KeyError('{} is not time indexed'.format(name))
+
+		values = {}
+		for name,axis in self.timeindexed.items():
+			value = np.asarray(self.problem.get_value(name),dtype=float)
+			if np.all(np.isnan(value)) and not name in forecasts:
+				# variables without values stay without values
+				continue
+			length = value.shape[axis]
+			shift = min(steps,length)
+			tail = np.take(value,[length-1]*shift,axis=axis)
+			if name in forecasts:
+				forecast = np.asarray(forecasts[name],dtype=float)
+				if forecast.shape == value.shape:
+					values[name] = forecast
+					continue
+				tail = np.broadcast_to(forecast,tail.shape)
+			values[name] = np.concatenate([np.take(value,range(shift,length),axis=axis),tail],axis=axis)
+
+		self.problem.set_values(values)
+		self.steps += steps
+		
+		# the multipliers of the previous solve belong to the unshifted time indices
+		self.problem.reset_warm_start()
+
+	def solve(self,verbosity=0):
+		"""
+		solves the problem and records the step, the solve time, the solver
+		status, the number of iterations and the objective in the log
+
+		Returns:
+			results:		the results of problem.solve
+		"""
+
+		t0 = time.time()
+		kwargs = {} if self.solver is None else {'solver':self.solver}
+		results = self.problem.solve(solveroptions=self.solveroptions,verbosity=verbosity,warm_start=self.warm_start,**kwargs)
+		t1 = time.time()
+
+		self.log.append({
+			'step': self.steps,
+			'time': t1-t0,
+			'status': str(results.solver.termination_condition),
+			'iterations': results.iterations,
+			'objective': self.problem.get_value('objective'),
+		})
+		return results
+
+	def step(self,forecasts={},measurements={},steps=1,verbosity=0):
+		"""
+		shifts the horizon, applies measured values and solves the problem
+
+		Parameters:
+			forecasts:		dict, the forecast tails of time indexed names as in shift
+			measurements:	dict, values passed to problem.set_values after shifting, like the measured initial state as a parameter
+			steps:			int, the number of time steps to shift
+			verbosity:		int, print the solver output when larger than 0
+
+		Returns:
+			results:		the results of problem.solve
+
+		Example:
+			mpc.solve()
+			for k in range(24):
+				mpc.step({'p':[prices[24+k]], 'Ta':[forecast[24+k]]},{'T0':measured[k]})
+				control = mpc.problem.get_value('P')[0]
+		"""
+
+		self.shift(forecasts,steps=steps)
+		if len(measurements) > 0:
+			self.problem.set_values(measurements)
+		return self.solve(verbosity=verbosity)
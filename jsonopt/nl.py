@@ -0,0 +1,1202 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright 2016 Brecht Baeten
+#    This file is part of jsonopt.
+#
+#    jsonopt is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    jsonopt is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with jsonopt.  If not, see <http://www.gnu.org/licenses/>.
+################################################################################
+
+# A lightweight model which is written directly to an AMPL .nl file and
+# solved by calling an AMPL solver executable, like ipopt, without pyomo.
+# The components implement the part of the pyomo component interface which is
+# used by jsonopt.Problem.
+
+from __future__ import division
+import sys
+import math
+import itertools
+import subprocess
+import numpy as np
+
+try:
+	from shutil import which
+except ImportError:
+	# python 2
+	from distutils.spawn import find_executable as which
+
+import stats
+
+
+class Domain(object):
+	"""
+	The domain of a variable
+	"""
+
+	def __init__(self,name,lb=None,ub=None,kind='continuous'):
+		"""
+		Parameters:
+			name: 			string, the domain name
+			lb: 			number or None, the lower bound
+			ub: 			number or None, the upper bound
+			kind: 			string, 'continuous', 'binary' or 'integer'
+		"""
+		self.name = name
+		self.lb = lb
+		self.ub = ub
+		self.kind = kind
+
+	def __repr__(self):
+		return self.name
+
+
+Reals = Domain('Reals')
+PositiveReals = Domain('PositiveReals',lb=0)
+NonPositiveReals = Domain('NonPositiveReals',ub=0)
+NegativeReals = Domain('NegativeReals',ub=0)
+NonNegativeReals = Domain('NonNegativeReals',lb=0)
+PercentFraction = Domain('PercentFraction',lb=0,ub=1)
+UnitInterval = Domain('UnitInterval',lb=0,ub=1)
+Integers = Domain('Integers',kind='integer')
+PositiveIntegers = Domain('PositiveIntegers',lb=1,kind='integer')
+NonPositiveIntegers = Domain('NonPositiveIntegers',ub=0,kind='integer')
+NegativeIntegers = Domain('NegativeIntegers',ub=-1,kind='integer')
+NonNegativeIntegers = Domain('NonNegativeIntegers',lb=0,kind='integer')
+Boolean = Domain('Boolean',lb=0,ub=1,kind='binary')
+Binary = Domain('Binary',lb=0,ub=1,kind='binary')
+
+domains = sorted(name for name,value in globals().items() if isinstance(value,Domain))
+
+
+################################################################################
+# expressions
+################################################################################
+class Expression(object):
+	"""
+	Base class of expression nodes, python operators on nodes create new nodes
+	"""
+
+	__slots__ = ()
+	__array_priority__ = 100
+	__hash__ = object.__hash__
+
+	def __add__(self,other):
+		if _iszero(other):
+			return self
+		return Sum([self,other])
+
+	def __radd__(self,other):
+		if _iszero(other):
+			return self
+		return Sum([other,self])
+
+	def __sub__(self,other):
+		if _iszero(other):
+			return self
+		return Sum([self,-other])
+
+	def __rsub__(self,other):
+		return Sum([other,Negation(self)])
+
+	def __mul__(self,other):
+		return Product(self,other)
+
+	def __rmul__(self,other):
+		return Product(other,self)
+
+	def __truediv__(self,other):
+		return Division(self,other)
+
+	def __rtruediv__(self,other):
+		return Division(other,self)
+
+	__div__ = __truediv__
+	__rdiv__ = __rtruediv__
+
+	def __pow__(self,other):
+		return Power(self,other)
+
+	def __rpow__(self,other):
+		return Power(other,self)
+
+	def __neg__(self):
+		return Negation(self)
+
+	def __pos__(self):
+		return self
+
+	def __abs__(self):
+		return Function('abs',self)
+
+	def __eq__(self,other):
+		return Relation(self,other,'E')
+
+	def __ge__(self,other):
+		return Relation(self,other,'G')
+
+	def __le__(self,other):
+		return Relation(self,other,'L')
+
+	# called by numpy functions on object arrays and by jsonopt.util.specialfunctions
+	def sin(self):
+		return Function('sin',self)
+
+	def cos(self):
+		return Function('cos',self)
+
+	def tan(self):
+		return Function('tan',self)
+
+	def arcsin(self):
+		return Function('asin',self)
+
+	def arccos(self):
+		return Function('acos',self)
+
+	def arctan(self):
+		return Function('atan',self)
+
+	def exp(self):
+		return Function('exp',self)
+
+	def log(self):
+		return Function('log',self)
+
+	def sqrt(self):
+		return Function('sqrt',self)
+
+	def is_indexed(self):
+		return False
+
+
+class Sum(Expression):
+	"""
+	n-ary sum, sums which are extended share the argument list so building a
+	sum term by term takes linear time
+	"""
+
+	__slots__ = ('args','nargs')
+
+	def __init__(self,args,nargs=None):
+		self.args = args
+		self.nargs = len(args) if nargs is None else nargs
+
+	def _append(self,other):
+		if self.nargs == len(self.args):
+			self.args.append(other)
+			return Sum(self.args,self.nargs+1)
+		return Sum(self.args[:self.nargs]+[other])
+
+	def __add__(self,other):
+		if _iszero(other):
+			return self
+		return self._append(other)
+
+	def __sub__(self,other):
+		if _iszero(other):
+			return self
+		return self._append(-other)
+
+	def terms(self):
+		return self.args[:self.nargs]
+
+
+class Product(Expression):
+	__slots__ = ('left','right')
+
+	def __init__(self,left,right):
+		self.left = left
+		self.right = right
+
+
+class Division(Expression):
+	__slots__ = ('left','right')
+
+	def __init__(self,left,right):
+		self.left = left
+		self.right = right
+
+
+class Power(Expression):
+	__slots__ = ('left','right')
+
+	def __init__(self,left,right):
+		self.left = left
+		self.right = right
+
+
+class Negation(Expression):
+	__slots__ = ('arg',)
+
+	def __init__(self,arg):
+		self.arg = arg
+
+	def __neg__(self):
+		return self.arg
+
+
+class Function(Expression):
+	__slots__ = ('name','arg')
+
+	def __init__(self,name,arg):
+		self.name = name
+		self.arg = arg
+
+
+class LinearExpression(Expression):
+	"""
+	a linear expression given by its coefficients and variables
+	"""
+
+	__slots__ = ('constant','linear_coefs','linear_vars')
+
+	def __init__(self,constant=0.,linear_coefs=[],linear_vars=[]):
+		self.constant = constant
+		self.linear_coefs = linear_coefs
+		self.linear_vars = linear_vars
+
+
+class Relation(object):
+	"""
+	an equality or inequality between two expressions
+	"""
+
+	__slots__ = ('lhs','rhs','relation')
+
+	def __init__(self,lhs,rhs,relation):
+		self.lhs = lhs
+		self.rhs = rhs
+		self.relation = relation
+
+	def __nonzero__(self):
+		raise TypeError('A relation between expressions has no truth value')
+
+	__bool__ = __nonzero__
+
+
+def _iszero(value):
+	return type(value) in _numbers and value == 0
+
+# numpy scalars, like the values of jsonopt.util.specialfunctions, are constants too
+_integers = (int,type(1<<64)) + tuple(set([np.int8,np.int16,np.int32,np.int64,np.intc,np.int_,np.longlong,np.uint8,np.uint16,np.uint32,np.uint64]))
+_numbers = _integers + (float,np.float16,np.float32,np.float64)
+
+
+################################################################################
+# components
+################################################################################
+class ConcreteModel(object):
+	"""
+	Model which holds the components in the order they are added
+	"""
+
+	def __init__(self):
+		object.__setattr__(self,'_components',[])
+
+	def __setattr__(self,name,value):
+		if isinstance(value,_Component):
+			value._construct(self,name)
+			self._components.append(value)
+		object.__setattr__(self,name,value)
+
+	def components(self,cls):
+		"""
+		returns the components of a class in the order they were added
+		"""
+		return [component for component in self._components if isinstance(component,cls)]
+
+
+class _Component(object):
+	"""
+	Base class of components which are constructed when added to a model
+	"""
+
+	def _construct(self,model,name):
+		self.name = name
+
+	def is_indexed(self):
+		return True
+
+	def __getitem__(self,key):
+		try:
+			return self._data[key]
+		except KeyError:
+			raise KeyError('Index {} is not valid for {}'.format(key,self.name))
+
+	def iteritems(self):
+		return ((key,self._data[key]) for key in self._index)
+
+	def values(self):
+		return [self._data[key] for key in self._index]
+
+	def label(self,key):
+		"""
+		returns the name of the component data with a key
+		"""
+		return '{}[{}]'.format(self.name,','.join(str(k) for k in key) if isinstance(key,tuple) else key)
+
+
+def _values(index,initialize):
+	"""
+	returns a list with the initial value for each index
+	"""
+	if isinstance(initialize,dict):
+		return [initialize.get(key) for key in index]
+	return [initialize]*len(index)
+
+
+class VarData(Expression):
+	"""
+	a single variable
+	"""
+
+	__slots__ = ('value','domain','parent','index')
+
+	def __init__(self,value=None,domain=Reals,parent=None,index=None):
+		self.value = value
+		self.domain = domain
+		self.parent = parent
+		self.index = index
+
+	def set_value(self,value):
+		self.value = value
+
+	def label(self):
+		return self.parent.label(self.index)
+
+
+class ParamData(Expression):
+	"""
+	a single mutable parameter
+	"""
+
+	__slots__ = ('value',)
+
+	def __init__(self,value=None):
+		self.value = value
+
+	def set_value(self,value):
+		self.value = value
+
+
+class IndexedVar(_Component):
+	def __init__(self,index,domain=Reals,initialize=None):
+		self._index = index
+		self._data = dict((key,VarData(value,domain,self,key)) for key,value in zip(index,_values(index,initialize)))
+
+	def set_values(self,values):
+		for key,value in values.items():
+			self._data[key].value = value
+
+
+class IndexedParam(_Component):
+	def __init__(self,index,initialize=None):
+		self._index = index
+		if isinstance(index,_Set):
+			# the values are looked up in initialize and data is created on access
+			self._default = initialize
+			self._data = {}
+		else:
+			self._data = dict((key,ParamData(value)) for key,value in zip(index,_values(index,initialize)))
+
+	def __getitem__(self,key):
+		try:
+			return self._data[key]
+		except KeyError:
+			if not isinstance(self._index,_Set) or not key in self._index:
+				raise KeyError('Index {} is not valid for {}'.format(key,self.name))
+			data = self._data[key] = ParamData(self._default[key])
+			return data
+
+	def iteritems(self):
+		return ((key,self[key]) for key in self._index)
+
+	def sparse_keys(self):
+		# the keys of the data which has been created
+		return list(self._data.keys())
+
+	def values(self):
+		return [self[key] for key in self._index]
+
+	def store_values(self,values,check=True):
+		for key,value in values.items():
+			self[key].value = value
+
+
+def Var(*index,**kwargs):
+	"""
+	creates a variable
+
+	Parameters:
+		index: 			list, the indices of an indexed variable
+		domain: 		Domain, the domain of the variable
+		initialize: 	number or dict, the initial value or a dict with the initial value of each index
+
+	Example:
+		model.x = jsonopt.nl.Var(range(24),domain=jsonopt.nl.NonNegativeReals,initialize=0.)
+	"""
+
+	domain = kwargs.get('domain',Reals)
+	initialize = kwargs.get('initialize')
+
+	if len(index) == 0:
+		return _ScalarVar(initialize,domain)
+	return IndexedVar(list(index[0]),domain=domain,initialize=initialize)
+
+
+def Param(*index,**kwargs):
+	"""
+	creates a mutable parameter
+
+	Parameters:
+		index: 			list or RangeSet, the indices of an indexed parameter
+		default: 		number or dict, the value or a dict with the value of each index
+
+	Example:
+		model.p = jsonopt.nl.Param(range(24),default=0.2)
+		model.q = jsonopt.nl.Param(jsonopt.nl.RangeSet(0,23),default=jsonopt.util.ArrayValues(np.ones(24)))
+	"""
+
+	value = kwargs.get('initialize',kwargs.get('default'))
+
+	if len(index) == 0:
+		return _ScalarParam(value)
+	if isinstance(index[0],_Set):
+		return IndexedParam(index[0],initialize=value)
+	return IndexedParam(list(index[0]),initialize=value)
+
+
+class _Set(object):
+	"""
+	Base class of index sets which do not store their members
+	"""
+
+	def __mul__(self,other):
+		return _SetProduct(self._sets()+other._sets())
+
+	def _sets(self):
+		return [self]
+
+
+class RangeSet(_Set):
+	"""
+	a range of integers which includes the end, as a pyomo RangeSet
+
+	Example:
+		index = jsonopt.nl.RangeSet(0,23)*jsonopt.nl.RangeSet(0,4)
+	"""
+
+	def __init__(self,start,end,step=1):
+		self.start = start
+		self.end = end
+		self.step = step
+
+	def __len__(self):
+		return max(0,(self.end-self.start)//self.step+1)
+
+	def __iter__(self):
+		return itertools.islice(itertools.count(self.start,self.step),len(self))
+
+	def __contains__(self,key):
+		return type(key) in _integers and self.start <= key <= self.end and (key-self.start) % self.step == 0
+
+
+class _SetProduct(_Set):
+	"""
+	the cartesian product of sets, with tuples as members
+	"""
+
+	def __init__(self,sets):
+		self.sets = sets
+
+	def _sets(self):
+		return list(self.sets)
+
+	def __len__(self):
+		size = 1
+		for s in self.sets:
+			size *= len(s)
+		return size
+
+	def __iter__(self):
+		return itertools.product(*self.sets)
+
+	def __contains__(self,key):
+		return isinstance(key,tuple) and len(key) == len(self.sets) and all(k in s for k,s in zip(key,self.sets))
+
+
+class _ScalarVar(VarData,_Component):
+	"""
+	a scalar variable, which is its own data
+	"""
+
+	def __init__(self,value,domain):
+		VarData.__init__(self,value,domain)
+
+	def is_indexed(self):
+		return False
+
+	def label(self):
+		return self.name
+
+	def iteritems(self):
+		return iter([(None,self)])
+
+	def values(self):
+		return [self]
+
+	def __getitem__(self,key):
+		if key is not None:
+			raise KeyError('{} is not indexed'.format(self.name))
+		return self
+
+
+class _ScalarParam(ParamData,_Component):
+	"""
+	a scalar parameter, which is its own data
+	"""
+
+	def is_indexed(self):
+		return False
+
+	def iteritems(self):
+		return iter([(None,self)])
+
+	def store_values(self,values,check=True):
+		self.value = values[None]
+
+	def __getitem__(self,key):
+		if key is not None:
+			raise KeyError('{} is not indexed'.format(self.name))
+		return self
+
+
+class ConstraintData(object):
+	"""
+	a single constraint lower <= body <= upper where the bounds are numbers,
+	parameters or None
+	"""
+
+	__slots__ = ('body','lower','upper')
+
+	def __init__(self,relation):
+		if isinstance(relation,tuple):
+			(self.lower,self.body,self.upper) = relation
+			return
+
+		if not isinstance(relation,Relation):
+			raise ValueError('A constraint requires a relation between expressions, not {}'.format(relation))
+
+		(lhs,rhs) = (relation.lhs,relation.rhs)
+		if relation.relation == 'L':
+			(lhs,rhs) = (rhs,lhs)
+
+		if _isconstant(rhs):
+			(self.body,bound) = (lhs,rhs)
+		elif _isconstant(lhs):
+			(self.body,bound) = (rhs,lhs)
+			if relation.relation != 'E':
+				# lhs >= body
+				(self.lower,self.upper) = (None,bound)
+				return
+		else:
+			(self.body,bound) = (lhs-rhs,0.)
+
+		self.lower = bound
+		self.upper = bound if relation.relation == 'E' else None
+
+
+def _isconstant(value):
+	return type(value) in _numbers or isinstance(value,ParamData)
+
+
+class Constraint(_Component):
+	"""
+	a scalar or indexed constraint
+
+	Example:
+		model.c = jsonopt.nl.Constraint(range(24),rule=lambda model,j: model.x[j] >= 0)
+		model.d = jsonopt.nl.Constraint(expr=model.y <= 1)
+	"""
+
+	Skip = object()
+
+	def __init__(self,*index,**kwargs):
+		self._index = list(index[0]) if len(index) > 0 else None
+		self._rule = kwargs.get('rule')
+		self._expr = kwargs.get('expr')
+
+	def _construct(self,model,name):
+		self.name = name
+		if self._index is None:
+			self._data = {None:ConstraintData(self._expr)}
+		else:
+			self._data = {}
+			for key in self._index:
+				relation = self._rule(model,*key) if isinstance(key,tuple) else self._rule(model,key)
+				if relation is not Constraint.Skip:
+					self._data[key] = ConstraintData(relation)
+
+		self._rule = None
+		self._expr = None
+
+	def items(self):
+		"""
+		returns the (key,data) tuples in index order
+		"""
+		if self._index is None:
+			return list(self._data.items())
+		return [(key,self._data[key]) for key in self._index if key in self._data]
+
+	def iteritems(self):
+		return iter(self.items())
+
+	def values(self):
+		return [data for key,data in self.items()]
+
+	def label(self,key):
+		return self.name if key is None else _Component.label(self,key)
+
+
+class Objective(_Component):
+	"""
+	an objective which is minimized
+	"""
+
+	def __init__(self,rule=None,expr=None):
+		self._rule = rule
+		self.expr = expr
+
+	def _construct(self,model,name):
+		self.name = name
+		if self._rule is not None:
+			self.expr = self._rule(model)
+		self._rule = None
+
+	def is_indexed(self):
+		return False
+
+
+def value(expression):
+	"""
+	evaluates an expression, objective, variable or parameter with the current values
+
+	Parameters:
+		expression: 	expression node, objective or number
+
+	Example:
+		jsonopt.nl.value(model.objective)
+	"""
+
+	if isinstance(expression,Objective):
+		expression = expression.expr
+	return _evaluate(expression)
+
+
+_functions = {'sin':math.sin, 'cos':math.cos, 'tan':math.tan, 'asin':math.asin, 'acos':math.acos, 'atan':math.atan,
+              'exp':math.exp, 'log':math.log, 'sqrt':math.sqrt, 'abs':abs}
+
+def _evaluate(node):
+	t = type(node)
+	if t in _numbers:
+		return node
+	if isinstance(node,(VarData,ParamData)):
+		if node.value is None:
+			raise ValueError('No value for uninitialized {}'.format(node.label() if isinstance(node,VarData) else 'parameter'))
+		return node.value
+	if t is Sum:
+		return sum(_evaluate(arg) for arg in node.terms())
+	if t is Product:
+		return _evaluate(node.left)*_evaluate(node.right)
+	if t is Division:
+		return _evaluate(node.left)/_evaluate(node.right)
+	if t is Power:
+		return _evaluate(node.left)**_evaluate(node.right)
+	if t is Negation:
+		return -_evaluate(node.arg)
+	if t is Function:
+		return _functions[node.name](_evaluate(node.arg))
+	if t is LinearExpression:
+		return _evaluate(node.constant) + sum(_evaluate(c)*_evaluate(v) for c,v in zip(node.linear_coefs,node.linear_vars))
+	return float(node)
+
+
+################################################################################
+# .nl writer
+################################################################################
+def _repn(node):
+	"""
+	splits an expression into a (constant,linear,nonlinear) tuple, where
+	linear is a dict with the coefficient of each variable and nonlinear a
+	list of (coefficient,expression,variables) tuples
+	"""
+
+	t = type(node)
+	if t in _numbers:
+		return (node,{},[])
+	if t is VarData or t is _ScalarVar:
+		return (0,{node:1},[])
+	if isinstance(node,ParamData):
+		return (_evaluate(node),{},[])
+
+	if t is Sum or t is LinearExpression:
+		constant = 0
+		linear = {}
+		nonlinear = []
+		if t is Sum:
+			terms = (_repn(arg) for arg in node.terms())
+		else:
+			terms = [(_evaluate(node.constant),{},[])]
+			terms += [(0,{v:_evaluate(c)},[]) for c,v in zip(node.linear_coefs,node.linear_vars)]
+		for (c,l,n) in terms:
+			constant += c
+			for var,coef in l.items():
+				linear[var] = linear.get(var,0) + coef
+			nonlinear += n
+		return (constant,linear,nonlinear)
+
+	if t is Negation:
+		return _scale(_repn(node.arg),-1)
+
+	if t is Product:
+		left = _repn(node.left)
+		right = _repn(node.right)
+		if _isnumber(left):
+			return _scale(right,left[0])
+		if _isnumber(right):
+			return _scale(left,right[0])
+		return _nonlinear(node,left,right)
+
+	if t is Division:
+		left = _repn(node.left)
+		right = _repn(node.right)
+		if _isnumber(right):
+			return _scale(left,1/right[0])
+		return _nonlinear(node,left,right)
+
+	if t is Power:
+		left = _repn(node.left)
+		right = _repn(node.right)
+		if _isnumber(right):
+			if right[0] == 1:
+				return left
+			if _isnumber(left) or right[0] == 0:
+				return (left[0]**right[0],{},[])
+		return _nonlinear(node,left,right)
+
+	if t is Function:
+		arg = _repn(node.arg)
+		if _isnumber(arg):
+			return (_functions[node.name](arg[0]),{},[])
+		return _nonlinear(node,arg)
+
+	raise TypeError('{} is not a valid expression'.format(node))
+
+
+def _isnumber(repn):
+	return len(repn[1]) == 0 and len(repn[2]) == 0
+
+def _scale(repn,factor):
+	(constant,linear,nonlinear) = repn
+	return (constant*factor,{var:coef*factor for var,coef in linear.items()},[(coef*factor,expression,variables) for coef,expression,variables in nonlinear])
+
+def _nonlinear(node,*repns):
+	variables = set()
+	for (c,l,n) in repns:
+		variables.update(l)
+		for term in n:
+			variables.update(term[2])
+	return (0,{},[(1,node,variables)])
+
+
+_opcodes = {Sum:'o0', Product:'o2', Division:'o3', Power:'o5', Negation:'o16'}
+_function_opcodes = {'log':'o43', 'sin':'o41', 'cos':'o46', 'tan':'o38', 'asin':'o51', 'acos':'o53', 'atan':'o49',
+                     'exp':'o44', 'sqrt':'o39', 'abs':'o15'}
+
+def _format(value):
+	return str(int(value)) if type(value) in _integers else repr(float(value))
+
+def _number(value):
+	return 'n{}\n'.format(_format(value))
+
+def _write_expression(node,columns,lines):
+	"""
+	appends the lines of an expression in the prefix notation of .nl files
+	"""
+
+	t = type(node)
+	if t in _numbers or isinstance(node,ParamData):
+		lines.append(_number(_evaluate(node)))
+	elif t is VarData or t is _ScalarVar:
+		lines.append('v{}\n'.format(columns[node]))
+	elif t is Sum or t is LinearExpression:
+		if t is Sum:
+			terms = node.terms()
+		else:
+			terms = [Product(c,v) for c,v in zip(node.linear_coefs,node.linear_vars)] + [node.constant]
+		_write_sum(terms,lambda term: _write_expression(term,columns,lines),lines)
+	elif t is Negation:
+		if type(node.arg) in _numbers or isinstance(node.arg,ParamData):
+			lines.append(_number(-_evaluate(node.arg)))
+		else:
+			lines.append('o16\n')
+			_write_expression(node.arg,columns,lines)
+	elif t is Function:
+		lines.append(_function_opcodes[node.name]+'\n')
+		_write_expression(node.arg,columns,lines)
+	else:
+		lines.append(_opcodes[t]+'\n')
+		_write_expression(node.left,columns,lines)
+		_write_expression(node.right,columns,lines)
+
+def _write_sum(terms,write,lines):
+	if len(terms) == 1:
+		write(terms[0])
+		return
+	lines.append('o0\n' if len(terms) == 2 else 'o54\n{}\n'.format(len(terms)))
+	for term in terms:
+		write(term)
+
+def _write_terms(nonlinear,constant,columns,lines):
+	"""
+	appends the lines of the nonlinear part of a constraint or objective
+	"""
+
+	def write(term):
+		if type(term) in _numbers:
+			lines.append(_number(term))
+			return
+		(coef,expression,variables) = term
+		if coef == -1:
+			lines.append('o16\n')
+		elif coef != 1:
+			lines.append('o2\n')
+			lines.append(_number(coef))
+		_write_expression(expression,columns,lines)
+
+	terms = list(nonlinear)
+	if constant != 0 or len(terms) == 0:
+		terms.append(constant)
+	_write_sum(terms,write,lines)
+
+
+def _bound(value,constant=0):
+	return None if value is None else _evaluate(value)-constant
+
+def _bounds(lower,upper):
+	"""
+	returns a line of the r or b segment
+	"""
+	if lower is None and upper is None:
+		return '3\n'
+	if lower is None:
+		return '1 {}\n'.format(_format(upper))
+	if upper is None:
+		return '2 {}\n'.format(_format(lower))
+	if lower == upper:
+		return '4 {}\n'.format(_format(lower))
+	return '0 {} {}\n'.format(_format(lower),_format(upper))
+
+
+def write(model,path,names=False):
+	"""
+	writes a model to an AMPL .nl file in text format
+
+	Only variables which appear in the constraints or the objective are
+	written. Constraints which contain nonlinear terms are written first. The
+	parameters are written as numbers with their current value.
+
+	Parameters:
+		model: 			ConcreteModel
+		path: 			string, the path of the .nl file
+		names: 			boolean, also write the constraint and variable names to .row and .col files next to the .nl file
+
+	Returns:
+		columns: 		list, the variable data in the order of the .nl file columns
+		rows: 			list, the constraint data in the order of the .nl file rows
+
+	Example:
+		(columns,rows) = jsonopt.nl.write(problem.model,'problem.nl')
+	"""
+
+	# the creation order of all variables
+	order = {}
+	for component in model.components((IndexedVar,_ScalarVar)):
+		for data in component.values():
+			order[data] = len(order)
+
+	# split the constraints and objectives in a constant, linear and nonlinear part
+	used = set()
+	nonlinear_constraints = set()
+	rows = []
+	for component in model.components(Constraint):
+		for key,data in component.items():
+			(constant,linear,nonlinear) = _repn(data.body)
+			used.update(linear)
+			for term in nonlinear:
+				nonlinear_constraints.update(term[2])
+			rows.append((component,key,data,constant,linear,nonlinear))
+
+	nonlinear_objectives = set()
+	objectives = []
+	for component in model.components(Objective):
+		(constant,linear,nonlinear) = _repn(component.expr)
+		used.update(linear)
+		for term in nonlinear:
+			nonlinear_objectives.update(term[2])
+		objectives.append((component,constant,linear,nonlinear))
+
+	# order the variables, nonlinear in both constraints and objectives,
+	# nonlinear in constraints, nonlinear in objectives and linear, with
+	# discrete variables last in each group
+	used.update(nonlinear_constraints)
+	used.update(nonlinear_objectives)
+	both = nonlinear_constraints & nonlinear_objectives
+	groups = [both, nonlinear_constraints-both, nonlinear_objectives-both, used-nonlinear_constraints-nonlinear_objectives]
+
+	discrete = lambda var: var.domain.kind != 'continuous'
+	sort = lambda variables: sorted(variables,key=order.get)
+
+	columns = []
+	counts = []
+	for group in groups[:3]:
+		columns += sort(var for var in group if not discrete(var))
+		columns += sort(var for var in group if discrete(var))
+		counts.append(len(columns))
+	columns += sort(var for var in groups[3] if not discrete(var))
+	columns += sort(var for var in groups[3] if var.domain.kind == 'binary')
+	columns += sort(var for var in groups[3] if var.domain.kind == 'integer')
+
+	(nlvb,nlvc,nlvo) = counts
+	if nlvo == nlvc:
+		nlvo = nlvb
+
+	index = dict((var,i) for i,var in enumerate(columns))
+
+	# nonlinear constraints first, only the parts which are written are kept
+	rows = [row for row in rows if len(row[5]) > 0] + [row for row in rows if len(row[5]) == 0]
+	lengths = [0]*len(columns)
+	for i,(component,key,data,constant,linear,nonlinear) in enumerate(rows):
+		jacobian = sorted((index[var],coef) for var,coef in _gradient(linear,nonlinear).items())
+		for (k,coef) in jacobian:
+			lengths[k] += 1
+		rows[i] = (component,key,data,nonlinear,_bound(data.lower,constant),_bound(data.upper,constant),jacobian)
+
+	gradients = [sorted((index[var],coef) for var,coef in _gradient(o[2],o[3]).items()) for o in objectives]
+
+	if names:
+		stub = path[:-3] if path.endswith('.nl') else path
+		rownames = [row[0].label(row[1]) for row in rows] + [o[0].name for o in objectives]
+		colnames = [var.label() for var in columns]
+		for extension,labels in (('.row',rownames),('.col',colnames)):
+			with open(stub+extension,'w') as fileobj:
+				fileobj.writelines(label+'\n' for label in labels)
+
+	with open(path,'w') as fileobj:
+		# header
+		fileobj.write('g3 1 1 0\t# problem {}\n'.format(model.__class__.__name__))
+		fileobj.write(' {} {} {} {} {}\t# vars, constraints, objectives, ranges, eqns\n'.format(
+			len(columns), len(rows), len(objectives),
+			sum(1 for row in rows if row[4] is not None and row[5] is not None and row[4] != row[5]),
+			sum(1 for row in rows if row[4] is not None and row[4] == row[5])))
+		fileobj.write(' {} {} 0 0 0 0\t# nonlinear constrs, objs; ccons: lin, nonlin, nd, nzlb\n'.format(
+			sum(1 for row in rows if len(row[3]) > 0), sum(1 for o in objectives if len(o[3]) > 0)))
+		fileobj.write(' 0 0\t# network constraints: nonlinear, linear\n')
+		fileobj.write(' {} {} {}\t# nonlinear vars in constraints, objectives, both\n'.format(nlvc,nlvo,nlvb))
+		fileobj.write(' 0 0 0 1\t# linear network variables; functions; arith, flags\n')
+		fileobj.write(' {} {} {} {} {}\t# discrete variables: binary, integer, nonlinear (b,c,o)\n'.format(
+			sum(1 for var in groups[3] if var.domain.kind == 'binary'),
+			sum(1 for var in groups[3] if var.domain.kind == 'integer'),
+			sum(1 for var in groups[0] if discrete(var)),
+			sum(1 for var in groups[1] if discrete(var)),
+			sum(1 for var in groups[2] if discrete(var))))
+		fileobj.write(' {} {}\t# nonzeros in Jacobian, obj. gradient\n'.format(sum(lengths),sum(len(g) for g in gradients)))
+		if names:
+			fileobj.write(' {} {}\t# max name lengths: constraints, variables\n'.format(max([len(n) for n in rownames]+[0]),max([len(n) for n in colnames]+[0])))
+		else:
+			fileobj.write(' 0 0\t# max name lengths: constraints, variables\n')
+		fileobj.write(' 0 0 0 0 0\t# common exprs: b,c,o,c1,o1\n')
+
+		# nonlinear parts of the constraints and objectives
+		for i,row in enumerate(rows):
+			lines = ['C{}\n'.format(i)]
+			if len(row[3]) == 0:
+				lines.append('n0\n')
+			else:
+				_write_terms(row[3],0,index,lines)
+			fileobj.writelines(lines)
+
+		for i,o in enumerate(objectives):
+			lines = ['O{} 0\n'.format(i)]
+			_write_terms(o[3],o[1],index,lines)
+			fileobj.writelines(lines)
+
+		# initial values
+		initial = [(i,var.value) for i,var in enumerate(columns) if var.value is not None]
+		fileobj.write('x{}\n'.format(len(initial)))
+		fileobj.writelines('{} {}\n'.format(i,_format(value)) for i,value in initial)
+
+		# constraint and variable bounds
+		fileobj.write('r\n')
+		fileobj.writelines(_bounds(row[4],row[5]) for row in rows)
+		fileobj.write('b\n')
+		fileobj.writelines(_bounds(var.domain.lb,var.domain.ub) for var in columns)
+
+		# cumulative jacobian column lengths
+		fileobj.write('k{}\n'.format(max(len(columns)-1,0)))
+		total = 0
+		for length in lengths[:-1]:
+			total += length
+			fileobj.write('{}\n'.format(total))
+
+		# linear parts of the constraints and objectives
+		for i,row in enumerate(rows):
+			if len(row[6]) > 0:
+				fileobj.write('J{} {}\n'.format(i,len(row[6])))
+				fileobj.writelines('{} {}\n'.format(k,_format(coef)) for (k,coef) in row[6])
+		for i,g in enumerate(gradients):
+			if len(g) > 0:
+				fileobj.write('G{} {}\n'.format(i,len(g)))
+				fileobj.writelines('{} {}\n'.format(k,_format(coef)) for (k,coef) in g)
+
+	return (columns,[row[2] for row in rows])
+
+
+def _gradient(linear,nonlinear):
+	"""
+	returns the linear coefficient of all variables in a constraint or objective
+	"""
+	gradient = {}
+	for term in nonlinear:
+		gradient.update((var,0) for var in term[2])
+	gradient.update((var,coef) for var,coef in linear.items() if coef != 0 or var in gradient)
+	return gradient
+
+
+################################################################################
+# solver
+################################################################################
+# solve result numbers of AMPL solvers, (upper limit, status, termination condition)
+_solve_results = [
+	(100,'ok','optimal'),
+	(200,'warning','optimal'),
+	(300,'warning','infeasible'),
+	(400,'warning','unbounded'),
+	(500,'warning','maxIterations'),
+	(600,'error','internalSolverError'),
+]
+
+def run(solver,path,options={},tee=False):
+	"""
+	runs an AMPL solver executable on a .nl file, which writes a .sol file
+	next to it
+
+	Parameters:
+		solver: 		string, the solver executable name or path
+		path: 			string, the path of the .nl file
+		options: 		dict, solver options passed as keyword=value arguments
+		tee: 			boolean, print the solver output
+
+	Returns:
+		output: 		string, the solver output
+
+	Example:
+		jsonopt.nl.run('ipopt','problem.nl',{'tol':1e-6})
+	"""
+
+	executable = which(solver)
+	if executable is None:
+		raise RuntimeError('No executable found for solver {}'.format(solver))
+
+	stub = path[:-3] if path.endswith('.nl') else path
+	command = [executable,stub,'-AMPL'] + ['{}={}'.format(key,value) for key,value in sorted(options.items())]
+
+	process = subprocess.Popen(command,stdout=subprocess.PIPE,stderr=subprocess.STDOUT,universal_newlines=True)
+	if not tee:
+		return process.communicate()[0]
+
+	output = []
+	for line in iter(process.stdout.readline,''):
+		sys.stdout.write(line)
+		output.append(line)
+	process.wait()
+	return ''.join(output)
+
+
+def read(path,columns):
+	"""
+	reads a .sol file and loads the variable values
+
+	The values are loaded unless the solver reports an unbounded problem or
+	an error.
+
+	Parameters:
+		path: 			string, the path of the .sol file
+		columns: 		list, the variable data in the order of the .nl file columns, as returned by write
+
+	Returns:
+		results: 		jsonopt.stats.SolveResult, with the AMPL solve result number as results
+
+	Example:
+		(columns,rows) = jsonopt.nl.write(model,'problem.nl')
+		jsonopt.nl.run('ipopt','problem.nl')
+		results = jsonopt.nl.read('problem.sol',columns)
+	"""
+
+	with open(path,'r') as fileobj:
+		lines = iter(fileobj.read().splitlines())
+
+	# the solver message ends with an empty line
+	message = []
+	line = next(lines)
+	if line.strip() == '':
+		line = next(lines)
+	while line.strip() != '':
+		message.append(line.strip())
+		line = next(lines)
+
+	if not next(lines).startswith('Options'):
+		raise ValueError('No Options line found in {}'.format(path))
+	nopts = int(next(lines))
+	vbtol = nopts > 4
+	if vbtol:
+		nopts -= 2
+	z = [int(next(lines)) for i in range(nopts+4)]
+	if vbtol:
+		next(lines)
+
+	(m,n) = (z[nopts+1],z[nopts+3])
+	if n != len(columns):
+		raise ValueError('{} has {} variables, expected {}'.format(path,n,len(columns)))
+	# the constraint duals are not used
+	for i in range(m):
+		next(lines)
+	values = [float(next(lines)) for i in range(n)]
+
+	solve_result_num = 0
+	for line in lines:
+		if line.startswith('objno'):
+			solve_result_num = int(line.split()[2])
+			break
+
+	(status,termination_condition) = ('error','error')
+	for (limit,s,t) in _solve_results:
+		if 0 <= solve_result_num < limit:
+			(status,termination_condition) = (s,t)
+			break
+
+	if not termination_condition in ('unbounded','internalSolverError','error'):
+		for var,value in zip(columns,values):
+			var.value = value
+
+	return stats.SolveResult(status,termination_condition,'; '.join(message),results=solve_result_num)
@@ -0,0 +1,340 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright 2016 Brecht Baeten
+#    This file is part of jsonopt.
+#
+#    jsonopt is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    jsonopt is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with jsonopt.  If not, see <http://www.gnu.org/licenses/>.
+################################################################################
+
+import os
+import signal
+import threading
+import subprocess
+import multiprocessing
+import numpy as np
+
+# the problem of a worker process
+_problem = None
+_initial = None
+
+def _init_worker(problem):
+	"""
+	stores the problem and its initial values in the worker process
+	"""
+	global _problem, _initial
+	
+	_problem = problem
+	_initial = ({name:problem.get_value(name) for name in problem.parameters},_variable_values(problem))
+	
+	
+def _restore(problem,initial):
+	"""
+	restores the initial parameter and variable values, variables which had no value are cleared
+	"""
+	(parameters,variables) = initial
+	
+	problem.set_values(parameters)
+	_set_variable_values(problem,variables)
+	
+	
+def _variable_values(problem):
+	"""
+	returns the values of all variables per index, with None for the entries without a value
+	"""
+	
+	# get_value returns nan for variables without a value
+	variables = {}
+	for name in problem.variables:
+		indexmap = problem._indexmaps[name]
+		values = [problem.get_value(name)] if indexmap.scalar else indexmap.values(problem.get_value(name))
+		variables[name] = [None if value is None or np.isnan(value) else value for value in values]
+		
+	return variables
+	
+	
+def _set_variable_values(problem,variables,clear=True):
+	"""
+	sets the values of variables per index, entries which are None clear the value or are skipped when clear is False
+	"""
+	
+	for name,values in variables.items():
+		var = problem.variables[name]
+		indexmap = problem._indexmaps[name]
+		for key,value in zip(indexmap.keys,values):
+			if value is not None or clear:
+				if indexmap.scalar:
+					var.value = value
+				else:
+					var[key].value = value
+					
+	# the values are not set through the problem, so its cached values are outdated
+	problem._values.clear()
+	
+	
+def _solve_scenario(args):
+	"""
+	solves a single scenario in a worker process
+	"""
+	(index,scenario,solver,solveroptions,warm_start) = args
+	
+	try:
+		_restore(_problem,_initial)
+		_problem.set_values(scenario)
+		results = _problem.solve(solver=solver,solveroptions=solveroptions,verbosity=0,warm_start=warm_start)
+		
+		values = {name:_problem.get_value(name) for name in _problem.variables}
+		values['objective'] = _problem.get_value('objective')
+		values['result'] = results.to_dict()
+		status = str(results.solver.termination_condition)
+		
+	except Exception as e:
+		values = None
+		status = 'error: {}'.format(e)
+		
+	return (index,values,status)
+	
+	
+def solve_batch(problem,scenarios,workers=None,solver=None,solveroptions={},warm_start=False):
+	"""
+	solves a problem for many parameter scenarios in a pool of worker processes
+	
+	Parameters:
+		problem:		jsonopt.Problem
+		scenarios:		list, a list of dicts with variable or parameter names as keys and numbers or arrays as values
+		workers:		int, the number of worker processes, defaults to the number of cpus
+		solver:			string, the solver name, defaults to ipopt or to trust-constr for the scipy backend
+		solveroptions:	dict, options passed to the solver
+		warm_start:		boolean, warm start each solve of a worker from its previous solve
+		
+	Returns:
+		generator of (index,values,status) tuples in order of completion
+	"""
+	
+	if workers is None:
+		workers = multiprocessing.cpu_count()
+		
+	pool = multiprocessing.Pool(workers,initializer=_init_worker,initargs=(problem,))
+	try:
+		tasks = ((index,scenario,solver,solveroptions,warm_start) for index,scenario in enumerate(scenarios))
+		for result in pool.imap_unordered(_solve_scenario,tasks):
+			yield result
+			
+		pool.close()
+	finally:
+		pool.terminate()
+		pool.join()
+		
+		
+# limits the number of solves started with solve_async which run at the same time
+_semaphore = threading.BoundedSemaphore(multiprocessing.cpu_count())
+
+def set_max_concurrent_solves(number):
+	"""
+	sets the maximum number of asynchronous solves which run at the same time,
+	futures created afterwards wait for a free slot before starting
+	
+	Parameters:
+		number:			int
+	"""
+	global _semaphore
+	_semaphore = threading.BoundedSemaphore(number)
+	
+	
+def _solve_process(problem,solver,solveroptions,connection):
+	"""
+	solves a problem in a child process and sends the variable values back
+	"""
+	if hasattr(os,'setsid'):
+		# a new process group, so the solver executable is terminated with the child
+		os.setsid()
+		
+	try:
+		results = problem.solve(solver=solver,solveroptions=solveroptions,verbosity=0)
+		connection.send((_variable_values(problem),results.to_dict(),None))
+	except Exception as e:
+		connection.send((None,None,'{}: {}'.format(type(e).__name__,e)))
+	finally:
+		connection.close()
+		
+		
+class SolveFuture(object):
+	"""
+	The result of a solve which runs in a child process
+	
+	The solver runs in a separate process so the calling thread is not
+	blocked and the solve can be cancelled or timed out by terminating that
+	process together with the solver executable it started. The future is
+	waited for in a background thread, when the solve finishes the variable
+	values are loaded into the problem. The solve result of a finished solve
+	is available as a dict in future.solve_result.
+	
+	The future is not an asyncio future and can not be awaited. In a
+	coroutine, wait for it in an executor.
+	
+	Example:
+		future = problem.solve_async(timeout=60)
+		status = future.result()
+		future.solve_result['times']['total']
+		
+		future.add_done_callback(callback)
+		
+		status = await loop.run_in_executor(None,future.result)
+	"""
+	
+	def __init__(self,problem,solver=None,solveroptions={},timeout=None):
+		"""
+		Parameters:
+			problem:		jsonopt.Problem
+			solver:			string, the solver name, defaults to ipopt or to trust-constr for the scipy backend
+			solveroptions:	dict, options passed to the solver
+			timeout:		float, terminate the solve after this many seconds
+		"""
+		
+		self._problem = problem
+		self._solver = solver
+		self._solveroptions = solveroptions
+		self._timeout = timeout
+		
+		self._lock = threading.Lock()
+		self._done = threading.Event()
+		self._callbacks = []
+		self._process = None
+		self._cancelled = False
+		self._result = None
+		self._exception = None
+		self.solve_result = None
+		
+		thread = threading.Thread(target=self._run)
+		thread.daemon = True
+		thread.start()
+		
+	def _run(self):
+		semaphore = _semaphore
+		with semaphore:
+			with self._lock:
+				if self._cancelled:
+					return
+				
+				(connection,childconnection) = multiprocessing.Pipe(duplex=False)
+				self._process = multiprocessing.Process(target=_solve_process,args=(self._problem,self._solver,self._solveroptions,childconnection))
+				self._process.daemon = True
+				self._process.start()
+				childconnection.close()
+				
+			try:
+				if connection.poll(self._timeout):
+					(values,result,error) = connection.recv()
+				else:
+					(values,result,error) = (None,None,'The solve did not finish within {} s'.format(self._timeout))
+			except (EOFError,IOError):
+				(values,result,error) = (None,None,'The solver process ended without a result')
+				
+			self._terminate()
+			self._process.join()
+			connection.close()
+			
+		with self._lock:
+			if self._cancelled:
+				return
+				
+			if error is None:
+				# variables the solver did not give a value keep their value
+				_set_variable_values(self._problem,values,clear=False)
+				self.solve_result = result
+				self._result = str(result['termination_condition'])
+			else:
+				self._exception = RuntimeError(error)
+				
+		self._finish()
+		
+	def _terminate(self):
+		"""
+		terminates the child process and the solver executable started by it
+		"""
+		if not self._process.is_alive():
+			return
+		try:
+			if hasattr(os,'killpg'):
+				os.killpg(self._process.pid,signal.SIGTERM)
+			else:
+				# windows, terminate the process tree
+				with open(os.devnull,'w') as devnull:
+					subprocess.call(['taskkill','/F','/T','/PID',str(self._process.pid)],stdout=devnull,stderr=devnull)
+		except OSError:
+			# the child did not start its process group yet, so there is no solver
+			pass
+		self._process.terminate()
+		
+	def _finish(self):
+		self._done.set()
+		for callback in self._callbacks:
+			callback(self)
+		
+	def cancel(self):
+		"""
+		cancels the solve, terminating the solver process when it is running,
+		the values of the problem are not changed
+		
+		Returns:
+			cancelled:		boolean, False when the solve already finished
+		"""
+		with self._lock:
+			if self._done.is_set():
+				return self._cancelled
+				
+			self._cancelled = True
+			if self._process is not None:
+				self._terminate()
+				
+		self._finish()
+		return True
+		
+	def cancelled(self):
+		"""
+		returns True when the solve was cancelled
+		"""
+		return self._cancelled
+		
+	def done(self):
+		"""
+		returns True when the solve finished, failed or was cancelled
+		"""
+		return self._done.is_set()
+		
+	def result(self,timeout=None):
+		"""
+		waits for the solve to finish and returns the solver termination condition
+		
+		Parameters:
+			timeout:		float, the maximum time to wait in seconds
+		"""
+		if not self._done.wait(timeout):
+			raise RuntimeError('The solve did not finish within {} s'.format(timeout))
+		if self._cancelled:
+			raise RuntimeError('The solve was cancelled')
+		if self._exception is not None:
+			raise self._exception
+			
+		return self._result
+		
+	def add_done_callback(self,callback):
+		"""
+		adds a function which is called with the future when it is done
+		"""
+		with self._lock:
+			if not self._done.is_set():
+				self._callbacks.append(callback)
+				return
+				
+		callback(self)
@@ -18,21 +18,24 @@
 ################################################################################
 
 import re
+import ast
 import numpy as np
 
 import util
+import expr
 
-def variable(expression):	
+def variable(expression,indexvalue=None):	
 	"""
 	parses variables or parameters and returns required values
 	
 	Parameters:
-		expression: string
+		expression: string or Statement
+		indexvalue: iterable, the values of the indices when they are known, like a jsonopt.util.RangeIndexMap, which avoids creating the list
 		
 	Returns:
 		name: 			string
 		indexvalue: 	list
-		value: 			numpy.array
+		value: 			numpy.array, with one dimension per loop for rectangular index sets, or flat and ordered as indexvalue otherwise
 		
 	Example:
 		(name,indexvalue,value)	= jsonopt.parse.variable('x[j] = 2 for j in range(10)')
@@ -43,29 +46,368 @@ def variable(expression):
 		value: numpy.array([2,2,2,2,2,2,2,2,2,2])
 	"""
 
-	# check if there is a 'for' statement and parse it
-	(content,loop,indexlist,indexvalue) = for_array_creation(expression)
-	
-	# check if the content contains a value
-	(lhs,rhs,type) = equation(content)
-	
-	# parse the variable name by removing brackets
-	name,varindexlist = indexed_expression(lhs)
+	if not isinstance(expression,Statement):
+		expression = statement(expression)
+		
+	name = expression.target
+	if indexvalue is None:
+		indexvalue = expression.indexvalue()
 		
 	# parse the value
 	value = []
-	if rhs.lstrip().rstrip() != '':
-		evalvars = dict(vars())
-		evalvars.update(util.specialfunctions)
-		
+	if expression.data is not None:
+		value = data_value(expression.data,expression.loops,indexvalue,expression.source)
+	elif expression.rhs is not None:
 		if len(indexvalue)==0:
-			value = eval(rhs,evalvars)
+			value = expr.function(expr.code(expression.rhs,division=False),dict(util.specialfunctions))()
 		else:
-			value = np.array( eval('[ '*len(loop) + rhs + ' ' + ' ] '.join(loop[::-1]) + ' ]',evalvars) )
+			value = array(expression.rhs,expression.loops,expression.indexlist,indexvalue)
 	
 	return (name,indexvalue,value)	
 
 	
+def data_value(value,loop,indexvalue,source=''):
+	"""
+	checks the shape of a loaded data array against the index set
+	
+	Parameters:
+		value: 			numpy.array, the data
+		loop: 			list, a list of the for statements as strings or ast comprehension nodes
+		indexvalue: 	list, a list of all values of the indices
+		source: 		string, the statement, used in error messages
+		
+	Returns:
+		value: 			numpy.array or number
+	"""
+	
+	if len(indexvalue)==0:
+		if value.size != 1:
+			raise ValueError('A scalar requires a single value but the data has shape {}: {}'.format(value.shape,source))
+		return value.item()
+		
+	grid = index_grid(loop)
+	shape = grid[0].shape if grid is not None else (len(indexvalue),)
+	if value.shape != shape:
+		raise ValueError('The data shape {} does not match the index shape {}: {}'.format(value.shape,shape,source))
+		
+	return value
+	
+	
+def array(expression,loop,indexlist,indexvalue):
+	"""
+	evaluates an expression for all indices at once
+	
+	When the index set is rectangular the index variables are numpy index
+	grids and the expression is evaluated once as an array expression. When
+	the expression can not be broadcast, raises a floating point error or
+	gives a different result for floating point index grids, for instance
+	because of integer overflow or classic division, it is evaluated for
+	each index.
+	
+	Parameters:
+		expression: 	string or ast node, the expression
+		loop: 			list, a list of the for statements as strings or ast comprehension nodes
+		indexlist: 		list, a list of all index names as strings
+		indexvalue: 	list, a list of all values of the indices
+		
+	Returns:
+		value: 			numpy.array, with one dimension per loop for rectangular index sets, or flat and ordered as indexvalue otherwise
+		
+	Example:
+		value = jsonopt.parse.array('2.0 + 2.0*sin(2*3.14159*j/24.)',['for j in range(24)'],['j'],range(24))
+	"""
+	
+	function = expr.function(expr.code(expression,indexlist,division=False),dict(util.specialfunctions))
+	grid = index_grid(loop)
+	
+	if grid is not None:
+		shape = grid[0].shape
+		try:
+			# numpy integers overflow silently, so the result is checked
+			# against the result for floating point index grids
+			with np.errstate(all='raise',under='ignore'):
+				value = np.asarray( function(*grid) )
+				check = np.asarray( function(*[index.astype(float) if index.dtype.kind in 'iu' else index for index in grid]) )
+				
+			if value.dtype.kind in 'biuf' and np.allclose(value.astype(float),check.astype(float)):
+				return np.array( np.broadcast_to(value,shape) )
+		except Exception:
+			pass
+	
+	# evaluate the expression for each index
+	if len(indexlist)==1:
+		value = np.array( [function(index) for index in indexvalue] )
+	else:
+		value = np.array( [function(*index) for index in indexvalue] )
+		
+	if grid is not None:
+		value = value.reshape(shape)
+		
+	return value
+	
+	
+def index_grid(loop):
+	"""
+	creates numpy index grids for a rectangular index set
+	
+	Parameters:
+		loop:			list, a list of the for statements as strings or ast comprehension nodes
+		
+	Returns:
+		grid: 			list, a list of index arrays, one per loop, or None when the index set is not rectangular
+		
+	Example:
+		grid = jsonopt.parse.index_grid(['for i in range(2)','for j in range(3)'])
+		
+		returns
+		grid: [array([[0, 0, 0], [1, 1, 1]]), array([[0, 1, 2], [0, 1, 2]])]
+	"""
+	
+	evalvars = dict(util.specialfunctions)
+	
+	ranges = []
+	for curloop in loop:
+		if not isinstance(curloop,ast.comprehension):
+			curloop = ast.parse('[0 ' + curloop + ']',mode='eval').body.generators[0]
+		
+		if len(curloop.ifs) > 0 or not isinstance(curloop.target,ast.Name):
+			return None
+			
+		try:
+			# loops which depend on other indices fail to evaluate
+			iterable = eval( compile(ast.Expression(body=curloop.iter),'<jsonopt>','eval'), evalvars )
+			ranges.append( np.array(list(iterable)) )
+		except Exception:
+			return None
+	
+		if ranges[-1].ndim != 1:
+			return None
+			
+	return np.meshgrid(*ranges,indexing='ij')
+	
+	
+def ranges(loop):
+	"""
+	returns the ranges of a rectangular index set where each loop is over a
+	range of non negative integers which does not depend on other indices
+	
+	Parameters:
+		loop:			list, a list of the for statements as strings or ast comprehension nodes
+		
+	Returns:
+		ranges: 		list, a (start,stop,step) tuple per loop, or None when the index set is not a product of ranges
+		
+	Example:
+		ranges = jsonopt.parse.ranges(['for i in range(2)','for j in range(1,25)'])
+		
+		returns
+		ranges: [(0,2,1),(1,25,1)]
+	"""
+	
+	evalvars = dict(util.specialfunctions)
+	
+	ranges = []
+	for curloop in loop:
+		if not isinstance(curloop,ast.comprehension):
+			curloop = ast.parse('[0 ' + curloop + ']',mode='eval').body.generators[0]
+			
+		node = curloop.iter
+		if len(curloop.ifs) > 0 or not isinstance(curloop.target,ast.Name):
+			return None
+		if not isinstance(node,ast.Call) or not isinstance(node.func,ast.Name) or not node.func.id in ('range','xrange'):
+			return None
+		if not 1 <= len(node.args) <= 3 or len(node.keywords) > 0 or getattr(node,'starargs',None) is not None or getattr(node,'kwargs',None) is not None:
+			return None
+			
+		try:
+			# ranges which depend on other indices fail to evaluate
+			args = [eval( compile(ast.Expression(body=arg),'<jsonopt>','eval'), evalvars ) for arg in node.args]
+		except Exception:
+			return None
+			
+		if not all(isinstance(a,(int,type(1<<64))) and not isinstance(a,bool) for a in args):
+			return None
+			
+		(start,stop,step) = (0,args[0],1) if len(args)==1 else (args[0],args[1],args[2] if len(args)==3 else 1)
+		if start < 0 or step <= 0 or stop <= start:
+			return None
+			
+		ranges.append((start,stop,step))
+		
+	return ranges
+	
+	
+class Statement(object):
+	"""
+	Intermediate representation of a parsed statement
+	
+	Attributes:
+		source: 		string, the statement
+		domain: 		string, the domain of a variable or None
+		relation: 		string, 'E' -> equal, 'G' -> greater than or equal, 'L' -> less than or equal or None
+		lhs: 			ast node, the left hand side or the whole expression when there is no relation
+		rhs: 			ast node, the right hand side or None
+		expression: 	ast node, the whole expression without the for statements
+		loops: 			list, a list of ast comprehension nodes for the for statements
+		looptext: 		string, the for statements as written in the source
+		data: 			numpy.array, the value loaded from an @file: reference in the right hand side or None
+		indexlist: 		list, a list of all index names as strings
+		target: 		string, the name of the variable in the left hand side
+	"""
+	
+	def __init__(self,source,domain,relation,lhs,rhs,loops,looptext='',data=None):
+		self.source = source
+		self.domain = domain
+		self.relation = relation
+		self.lhs = lhs
+		self.rhs = rhs
+		self.loops = loops
+		self.looptext = looptext
+		self.data = data
+		
+		if relation is None:
+			self.expression = lhs
+		else:
+			self.expression = ast.Compare(left=lhs,ops=[_compare_ops[relation]()],comparators=[rhs])
+			ast.copy_location(self.expression,lhs)
+		
+		self.indexlist = [n.id for l in loops for n in ast.walk(l.target) if isinstance(n,ast.Name)]
+		
+		target = lhs.value if isinstance(lhs,ast.Subscript) else lhs
+		self.target = target.id if isinstance(target,ast.Name) else None
+		
+		self._indexvalue = None
+		
+	def indexvalue(self):
+		"""
+		returns a list of all values of the indices, as tuples when there are multiple indices
+		"""
+		
+		if self._indexvalue is None:
+			if len(self.loops)==0:
+				self._indexvalue = []
+			else:
+				if len(self.indexlist)==1:
+					elt = ast.Name(id=self.indexlist[0],ctx=ast.Load())
+				else:
+					elt = ast.Tuple(elts=[ast.Name(id=i,ctx=ast.Load()) for i in self.indexlist],ctx=ast.Load())
+				
+				node = ast.Expression(body=ast.ListComp(elt=elt,generators=self.loops))
+				ast.fix_missing_locations(node)
+				self._indexvalue = eval( compile(node,'<jsonopt>','eval'), dict(util.specialfunctions) )
+				
+		return self._indexvalue
+		
+	def declaration(self,value='0'):
+		"""
+		returns the statement with the right hand side replaced by value, which
+		defines the same target and index set without the data
+		"""
+		
+		if len(self.indexlist)==0:
+			return '{} = {}'.format(self.target,value)
+		else:
+			return '{}[{}] = {} {}'.format(self.target,','.join(self.indexlist),value,self.looptext)
+			
+	def __repr__(self):
+		return 'Statement({!r})'.format(self.source)
+		
+		
+_compare_ops = {'E':ast.Eq, 'G':ast.GtE, 'L':ast.LtE}
+_relations = {'=':'E', '==':'E', '>=':'G', '<=':'L'}
+
+def statement(expression,domain=False,datadir=None):
+	"""
+	parses a statement into an intermediate representation with python ast
+	nodes for the left and right hand side and the for statements
+	
+	Parameters:
+		expression: 	string, the statement
+		domain: 		boolean, the statement starts with a variable domain
+		datadir: 		string, the directory of relative @file: references
+		
+	Returns:
+		statement: 		Statement
+		
+	Example:
+		s = jsonopt.parse.statement('Reals x[j] = 3*j for j in range(25)',domain=True)
+		
+		returns
+		s.domain: 'Reals'
+		s.target: 'x'
+		s.relation: 'E'
+		s.indexlist: ['j']
+	"""
+	
+	source = expression
+	
+	domainexpr = None
+	if domain:
+		match = re.match(r'\s*([A-Za-z_]\w*)\s+(.*)$',expression,re.DOTALL)
+		if match is None:
+			raise ValueError('A variable must start with a domain: {}'.format(source))
+		(domainexpr,expression) = match.groups()
+		
+	(pairs,forpos,operators) = scan(expression)
+	
+	# the relation is the first = or else the first >=, <= or == before the for statements
+	end = forpos[0] if len(forpos) > 0 else len(expression)
+	operators = [(p,op) for (p,op) in operators if p < end and op in _relations]
+	relation = None
+	for op in ['=','>=','<=','==']:
+		found = [p for (p,o) in operators if o == op]
+		if len(found) > 0:
+			relation = _relations[op]
+			p = found[0]
+			# replace the operator by a comma so the sides become a tuple
+			expression = expression[:p] + ',' + expression[p+len(op):]
+			end = end - len(op) + 1
+			break
+	
+	# a right hand side which references a data file is loaded and replaced by 0
+	data = None
+	if relation == 'E':
+		match = re.match(r'\s*@file:(.*\S)\s*$',expression[p+1:end],re.DOTALL)
+		if match is not None:
+			data = util.load(match.group(1),datadir)
+			expression = expression[:p+1] + '0 ' + expression[end:]
+			end = p+2
+			if end == len(expression.rstrip()):
+				expression = expression[:end] + ' ' + _data_loops(expression[:p],data.shape,source)
+	
+	node = ast.parse( '[(' + expression[:end] + ') ' + expression[end:] + ']', mode='eval' ).body
+	
+	if isinstance(node,ast.ListComp):
+		(elt,loops) = (node.elt,node.generators)
+	else:
+		(elt,loops) = (node.elts[0],[])
+		
+	if relation is None:
+		(lhs,rhs) = (elt,None)
+	else:
+		(lhs,rhs) = elt.elts
+		
+	return Statement(source,domainexpr,relation,lhs,rhs,loops,looptext=expression[end:].strip(),data=data)
+	
+	
+def _data_loops(lhs,shape,source):
+	"""
+	creates for statements over the shape of a data file for the indices of lhs
+	"""
+	
+	node = ast.parse(lhs.strip(),mode='eval').body
+	if not isinstance(node,ast.Subscript):
+		return ''
+		
+	index = getattr(node.slice,'value',node.slice)
+	index = index.elts if isinstance(index,ast.Tuple) else [index]
+	if not all(isinstance(n,ast.Name) for n in index) or len(index) != len(shape):
+		raise ValueError('The indices of {} do not match the data shape {}'.format(source,shape))
+		
+	return ' '.join('for {} in range({})'.format(n.id,l) for n,l in zip(index,shape))
+	
+
+	
 def for_array_creation(expression):
 	"""
 	look for an array creating " for  in " keywords in a string and return usefull values
@@ -93,25 +435,8 @@ def for_array_creation(expression):
 	indexlist = []
 	indexvalue = []
 	
-	# find (  ) statements
-	bracepos = matching_braces(expression,['(',')'])
-	
-	# find 'for  in' statements
-	forpos = [p.start(0) for p in re.finditer('for .*? in ',expression)]
-	
-	# check if the for loop is inside braces and ignore it if so
-	tempforpos = []
-	for p in forpos:
-		add = True
-		for b in bracepos:
-			if b[0] <= p and p <= b[1]:
-				add = False
-				break
-		if add:
-			tempforpos.append(p)
-	
-	forpos = tempforpos
-	
+	# find 'for  in' statements which are not inside braces
+	(pairs,forpos,operators) = scan(expression)
 	
 	# split the expression
 	if len(forpos) < 1:
@@ -195,9 +520,17 @@ def equation(expression):
 		type: 'E'
 	"""
 	
-	eqpos = expression.find('=')
-	gepos = expression.find('>=')
-	lepos = expression.find('<=')
+	# find the first position of each operator outside braces
+	(pairs,forpos,operators) = scan(expression)
+	
+	positions = {}
+	for (p,op) in operators:
+		if p > 0 and not op in positions:
+			positions[op] = p
+			
+	gepos = positions.get('>=',-1)
+	lepos = positions.get('<=',-1)
+	eqpos = positions.get('=',-1)
 	
 	if gepos > 0:
 		lhs = expression[:gepos]
@@ -237,26 +570,95 @@ def matching_braces(expression,braces):
 		pairs: [[12, 52], [31, 33], [49, 51], [68, 70], [86, 88]]
 	"""
 	
-	openpos = [p.start(0) for p in re.finditer(re.escape(braces[0]),expression)]
-	closepos = [p.start(0) for p in re.finditer(re.escape(braces[1]),expression)]
+	(pairs,forpos,operators) = scan(expression,[braces])
 	
-	openclosepos = [p.start(0) for p in re.finditer(re.escape(braces[0])+'|'+re.escape(braces[1]),expression)]
+	return pairs[braces[0]]
 	
-	pairs = []
-	for i,o in enumerate(openclosepos):
-		if o in openpos:
-			num_open = 0
-			num_close = 0
+	
+def scan(expression,braces=[['(',')'],['[',']'],['{','}']]):
+	"""
+	scans an expression once and returns the matching braces, the 'for'
+	keywords and the comparison operators which are not inside braces
+	
+	Parameters:
+		expression: 	string, the expression to scan
+		braces: 		list, a list of lists with 2 strings, starting and ending brace
+	
+	Returns:
+		pairs:			dict, the starting braces as keys and lists with pairs of indices of brace positions as values
+		forpos:			list, positions of the 'for' keywords outside braces
+		operators:		list, (position,operator) tuples of the '=', '==', '!=', '<', '<=', '>' and '>=' operators outside braces
+		
+	Example:
+		(pairs,forpos,operators) = jsonopt.parse.scan('x[i] >= sum(a for a in range(i)) for i in range(2)')
+		
+		returns
+		pairs: {'(': [[11, 31], [28, 30], [47, 49]], '[': [[1, 3]], '{': []}
+		forpos: [33]
+		operators: [(5, '>=')]
+	"""
+	
+	opening = {}
+	closing = {}
+	for b in braces:
+		opening[b[0]] = b[0]
+		closing[b[1]] = b[0]
+	
+	stacks = {b[0]:[] for b in braces}
+	pairs = {b[0]:[] for b in braces}
+	depth = 0
+	
+	forpos = []
+	operators = []
+	
+	quote = None
+	n = len(expression)
+	i = 0
+	while i < n:
+		c = expression[i]
+		
+		if quote is not None:
+			# skip the contents of string literals
+			if c == '\\':
+				i += 1
+			elif c == quote:
+				quote = None
+				
+		elif c in opening:
+			pair = [i,None]
+			pairs[opening[c]].append(pair)
+			stacks[opening[c]].append(pair)
+			depth += 1
 			
-			for c in openclosepos[i:]:
-				if c in openpos:
-					num_open = num_open+1
-				if c in closepos:
-					num_close = num_close+1
+		elif c in closing:
+			stack = stacks[closing[c]]
+			if len(stack) > 0:
+				stack.pop()[1] = i
+				depth -= 1
+				
+		elif c == '"' or c == "'":
+			quote = c
+			
+		elif depth == 0:
+			if c in '<>=!':
+				if i+1 < n and expression[i+1] == '=':
+					operators.append((i,c+'='))
+					i += 1
+				elif c != '!':
+					operators.append((i,c))
 					
-				if num_open == num_close:
-					pairs.append([o,c])
-					break
+			elif c == 'f' and expression.startswith('for',i) and (i == 0 or not _isname(expression[i-1])) and (i+3 == n or not _isname(expression[i+3])):
+				forpos.append(i)
+				i += 2
+				
+		i += 1
+	
+	# remove unmatched braces
+	for b in pairs:
+		pairs[b] = [p for p in pairs[b] if p[1] is not None]
+		
+	return (pairs,forpos,operators)
+	
 	
-	return pairs
-	
\ No newline at end of file
+def _isname(c):
+	return c.isalnum() or c == '_'
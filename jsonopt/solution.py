@@ -0,0 +1,100 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright 2016 Brecht Baeten
+#    This file is part of jsonopt.
+#
+#    jsonopt is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    jsonopt is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with jsonopt.  If not, see <http://www.gnu.org/licenses/>.
+################################################################################
+
+import json
+import numpy as np
+
+def write_npz(path,values):
+	"""
+	writes values to a numpy .npz file
+	
+	Parameters:
+		path: 			string or file like object
+		values: 		iterable of (name,value) tuples
+	"""
+	
+	np.savez(path,**{name:np.asarray(value) for name,value in values})
+	
+	
+def write_json(fileobj,values,chunksize=1<<16):
+	"""
+	writes values as a single json object with a key for each name
+	
+	Parameters:
+		fileobj: 		file like object opened for writing text
+		values: 		iterable of (name,value) tuples
+		chunksize: 		int, the maximum number of array elements converted at a time
+	"""
+	
+	fileobj.write('{')
+	for i,(name,value) in enumerate(values):
+		if i > 0:
+			fileobj.write(', ')
+		fileobj.write(json.dumps(name) + ': ')
+		write_value(fileobj,value,chunksize)
+	fileobj.write('}')
+	
+	
+def write_jsonl(fileobj,values,chunksize=1<<16):
+	"""
+	writes values as json lines, with a {"name": ..., "value": ...} object per line
+	
+	Parameters:
+		fileobj: 		file like object opened for writing text
+		values: 		iterable of (name,value) tuples
+		chunksize: 		int, the maximum number of array elements converted at a time
+	"""
+	
+	for name,value in values:
+		fileobj.write('{"name": ' + json.dumps(name) + ', "value": ')
+		write_value(fileobj,value,chunksize)
+		fileobj.write('}\n')
+		
+		
+def write_value(fileobj,value,chunksize=1<<16):
+	"""
+	writes a number or array as json, converting at most chunksize array
+	elements to python floats at a time
+	
+	Parameters:
+		fileobj: 		file like object opened for writing text
+		value: 			number or numpy.array
+		chunksize: 		int, the maximum number of array elements converted at a time
+		
+	Example:
+		jsonopt.solution.write_value(sys.stdout,np.arange(3.))
+		
+		writes
+		[0.0, 1.0, 2.0]
+	"""
+	
+	value = np.asarray(value)
+	if value.ndim == 0:
+		fileobj.write(json.dumps(value.item()))
+		return
+		
+	# blocks of whole rows along the first axis
+	rows = max(1,chunksize//max(1,value[0].size))
+	
+	fileobj.write('[')
+	for start in range(0,len(value),rows):
+		if start > 0:
+			fileobj.write(', ')
+		fileobj.write(json.dumps(value[start:start+rows].tolist())[1:-1])
+	fileobj.write(']')
@@ -0,0 +1,393 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright 2016 Brecht Baeten
+#    This file is part of jsonopt.
+#
+#    jsonopt is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    jsonopt is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with jsonopt.  If not, see <http://www.gnu.org/licenses/>.
+################################################################################
+
+import re
+import sys
+import time
+
+try:
+	import resource
+except ImportError:
+	# windows
+	resource = None
+	
+try:
+	import tracemalloc
+except ImportError:
+	# python 2
+	tracemalloc = None
+	
+	
+class Stats(object):
+	"""
+	Records the wall time, number of calls and optionally the peak memory of
+	the phases of building and solving a problem, in total and per variable,
+	parameter or constraint name
+	
+	Memory is measured with tracemalloc when it is available, as the peak
+	traced memory above the memory at the start of the phase. Otherwise the
+	increase of the peak resident memory of the process is used, which is
+	reported as 0 on platforms without the resource module.
+	
+	Example:
+		stats = jsonopt.stats.Stats(memory=True)
+		stats.add_hook(lambda record: print(record))
+		problem = jsonopt.Problem(jsonstring,stats=stats)
+		problem.solve()
+		problem.stats.phases['solve']
+		problem.stats.components['T']
+	"""
+	
+	def __init__(self,memory=False,hooks=[]):
+		"""
+		Parameters:
+			memory:		boolean, measure the peak memory of each phase
+			hooks:		list, functions called with a record dict after each measured phase
+		"""
+		
+		self.memory = memory
+		self.hooks = list(hooks)
+		
+		self.phases = {}
+		self.components = {}
+		
+		self._stack = []
+		
+	def add_hook(self,hook):
+		"""
+		adds a function which is called with a record dict with keys phase,
+		name, time and memory after each measured phase
+		"""
+		self.hooks.append(hook)
+		
+	def measure(self,phase,name=None):
+		"""
+		returns a context manager which measures a phase, the yielded record
+		dict can be used to set the name when it is known later
+		
+		Example:
+			with stats.measure('parse') as record:
+				record['name'] = 'x'
+		"""
+		return _Measurement(self,phase,name)
+		
+	def reset(self):
+		"""
+		removes all recorded measurements
+		"""
+		self.phases.clear()
+		self.components.clear()
+		
+	def _record(self,record):
+		_add(self.phases.setdefault(record['phase'],_empty()),record)
+		if record['name'] is not None:
+			_add(self.components.setdefault(record['name'],{}).setdefault(record['phase'],_empty()),record)
+			
+		for hook in self.hooks:
+			hook(record)
+			
+	def _memory_start(self):
+		if tracemalloc is None:
+			return _peak_resident_memory()
+			
+		if not tracemalloc.is_tracing():
+			tracemalloc.start()
+		
+		(current,peak) = tracemalloc.get_traced_memory()
+		if len(self._stack) > 0:
+			self._stack[-1] = max(self._stack[-1],peak)
+		if hasattr(tracemalloc,'reset_peak'):
+			tracemalloc.reset_peak()
+		self._stack.append(current)
+		return current
+		
+	def _memory_end(self,start):
+		if tracemalloc is None:
+			return _peak_resident_memory() - start
+		
+		peak = max(self._stack.pop(),tracemalloc.get_traced_memory()[1])
+		if len(self._stack) > 0:
+			self._stack[-1] = max(self._stack[-1],peak)
+		return peak - start
+		
+	def __repr__(self):
+		lines = ['{:<16s} {:>8s} {:>12s} {:>14s}'.format('phase','calls','time (s)','memory (B)')]
+		for phase in sorted(self.phases):
+			data = self.phases[phase]
+			lines.append('{:<16s} {:8d} {:12.6f} {:14d}'.format(phase,data['calls'],data['time'],data['memory']))
+		return '\n'.join(lines)
+		
+		
+def _peak_resident_memory():
+	"""
+	returns the peak resident memory of the process in bytes, or 0 when it is not available
+	"""
+	if resource is None:
+		return 0
+		
+	maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# macos reports bytes, linux and the bsds kilobytes
+	return maxrss if sys.platform == 'darwin' else maxrss*1024
+	
+	
+def instrument_solver(stats,optimizer):
+	"""
+	measures the phases of a pyomo shell solver, writing the problem file
+	(solve.write), running the solver executable (solve.solver) and reading
+	the results (solve.read)
+	
+	Solvers without these phases are only measured as a whole.
+	
+	Parameters:
+		stats:			Stats
+		optimizer:		pyomo solver
+	"""
+	
+	if getattr(optimizer,'_jsonopt_stats',None) is stats:
+		return
+		
+	for method,phase in [('_presolve','solve.write'),('_apply_solver','solve.solver'),('_postsolve','solve.read')]:
+		# wrap the class method so instrumenting twice does not nest
+		function = getattr(type(optimizer),method,None)
+		if function is not None:
+			setattr(optimizer,method,_wrap(stats,phase,function.__get__(optimizer,type(optimizer))))
+			
+	optimizer._jsonopt_stats = stats
+	
+def _wrap(stats,phase,function):
+	def wrapped(*args,**kwargs):
+		with stats.measure(phase):
+			return function(*args,**kwargs)
+	return wrapped
+	
+	
+def _empty():
+	return {'calls':0, 'time':0., 'memory':0}
+	
+def _add(data,record):
+	data['calls'] += 1
+	data['time'] += record['time']
+	data['memory'] = max(data['memory'],record['memory'])
+	
+	
+class _Measurement(object):
+	"""
+	context manager which measures a single phase
+	"""
+	
+	def __init__(self,stats,phase,name):
+		self.stats = stats
+		self.record = {'phase':phase, 'name':name, 'time':0., 'memory':0}
+		
+	def __enter__(self):
+		if self.stats.memory:
+			self.memory = self.stats._memory_start()
+		self.start = time.time()
+		return self.record
+		
+	def __exit__(self,exc_type,exc_value,traceback):
+		self.record['time'] = time.time()-self.start
+		if self.stats.memory:
+			self.record['memory'] = int(self.stats._memory_end(self.memory))
+			
+		self.stats._record(self.record)
+		return False
+		
+		
+class _Disabled(object):
+	"""
+	context manager which measures nothing, used when stats are disabled
+	"""
+	
+	def __enter__(self):
+		return {}
+		
+	def __exit__(self,exc_type,exc_value,traceback):
+		return False
+		
+disabled = _Disabled()
+	
+	
+class SolveResult(object):
+	"""
+	The outcome of a solve with the solver status, the number of iterations,
+	the time of each phase and the iteration log when the solver output
+	could be parsed
+	
+	result.solver returns the result itself, so result.solver.status and
+	result.solver.termination_condition work like for pyomo results.
+	"""
+	
+	def __init__(self,status,termination_condition,message='',name=None,iterations=None,objective=None,infeasibility=None,solver_time=None,times=None,log=None,results=None):
+		"""
+		Parameters:
+			status:					string, 'ok', 'warning', 'error' or 'aborted'
+			termination_condition:	string, for instance 'optimal', 'infeasible' or 'maxIterations'
+			message:				string, the solver message
+			name:					string, the solver name
+			iterations:				int, the number of iterations
+			objective:				float, the final objective value reported by the solver
+			infeasibility:			float, the final constraint violation reported by the solver
+			solver_time:			float, the cpu time reported by the solver in seconds
+			times:					dict, the wall time of the phases of the solve, like total, write, solver and read, in seconds
+			log:					list, a dict for each iteration
+			results:				the results of the underlying solver
+		"""
+		
+		self.status = status
+		self.termination_condition = termination_condition
+		self.message = message
+		self.name = name
+		self.iterations = iterations
+		self.objective = objective
+		self.infeasibility = infeasibility
+		self.solver_time = solver_time
+		self.times = dict(times) if times is not None else {}
+		self.log = log if log is not None else []
+		self.results = results
+		
+	@property
+	def solver(self):
+		return self
+		
+	@property
+	def success(self):
+		"""
+		True when the solver found an optimal solution
+		"""
+		return self.termination_condition == 'optimal'
+		
+	def to_dict(self):
+		"""
+		returns the result as a dict without the results of the underlying solver
+		"""
+		return {'status':self.status, 'termination_condition':self.termination_condition, 'message':self.message, 'name':self.name,
+		        'iterations':self.iterations, 'objective':self.objective, 'infeasibility':self.infeasibility, 'solver_time':self.solver_time,
+		        'times':dict(self.times), 'log':list(self.log)}
+		
+	def __repr__(self):
+		return 'SolveResult(status={}, termination_condition={}, iterations={}, time={})'.format(self.status,self.termination_condition,self.iterations,self.times.get('total'))
+		
+		
+# the columns of an ipopt iteration line, a restoration iteration has an r
+# after its number and alpha_pr is followed by a letter for the step type
+_ipopt_iteration = re.compile(r'^\s*(\d+)(r?)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+?)[a-zA-Z]?\s+(\d+)\s*$')
+_ipopt_columns = ['objective','inf_pr','inf_du','lg_mu','d_norm','lg_rg','alpha_du','alpha_pr']
+_ipopt_summary = [
+	('iterations',re.compile(r'Number of Iterations\.*:\s*(\d+)'),int),
+	('objective',re.compile(r'Objective\.*:\s*\S+\s+(\S+)'),float),
+	('infeasibility',re.compile(r'Constraint violation\.*:\s*\S+\s+(\S+)'),float),
+	('message',re.compile(r'EXIT:\s*(.*\S)'),str),
+]
+
+def _float(value):
+	try:
+		return float(value)
+	except ValueError:
+		return None
+		
+def parse_ipopt_log(output):
+	"""
+	parses the iteration log and the summary of the output of ipopt
+	
+	Parameters:
+		output:			string, the ipopt output
+		
+	Returns:
+		log:			list, a dict for each iteration with keys iter, restoration, objective, inf_pr, inf_du, lg_mu, d_norm, lg_rg, alpha_du, alpha_pr and ls
+		summary:		dict, the iterations, objective, infeasibility, message and solver_time when they are found
+		
+	Example:
+		(log,summary) = jsonopt.stats.parse_ipopt_log(output)
+		[iteration['inf_pr'] for iteration in log]
+	"""
+	
+	log = []
+	summary = {}
+	times = []
+	header = False
+	for line in output.splitlines():
+		if line.startswith('iter'):
+			header = True
+			continue
+		
+		match = _ipopt_iteration.match(line) if header else None
+		if match is not None:
+			groups = match.groups()
+			iteration = {'iter':int(groups[0]), 'restoration':groups[1] == 'r', 'ls':int(groups[-1])}
+			iteration.update(zip(_ipopt_columns,[_float(value) for value in groups[2:-1]]))
+			log.append(iteration)
+			continue
+			
+		for (key,pattern,convert) in _ipopt_summary:
+			match = pattern.search(line)
+			if match is not None:
+				summary[key] = convert(match.group(1))
+				
+		# ipopt 3.14 reports the total time, older versions the time with and without function evaluations
+		match = re.search(r'Total (?:CPU )?sec(?:ond)?s in [^=]*=\s*(\S+)',line)
+		if match is not None:
+			times.append(float(match.group(1)))
+			
+	if len(times) > 0:
+		summary['solver_time'] = sum(times)
+		
+	return (log,summary)
+	
+	
+def summarize(results):
+	"""
+	aggregates the results of many solves
+	
+	Parameters:
+		results:		list, SolveResult objects or their dicts as returned by to_dict
+		
+	Returns:
+		summary:		dict, the number of solves, the count of each termination condition and the total, mean, min and max of the iterations, the solver time and the time of each phase
+		
+	Example:
+		results = [values['result'] for index,values,status in problem.solve_batch(scenarios) if values is not None]
+		jsonopt.stats.summarize(results)['times']['total']['max']
+	"""
+	
+	results = [result.to_dict() if isinstance(result,SolveResult) else result for result in results]
+	
+	termination_conditions = {}
+	for result in results:
+		condition = str(result['termination_condition'])
+		termination_conditions[condition] = termination_conditions.get(condition,0) + 1
+		
+	phases = sorted(set(phase for result in results for phase in result.get('times',{})))
+	
+	return {
+		'solves': len(results),
+		'termination_conditions': termination_conditions,
+		'iterations': _aggregate([result.get('iterations') for result in results]),
+		'solver_time': _aggregate([result.get('solver_time') for result in results]),
+		'times': dict((phase,_aggregate([result.get('times',{}).get(phase) for result in results])) for phase in phases),
+	}
+	
+def _aggregate(values):
+	"""
+	returns the count, total, mean, min and max of the values which are not None
+	"""
+	values = [value for value in values if value is not None]
+	if len(values) == 0:
+		return {'count':0, 'total':None, 'mean':None, 'min':None, 'max':None}
+	return {'count':len(values), 'total':sum(values), 'mean':sum(values)/float(len(values)), 'min':min(values), 'max':max(values)}
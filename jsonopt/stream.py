@@ -0,0 +1,228 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright 2016 Brecht Baeten
+#    This file is part of jsonopt.
+#
+#    jsonopt is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    jsonopt is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with jsonopt.  If not, see <http://www.gnu.org/licenses/>.
+################################################################################
+
+import re
+import json
+import codecs
+
+_whitespace = ' \t\n\r'
+_structure = re.compile(r'["\[\]{}]')
+_scalarend = re.compile(r'[\s,\]}]')
+
+
+def sections(fileobj,chunksize=1<<16):
+	"""
+	incrementally parses a json object from a file and yields its top level
+	items one at a time without reading the whole file in memory
+	
+	For each key a (key,items) tuple is yielded where items is a generator
+	over the elements of the value when it is a list, or over the value itself
+	otherwise. Only one element is held in memory at a time. Items which are
+	not consumed are skipped before the next key is read.
+	
+	Parameters:
+		fileobj:		file like object with a read method
+		chunksize:		int, the number of characters read at a time
+		
+	Example:
+		with open('problem.json') as f:
+			for key,items in jsonopt.stream.sections(f):
+				for item in items:
+					print(key,item)
+	"""
+	
+	reader = _Reader(fileobj,chunksize)
+	
+	reader.expect('{')
+	if reader.peek() == '}':
+		reader.pos += 1
+		return
+		
+	while True:
+		key = reader.value()
+		reader.expect(':')
+		
+		items = _items(reader)
+		yield (key,items)
+		for item in items:
+			pass
+		
+		if reader.expect(',}') == '}':
+			break
+	
+	if reader.peek() != '':
+		raise ValueError('Extra data after the json object at character {}'.format(reader.offset+reader.pos))
+		
+		
+def _items(reader):
+	"""
+	yields the elements of a list value or the value itself
+	"""
+	
+	if reader.peek() != '[':
+		yield reader.value()
+		return
+	
+	reader.pos += 1
+	if reader.peek() == ']':
+		reader.pos += 1
+		return
+		
+	while True:
+		yield reader.value()
+		reader.compact()
+		if reader.expect(',]') == ']':
+			break
+			
+			
+class _Reader(object):
+	"""
+	buffered reader which decodes json values from a file one at a time
+	"""
+	
+	def __init__(self,fileobj,chunksize):
+		self.file = fileobj
+		self.chunksize = chunksize
+		self.buffer = ''
+		self.pos = 0
+		self.offset = 0
+		self.decoder = None
+		
+	def read(self):
+		"""
+		appends a chunk to the buffer, returns False at the end of the file
+		"""
+		chunk = self.file.read(self.chunksize)
+		if isinstance(chunk,bytes) and not isinstance(chunk,str):
+			# binary files in python 3
+			if self.decoder is None:
+				self.decoder = codecs.getincrementaldecoder('utf-8')()
+			chunk = self.decoder.decode(chunk)
+			
+		if len(chunk) == 0:
+			return False
+		
+		self.buffer += chunk
+		return True
+		
+	def compact(self):
+		"""
+		drops the consumed part of the buffer
+		"""
+		if self.pos > self.chunksize:
+			self.offset += self.pos
+			self.buffer = self.buffer[self.pos:]
+			self.pos = 0
+		
+	def peek(self):
+		"""
+		skips whitespace and returns the next character or '' at the end of the file
+		"""
+		while True:
+			while self.pos < len(self.buffer) and self.buffer[self.pos] in _whitespace:
+				self.pos += 1
+			if self.pos < len(self.buffer):
+				return self.buffer[self.pos]
+			
+			self.compact()
+			if not self.read():
+				return ''
+				
+	def expect(self,characters):
+		"""
+		consumes the next character which must be one of characters
+		"""
+		char = self.peek()
+		if char == '' or not char in characters:
+			raise ValueError('Expecting one of "{}" at character {}'.format(characters,self.offset+self.pos))
+		self.pos += 1
+		return char
+		
+	def value(self):
+		"""
+		decodes the next json value
+		"""
+		char = self.peek()
+		if char == '"':
+			end = self._string_end(self.pos)
+		elif char in '[{':
+			end = self._container_end()
+		else:
+			end = self._scalar_end()
+			
+		value = json.loads(self.buffer[self.pos:end])
+		self.pos = end
+		return value
+		
+	def _string_end(self,start):
+		"""
+		returns the position after the closing quote of the string starting at start
+		"""
+		i = start+1
+		while True:
+			j = self.buffer.find('"',i)
+			if j < 0:
+				i = len(self.buffer)
+				if not self.read():
+					raise ValueError('Unterminated string starting at character {}'.format(self.offset+start))
+				continue
+				
+			# an escaped quote is preceded by an odd number of backslashes
+			k = j
+			while self.buffer[k-1] == '\\':
+				k -= 1
+			if (j-k)%2 == 0:
+				return j+1
+			i = j+1
+			
+	def _container_end(self):
+		"""
+		returns the position after the list or object starting at the current position
+		"""
+		depth = 0
+		i = self.pos
+		while True:
+			match = _structure.search(self.buffer,i)
+			if match is None:
+				i = len(self.buffer)
+				if not self.read():
+					raise ValueError('Unterminated value starting at character {}'.format(self.offset+self.pos))
+				continue
+				
+			char = match.group()
+			i = match.end()
+			if char == '"':
+				i = self._string_end(match.start())
+			elif char in '[{':
+				depth += 1
+			else:
+				depth -= 1
+				if depth == 0:
+					return i
+		
+	def _scalar_end(self):
+		"""
+		returns the position after a number, true, false or null
+		"""
+		while True:
+			match = _scalarend.search(self.buffer,self.pos)
+			if match is not None:
+				return match.start()
+			if not self.read():
+				return len(self.buffer)
@@ -1,4 +1,286 @@
+import os
+import re
+import importlib
+import itertools
 import numpy as np
 
 specialfunctions = {'sin':np.sin, 'cos':np.cos, 'tan':np.tan, 'arcsin':np.arcsin, 'arccos':np.arccos, 'arctan':np.arctan,
-					'exp':np.exp, 'ln': np.log, 'log': np.log}
\ No newline at end of file
+					'exp':np.exp, 'ln': np.log, 'log': np.log}
+
+def isempty(value):
+	"""
+	checks if a parsed value is the empty list used for expressions without a value
+	"""
+	return isinstance(value,list) and len(value)==0
+	
+def initializer(indexvalue,value):
+	"""
+	creates a dict which maps each index to its value, to be used as a bulk initializer for indexed components
+	
+	Parameters:
+		indexvalue: 	list, a list of all values of the indices
+		value: 			numpy.array, values ordered as indexvalue when flattened
+	"""
+	return dict(zip(indexvalue,np.asarray(value).ravel().tolist()))
+	
+	
+class ArrayValues(object):
+	"""
+	Read only mapping from the indices of a parameter to the values in a
+	numpy array, integer indices are used as positions
+	
+	It is used as the default of array backed parameters, so the array is the
+	only store of the values and component data is only created for the
+	indices which are used in expressions.
+	
+	Example:
+		values = jsonopt.util.ArrayValues(np.arange(6.).reshape((2,3)))
+		values[1,2]
+		
+		returns
+		5.0
+	"""
+	
+	def __init__(self,array):
+		"""
+		Parameters:
+			array: 		numpy.array, the values
+		"""
+		self.array = array
+		
+	def __getitem__(self,key):
+		return float(self.array[key])
+		
+		
+def load(reference,datadir=None):
+	"""
+	loads an array from a .npy file, which is memory mapped, or from a .npz
+	file where the array name is given after a colon
+	
+	Parameters:
+		reference: 		string, the file path, relative to datadir
+		datadir: 		string, the directory of relative paths, defaults to the working directory
+		
+	Returns:
+		value: 			numpy.array
+		
+	Example:
+		value = jsonopt.util.load('prices.npy')
+		value = jsonopt.util.load('profiles.npz:prices')
+	"""
+	
+	match = re.match(r'(.*\.npz)(?::(\w+))?$',reference.strip())
+	(path,key) = match.groups() if match is not None else (reference.strip(),None)
+	
+	if datadir is not None:
+		path = os.path.join(datadir,path)
+	
+	data = np.load(path,mmap_mode='r')
+	
+	if isinstance(data,np.ndarray):
+		return data
+		
+	with data:
+		if key is None:
+			if len(data.files) != 1:
+				raise ValueError('{} contains the arrays {}, use {}:name to select one'.format(path,data.files,path))
+			key = data.files[0]
+		return data[key]
+		
+		
+class LazyModule(object):
+	"""
+	Module proxy which imports the module on first attribute access
+	
+	Example:
+		pm = jsonopt.util.LazyModule('pyomo.environ')
+		model = pm.ConcreteModel()
+	"""
+	
+	def __init__(self,name):
+		"""
+		Parameters:
+			name: 		string, the full module name
+		"""
+		self._name = name
+		self._module = None
+		
+	def __getattr__(self,attr):
+		if attr.startswith('__'):
+			raise AttributeError(attr)
+		
+		if self._module is None:
+			self._module = importlib.import_module(self._name)
+		
+		value = getattr(self._module,attr)
+		setattr(self,attr,value)
+		return value
+		
+		
+class LazyAttribute(object):
+	"""
+	Class attribute which is computed by a function on first access
+	
+	Example:
+		class A:
+			domains = jsonopt.util.LazyAttribute(lambda: ['Reals'])
+	"""
+	
+	def __init__(self,function):
+		self._function = function
+		self._value = None
+		
+	def __get__(self,instance,owner):
+		if self._value is None:
+			self._value = self._function()
+		return self._value
+		
+		
+class IndexMap(object):
+	"""
+	Maps the indices of a variable or parameter to positions in a numpy array,
+	integer indices are used as positions
+	
+	Example:
+		indexmap = jsonopt.util.IndexMap([(0,0),(0,1),(1,0),(1,1)])
+		indexmap.shape
+		
+		returns
+		(2,2)
+	"""
+	
+	def __init__(self,indexvalue):
+		"""
+		Parameters:
+			indexvalue: 	list, a list of all values of the indices, empty for scalars
+		"""
+		
+		self.scalar = len(indexvalue)==0
+		self.keys = [None] if self.scalar else indexvalue
+		self._positions = None
+		self._shape = None
+		
+	def _map(self):
+		if self.scalar:
+			self._shape = ()
+			self._positions = ()
+		else:
+			index = np.array(self.keys)
+			if index.dtype.kind not in 'iu':
+				raise ValueError('Only integer indices can be mapped to array positions')
+			
+			index = index.reshape((len(self.keys),-1))
+			self._shape = tuple(index.max(axis=0)+1)
+			self._positions = tuple(index.T)
+		
+	@property
+	def shape(self):
+		"""
+		the shape of the value array
+		"""
+		if self._shape is None:
+			self._map()
+		return self._shape
+	
+	@property
+	def positions(self):
+		"""
+		a tuple of integer arrays with the array position of each index
+		"""
+		if self._positions is None:
+			self._map()
+		return self._positions
+	
+	def values(self,array):
+		"""
+		returns a list with the values for each index from an array of values
+		
+		Parameters:
+			array: 		numpy.array or number, an array with the shape of the map or a scalar
+		"""
+		
+		array = np.asarray(array)
+		if array.ndim > 0 and array.shape != self.shape:
+			raise ValueError('The shape {} does not match the index shape {}'.format(array.shape,self.shape))
+		
+		return np.broadcast_to(array,self.shape)[self.positions].tolist()
+		
+	def broadcast(self,array):
+		"""
+		returns a new float array with the shape of the map from an array of values
+		
+		Parameters:
+			array: 		numpy.array or number, an array with the shape of the map or a scalar
+		"""
+		
+		array = np.asarray(array,dtype=float)
+		if array.ndim > 0 and array.shape != self.shape:
+			raise ValueError('The shape {} does not match the index shape {}'.format(array.shape,self.shape))
+			
+		return np.array(np.broadcast_to(array,self.shape))
+
+		
+		
+class RangeIndexMap(IndexMap):
+	"""
+	IndexMap of a rectangular index set of ranges, which does not store the
+	keys
+	
+	Example:
+		indexmap = jsonopt.util.RangeIndexMap([(0,2,1),(1,3,1)])
+		indexmap.shape
+		
+		returns
+		(2,3)
+	"""
+	
+	def __init__(self,ranges):
+		"""
+		Parameters:
+			ranges: 		list, (start,stop,step) tuples of each index as returned by jsonopt.parse.ranges
+		"""
+		
+		self.scalar = False
+		self.ranges = ranges
+		self.slices = tuple(slice(start,stop,step) for (start,stop,step) in ranges)
+		self.rangeshape = tuple((stop-start-1)//step+1 for (start,stop,step) in ranges)
+		self._shape = tuple(start+step*(n-1)+1 for (start,stop,step),n in zip(ranges,self.rangeshape))
+		self._positions = None
+		self._keys = None
+		
+	def _map(self):
+		grid = np.meshgrid(*[np.arange(*r) for r in self.ranges],indexing='ij')
+		self._positions = tuple(g.ravel() for g in grid)
+		
+	def __len__(self):
+		return int(np.prod(self.rangeshape))
+		
+	def __iter__(self):
+		ranges = [range(*r) for r in self.ranges]
+		return iter(ranges[0]) if len(ranges)==1 else itertools.product(*ranges)
+		
+	@property
+	def keys(self):
+		"""
+		a list of all values of the indices, which is only created when needed
+		"""
+		if self._keys is None:
+			ranges = [range(*r) for r in self.ranges]
+			self._keys = list(ranges[0]) if len(ranges)==1 else list(itertools.product(*ranges))
+		return self._keys
+		
+	def array(self,value):
+		"""
+		returns a float array with the shape of the map from values with the shape of the ranges
+		
+		Parameters:
+			value: 		numpy.array, values with one dimension per range or flat and ordered as the keys
+		"""
+		
+		value = np.asarray(value,dtype=float).reshape(self.rangeshape)
+		if all(start == 0 and step == 1 for (start,stop,step) in self.ranges):
+			return value
+			
+		array = np.zeros(self.shape)
+		array[self.slices] = value
+		return array
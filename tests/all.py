@@ -22,5 +22,9 @@ import unittest
 from string_parsing import *
 from problem_definition import *
 from problem_solution import *
+from caching import *
+from nl_backend import *
+from scipy_backend import *
+from mpc import *
 
 unittest.main()
\ No newline at end of file
@@ -0,0 +1,185 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright 2016 Brecht Baeten
+#    This file is part of jsonopt.
+#
+#    jsonopt is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    jsonopt is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with jsonopt.  If not, see <http://www.gnu.org/licenses/>.
+################################################################################
+
+import unittest
+import os
+import shutil
+import tempfile
+import multiprocessing
+import numpy as np
+
+import jsonopt
+
+
+def read_example(name):
+	with open('..//examples//json//{}.json'.format(name), 'r') as myfile:
+		return myfile.read()
+		
+def build_cached(args):
+	(jsonstring,directory) = args
+	problem = jsonopt.Problem(jsonstring,cache_dir=directory)
+	return problem.get_value('T').tolist()
+	
+
+class TestCaching(unittest.TestCase):
+	
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def test_lrucache(self):
+		cache = jsonopt.caching.LRUCache(maxsize=2)
+		cache.put('a',1)
+		cache.put('b',2)
+		self.assertEqual(cache.get('a'),1)
+		cache.put('c',3)
+		
+		self.assertNotIn('b',cache)
+		self.assertIn('a',cache)
+		self.assertIn('c',cache)
+		self.assertEqual(cache.get('b'),None)
+		self.assertEqual(cache.info(),{'hits':1, 'misses':1, 'evictions':1, 'size':2, 'maxsize':2})
+		
+	def test_structure_key(self):
+		problem1 = {'variables':['Reals x'], 'parameters':['A = 1'], 'constraints':['x >= A'], 'objective':'x'}
+		problem2 = {'variables':['Reals x'], 'parameters':['A = 2'], 'constraints':['x >= A'], 'objective':'x'}
+		problem3 = {'variables':['Reals x'], 'parameters':['A = 1'], 'constraints':['x <= A'], 'objective':'x'}
+		
+		self.assertEqual(jsonopt.caching.structure_key(problem1),jsonopt.caching.structure_key(problem2))
+		self.assertNotEqual(jsonopt.caching.structure_key(problem1),jsonopt.caching.structure_key(problem3))
+		self.assertNotEqual(jsonopt.caching.structure_key(problem1),jsonopt.caching.structure_key(problem1,backend='nl'))
+	
+	def test_from_json_backend(self):
+		jsonstring = '{"variables":["Any x[j] for j in range(3)"], "parameters":[], "constraints":[], "objective":"0"}'
+		cache = jsonopt.caching.LRUCache()
+		jsonopt.Problem.from_json(jsonstring,cache=cache)
+		
+		# the nl backend checks the domain again
+		self.assertRaises(ValueError,jsonopt.Problem.from_json,jsonstring,cache=cache,backend='nl')
+	
+	def test_from_json_datadir(self):
+		jsonstring = '{"variables":["Reals x[j] = @file:x.npy for j in range(3)"], "parameters":[], "constraints":[], "objective":"sum(x[j] for j in range(3))"}'
+		cache = jsonopt.caching.LRUCache()
+		values = []
+		for i in range(2):
+			datadir = os.path.join(self.directory,str(i))
+			os.makedirs(datadir)
+			np.save(os.path.join(datadir,'x.npy'),i*np.ones(3))
+			values.append(jsonopt.Problem.from_json(jsonstring,cache=cache,datadir=datadir).get_value('x').tolist())
+		
+		self.assertEqual(values,[[0.,0.,0.],[1.,1.,1.]])
+		self.assertEqual(cache.info()['misses'],2)
+	
+	def test_diskcache(self):
+		cache = jsonopt.caching.DiskCache(os.path.join(self.directory,'cache'))
+		cache.put('a',{'x':np.arange(3)})
+		
+		self.assertIn('a',cache)
+		self.assertNotIn('b',cache)
+		self.assertEqual(cache.get('a')['x'].tolist(),[0,1,2])
+		self.assertEqual(cache.get('b'),None)
+		
+		info = cache.info()
+		self.assertEqual((info['hits'],info['misses'],info['size']),(1,1,1))
+		
+		# other processes see the same items
+		self.assertEqual(jsonopt.caching.DiskCache(os.path.join(self.directory,'cache')).get('a')['x'].tolist(),[0,1,2])
+		
+	def test_diskcache_eviction(self):
+		cache = jsonopt.caching.DiskCache(self.directory,maxsize=3000)
+		for i,key in enumerate(['a','b','c']):
+			cache.put(key,np.zeros(100))
+			os.utime(os.path.join(self.directory,key+'.pkl'),(i,i))
+		cache.get('a')
+		cache.put('d',np.zeros(100))
+		
+		self.assertIn('a',cache)
+		self.assertNotIn('b',cache)
+		self.assertIn('c',cache)
+		self.assertIn('d',cache)
+		self.assertEqual(cache.info()['evictions'],1)
+		self.assertLessEqual(cache.info()['bytes'],3000)
+		
+	def test_diskcache_corrupt(self):
+		cache = jsonopt.caching.DiskCache(self.directory)
+		with open(os.path.join(self.directory,'a.pkl'),'w') as f:
+			f.write('not a pickle')
+			
+		self.assertEqual(cache.get('a'),None)
+		self.assertNotIn('a',cache)
+		
+	def test_model_key(self):
+		problem1 = {'variables':['Reals x'], 'parameters':['A = 1'], 'constraints':['x >= A'], 'objective':'x'}
+		problem2 = {'variables':['Reals x'], 'parameters':['A = 2'], 'constraints':['x >= A'], 'objective':'x'}
+		
+		self.assertEqual(jsonopt.caching.model_key(problem1),jsonopt.caching.model_key(dict(problem1)))
+		self.assertNotEqual(jsonopt.caching.model_key(problem1),jsonopt.caching.model_key(problem2))
+		self.assertNotEqual(jsonopt.caching.model_key(problem1),jsonopt.caching.model_key(problem1,backend='nl'))
+		
+	def test_model_key_files(self):
+		problem = {'variables':['Reals x[j] for j in range(3)'], 'parameters':['p[j] = @file:p.npy for j in range(3)'], 'constraints':[], 'objective':'sum(x)'}
+		np.save(os.path.join(self.directory,'p.npy'),np.zeros(3))
+		key = jsonopt.caching.model_key(problem,datadir=self.directory)
+		
+		np.save(os.path.join(self.directory,'p.npy'),np.zeros(4))
+		self.assertNotEqual(jsonopt.caching.model_key(problem,datadir=self.directory),key)
+		
+	def test_problem_cache_dir(self):
+		for backend in ['pyomo','nl']:
+			cache = jsonopt.caching.DiskCache(os.path.join(self.directory,backend))
+			problem = jsonopt.Problem(read_example('ocp1'),backend=backend,cache_dir=cache)
+			cached = jsonopt.Problem(read_example('ocp1'),backend=backend,cache_dir=cache)
+			
+			self.assertEqual(cache.info()['hits'],1)
+			self.assertEqual(cached.backend,backend)
+			self.assertEqual(sorted(cached.variables),sorted(problem.variables))
+			self.assertEqual(cached.get_value('p').tolist(),problem.get_value('p').tolist())
+			
+			# the model is built from the cache and not from the rules
+			paths = []
+			for instance in [problem,cached]:
+				paths.append(os.path.join(self.directory,'{}.nl'.format(len(paths))))
+				if backend == 'nl':
+					jsonopt.nl.write(instance.model,paths[-1])
+				else:
+					instance.model.write(paths[-1])
+			with open(paths[0]) as f0, open(paths[1]) as f1:
+				self.assertTrue(f0.read() == f1.read())
+			
+			cached.set_values({'P':np.ones(24)})
+			self.assertEqual(cached.get_value('P').tolist(),[1.]*24)
+			self.assertEqual(problem.get_value('P').tolist(),[0.]*24)
+				
+	def test_problem_cache_dir_processes(self):
+		pool = multiprocessing.Pool(4)
+		try:
+			values = pool.map(build_cached,[(read_example('ocp1'),self.directory)]*8)
+		finally:
+			pool.close()
+			pool.join()
+			
+		self.assertEqual(values,[[20.]*25]*8)
+		self.assertEqual(len(jsonopt.caching.DiskCache(self.directory)),1)
+		self.assertEqual([name for name in os.listdir(self.directory) if name.endswith('.tmp')],[])
+		
+		
+if __name__ == '__main__':
+	unittest.main()
\ No newline at end of file
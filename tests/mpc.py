@@ -0,0 +1,113 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright 2016 Brecht Baeten
+#    This file is part of jsonopt.
+#
+#    jsonopt is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    jsonopt is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with jsonopt.  If not, see <http://www.gnu.org/licenses/>.
+################################################################################
+
+import unittest
+import numpy as np
+
+import jsonopt
+
+
+def read_example(name):
+	with open('..//examples//json//{}.json'.format(name), 'r') as myfile:
+		return myfile.read()
+		
+timeindexed = ['T','P','Q','COP','p','Ta']
+
+
+class TestMPC(unittest.TestCase):
+	
+	def test_shift(self):
+		problem = jsonopt.Problem(read_example('ocp1'))
+		problem.set_values({'P':np.arange(24.), 'p':np.arange(24.)})
+		components = dict((name,id(problem.get_variable(name))) for name in timeindexed)
+		
+		mpc = jsonopt.mpc.MPC(problem,timeindexed)
+		mpc.shift({'p':[30.]})
+		
+		self.assertEqual(problem.get_value('P').tolist(),list(range(1,24))+[23])
+		self.assertEqual(problem.get_value('p').tolist(),list(range(1,24))+[30])
+		self.assertEqual(problem.get_value('T').tolist(),[20.]*25)
+		self.assertEqual(mpc.steps,1)
+		
+		# the components are changed in place
+		self.assertEqual(dict((name,id(problem.get_variable(name))) for name in timeindexed),components)
+		
+	def test_shift_steps(self):
+		problem = jsonopt.Problem(read_example('ocp1'),backend='nl')
+		problem.set_values({'Ta':np.arange(24.)})
+		
+		mpc = jsonopt.mpc.MPC(problem,{'Ta':0})
+		mpc.shift({'Ta':[30.,31.,32.]},steps=3)
+		self.assertEqual(problem.get_value('Ta').tolist(),list(range(3,24))+[30,31,32])
+		
+		mpc.shift({'Ta':np.ones(24)})
+		self.assertEqual(problem.get_value('Ta').tolist(),[1.]*24)
+		
+	def test_shift_axis(self):
+		problem = jsonopt.Problem(backend='nl')
+		problem.add_parameter('p[i,j] = 10*i+j for i in range(2) for j in range(4)')
+		
+		mpc = jsonopt.mpc.MPC(problem,['p'],axis=1)
+		mpc.shift({'p':[[4],[14]]})
+		self.assertEqual(problem.get_value('p').tolist(),[[1,2,3,4],[11,12,13,14]])
+		
+	def test_invalid(self):
+		problem = jsonopt.Problem(read_example('ocp1'),backend='nl')
+		self.assertRaises(ValueError,jsonopt.mpc.MPC,problem,['p'],axis=1)
+		
+		mpc = jsonopt.mpc.MPC(problem,['p'])
+		self.assertRaises(KeyError,mpc.shift,{'C':[1.]})
+		
+	def test_step(self):
+		problem = jsonopt.Problem(read_example('ocp1'),backend='scipy')
+		mpc = jsonopt.mpc.MPC(problem,timeindexed,solver='SLSQP')
+		mpc.solve()
+		
+		for k in range(3):
+			mpc.step({'p':[0.20], 'Ta':[problem.get_value('Ta')[0]]})
+			
+		self.assertEqual([entry['step'] for entry in mpc.log],[0,1,2,3])
+		self.assertEqual([entry['status'] for entry in mpc.log],['optimal']*4)
+		for entry in mpc.log:
+			self.assertGreater(entry['time'],0)
+			
+		# the prices and temperatures are periodic, so the solution is shifted by 3 steps
+		self.assertAlmostEqual(mpc.log[-1]['objective'],mpc.log[0]['objective'],places=2)
+		
+	def test_step_pyomo(self):
+		problem = jsonopt.Problem(read_example('ocp1'))
+		mpc = jsonopt.mpc.MPC(problem,timeindexed)
+		mpc.solve()
+		self.assertTrue(problem._warm_start)
+		
+		# the multipliers do not match the shifted values
+		mpc.shift({'p':[0.20], 'Ta':[problem.get_value('Ta')[0]]})
+		self.assertFalse(problem._warm_start)
+		mpc.solve()
+		
+		for k in range(2):
+			mpc.step({'p':[0.20], 'Ta':[problem.get_value('Ta')[0]]})
+			
+		self.assertEqual([entry['step'] for entry in mpc.log],[0,1,2,3])
+		self.assertEqual([entry['status'] for entry in mpc.log],['optimal']*4)
+		self.assertAlmostEqual(mpc.log[-1]['objective'],mpc.log[0]['objective'],places=2)
+		
+		
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright 2016 Brecht Baeten
+#    This file is part of jsonopt.
+#
+#    jsonopt is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    jsonopt is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with jsonopt.  If not, see <http://www.gnu.org/licenses/>.
+################################################################################
+
+import unittest
+import os
+import math
+import pickle
+import shutil
+import tempfile
+import numpy as np
+
+import jsonopt
+
+
+examples = ['hs071','hs101','ocp1']
+
+def read_example(name):
+	with open('..//examples//json//{}.json'.format(name), 'r') as myfile:
+		return myfile.read()
+
+
+# a minimal evaluator of text .nl files with names, to compare the files
+# written by the nl backend and by pyomo
+_binary = {'o0':lambda a,b: a+b, 'o1':lambda a,b: a-b, 'o2':lambda a,b: a*b, 'o3':lambda a,b: a/b, 'o5':lambda a,b: a**b}
+_unary = {'o16':lambda a: -a, 'o15':abs, 'o39':math.sqrt, 'o41':math.sin, 'o43':math.log, 'o44':math.exp, 'o46':math.cos}
+
+def _expression(lines,x):
+	line = next(lines)
+	if line[0] == 'n':
+		return float(line[1:])
+	if line[0] == 'v':
+		return x[int(line[1:])]
+	if line in _binary:
+		return _binary[line](_expression(lines,x),_expression(lines,x))
+	if line in _unary:
+		return _unary[line](_expression(lines,x))
+	if line == 'o54':
+		return sum(_expression(lines,x) for i in range(int(next(lines))))
+	raise ValueError(line)
+
+def _bounds(line):
+	kind = int(line[0])
+	if kind == 0:
+		return (line[1],line[2])
+	if kind == 1:
+		return (None,line[1])
+	if kind == 2:
+		return (line[1],None)
+	if kind == 4:
+		return (line[1],line[1])
+	return (None,None)
+
+def evaluate_nl(path,values):
+	"""
+	returns a dict with (body,lower,upper) for each constraint name and the objective value
+	"""
+	stub = path[:-3]
+	with open(stub+'.row') as f:
+		rows = f.read().split()
+	with open(stub+'.col') as f:
+		x = [values[name] for name in f.read().split()]
+	with open(path) as f:
+		text = [line.split('#')[0].strip() for line in f.read().splitlines()]
+
+	(n,m) = [int(v) for v in text[1].split()[:2]]
+	lines = iter(text[10:])
+	body = [0.]*m
+	bounds = []
+	objective = 0.
+	for line in lines:
+		if line[0] == 'C':
+			body[int(line[1:])] += _expression(lines,x)
+		elif line[0] == 'O':
+			objective += _expression(lines,x)
+		elif line[0] == 'x':
+			[next(lines) for i in range(int(line[1:]))]
+		elif line == 'r':
+			for i in range(m):
+				bounds.append(_bounds([float(v) for v in next(lines).split()]))
+		elif line == 'b':
+			[next(lines) for i in range(n)]
+		elif line[0] == 'k':
+			[next(lines) for i in range(int(line[1:]))]
+		elif line[0] == 'J':
+			(i,count) = [int(v) for v in line[1:].split()]
+			for k in range(count):
+				(j,coef) = next(lines).split()
+				body[i] += float(coef)*x[int(j)]
+		elif line[0] == 'G':
+			for k in range(int(line[1:].split()[1])):
+				(j,coef) = next(lines).split()
+				objective += float(coef)*x[int(j)]
+
+	constraints = dict((rows[i],(body[i],bounds[i][0],bounds[i][1])) for i in range(m))
+	return (constraints,objective)
+
+
+class TestNlBackend(unittest.TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def write(self,name,backend):
+		problem = jsonopt.Problem(read_example(name),backend=backend)
+		path = os.path.join(self.directory,'{}_{}.nl'.format(name,backend))
+		if backend == 'nl':
+			jsonopt.nl.write(problem.model,path,names=True)
+		else:
+			problem.model.write(path,io_options={'symbolic_solver_labels':True})
+		return path
+
+	def test_create_problem(self):
+		problem = jsonopt.Problem(read_example('ocp1'),backend='nl')
+		self.assertEqual(problem.backend,'nl')
+		self.assertIsInstance(problem.model,jsonopt.nl.ConcreteModel)
+		self.assertEqual(problem.get_value('T').shape,(25,))
+		self.assertEqual(problem.get_value('p')[3],0.20)
+
+	def test_create_problem_invalid_backend(self):
+		self.assertRaises(ValueError,jsonopt.Problem,backend='gams')
+
+	def test_invalid_domain(self):
+		problem = jsonopt.Problem(backend='nl')
+		self.assertRaises(ValueError,problem.add_variable,'Any x')
+
+	def test_write_header(self):
+		for name in examples:
+			headers = []
+			for backend in ['nl','pyomo']:
+				with open(self.write(name,backend)) as f:
+					headers.append([line.split('#')[0].split() for line in f.read().splitlines()[1:10]])
+			self.assertEqual(headers[0],headers[1],name)
+
+	def test_write_values(self):
+		for name in examples:
+			problem = jsonopt.Problem(read_example(name),backend='nl')
+			values = {}
+			for variable in problem.variables:
+				value = np.random.uniform(0.5,2.,problem.get_value(variable).shape)
+				values.update(('{}[{}]'.format(variable,i),v) for i,v in enumerate(value))
+
+			(constraints,objective) = evaluate_nl(self.write(name,'nl'),values)
+			(pyomoconstraints,pyomoobjective) = evaluate_nl(self.write(name,'pyomo'),values)
+
+			self.assertEqual(sorted(constraints),sorted(pyomoconstraints))
+			for key in constraints:
+				for value,pyomovalue in zip(constraints[key],pyomoconstraints[key]):
+					if pyomovalue is None:
+						self.assertIsNone(value)
+					else:
+						self.assertAlmostEqual(value,pyomovalue,places=6,msg='{} {}'.format(name,key))
+			self.assertAlmostEqual(objective,pyomoobjective,places=6)
+
+	def test_write_parameters(self):
+		problem = jsonopt.Problem(read_example('hs071'),backend='nl')
+		problem.update_parameters({'A':30})
+
+		path = os.path.join(self.directory,'hs071.nl')
+		jsonopt.nl.write(problem.model,path,names=True)
+		(constraints,objective) = evaluate_nl(path,{'x[{}]'.format(i):1. for i in range(4)})
+		self.assertEqual(constraints['unnamed_constraint0'][1],30)
+
+	def test_write_special_functions(self):
+		values = {'x[{}]'.format(j):1. for j in range(3)}
+		results = []
+		for backend in ['nl','pyomo']:
+			problem = jsonopt.Problem(backend=backend)
+			problem.add_variable('Reals x[j] for j in range(3)')
+			problem.add_constraint('x[j] >= 0.5*exp(1.0) + sin(j) for j in range(3)',name='lower')
+			problem.add_constraint('x[0] + cos(1.0)*x[1] <= 10',name='upper')
+			problem.set_objective('sum(x[j]**2 for j in range(3))')
+			
+			path = os.path.join(self.directory,'special_{}.nl'.format(backend))
+			if backend == 'nl':
+				jsonopt.nl.write(problem.model,path,names=True)
+			else:
+				problem.model.write(path,io_options={'symbolic_solver_labels':True})
+			results.append(evaluate_nl(path,values))
+			
+		(constraints,objective) = results[0]
+		(pyomoconstraints,pyomoobjective) = results[1]
+		self.assertEqual(sorted(constraints),sorted(pyomoconstraints))
+		for key in constraints:
+			for value,pyomovalue in zip(constraints[key],pyomoconstraints[key]):
+				if pyomovalue is None:
+					self.assertIsNone(value)
+				else:
+					self.assertAlmostEqual(value,pyomovalue,places=6,msg=key)
+		self.assertAlmostEqual(objective,pyomoobjective,places=6)
+		
+	def test_read(self):
+		problem = jsonopt.Problem(read_example('hs071'),backend='nl')
+		path = os.path.join(self.directory,'hs071.nl')
+		(columns,rows) = jsonopt.nl.write(problem.model,path)
+
+		x = [1.0,4.743,3.82115,1.379408]
+		lines = ['', 'Ipopt 3.12: Optimal Solution Found', '', 'Options', '3', '1', '1', '0', '{}'.format(len(rows)), '{}'.format(len(rows)), '4', '4']
+		lines += ['0.1']*len(rows) + ['{}'.format(v) for v in x] + ['objno 0 0']
+		with open(os.path.join(self.directory,'hs071.sol'),'w') as f:
+			f.write('\n'.join(lines)+'\n')
+
+		results = jsonopt.nl.read(os.path.join(self.directory,'hs071.sol'),columns)
+		self.assertEqual(str(results.solver.termination_condition),'optimal')
+		self.assertEqual(results.solver.status,'ok')
+		self.assertEqual(problem.get_value('x').tolist(),x)
+		self.assertAlmostEqual(problem.get_value('objective'),17.014,places=2)
+
+	def test_pickle(self):
+		problem = jsonopt.Problem(read_example('ocp1'),backend='nl')
+		problem.set_values({'P':np.arange(24.)})
+
+		copy = pickle.loads(pickle.dumps(problem))
+		self.assertEqual(copy.backend,'nl')
+		self.assertEqual(copy.get_value('P').tolist(),list(range(24)))
+
+	def test_solve(self):
+		for name in examples:
+			problem = jsonopt.Problem(read_example(name),backend='nl')
+			results = problem.solve(verbosity=0)
+			self.assertEqual(str(results.solver.termination_condition),'optimal')
+
+			pyomoproblem = jsonopt.Problem(read_example(name))
+			pyomoproblem.solve(verbosity=0)
+			for variable in problem.variables:
+				self.assertLess(np.max(np.abs(problem.get_value(variable)-pyomoproblem.get_value(variable))),1e-4)
+			self.assertAlmostEqual(problem.get_value('objective'),pyomoproblem.get_value('objective'),places=4)
+
+	def test_solve_no_executable(self):
+		problem = jsonopt.Problem(read_example('hs071'),backend='nl')
+		self.assertRaises(RuntimeError,problem.solve,solver='nonexistent_solver',verbosity=0)
+
+
+if __name__ == '__main__':
+	unittest.main()
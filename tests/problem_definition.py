@@ -18,6 +18,16 @@
 ################################################################################
 
 import unittest
+import json
+import pickle
+import io
+import os
+import sys
+import shutil
+import subprocess
+import tempfile
+import numpy as np
+import pyomo.environ as pm
 
 import jsonopt
 
@@ -90,6 +100,12 @@ class TestProblemDefinition(unittest.TestCase):
 		problem.add_parameter('Ta[j] = 5 for j in range(25)')
 		problem.add_constraint('1000*(T[j+1,k]-T[j,k])/10 = 20*(T[j,k]-Ta[j]) for j in range(24) for k in range(2)')
 	
+	def test_add_constraint_array_with_sum(self):
+		problem = jsonopt.Problem()
+		problem.add_variable('Reals x[j] = j for j in range(5)')
+		problem.add_constraint('x[j] <= sum(x[k] for k in range(j)) for j in range(5)',name='c')
+		self.assertEqual([problem.model.c[j].body() for j in range(5)],[j-sum(range(j)) for j in range(5)])
+		
 	def test_add_objective(self):
 		problem = jsonopt.Problem()
 		problem.add_variable('Reals x[j] for j in range(25)')
@@ -108,6 +124,293 @@ class TestProblemDefinition(unittest.TestCase):
 			
 		problem = jsonopt.Problem(jsonstring=jsonstring)
 	
+	def test_add_constraint_shifted(self):
+		with open('..//examples//json//ocp1.json', 'r') as myfile:
+			jsonstring=myfile.read()
+			
+		problem = jsonopt.Problem(jsonstring=jsonstring)
+		problem.add_constraint('T[j-1] + 2*T[j+1] >= -T[j] for j in range(1,24)',name='shifted')
+		m = problem.model
+		
+		m.reference = pm.ConstraintList()
+		m.reference.add(m.C*(m.T[4]-m.T[3])/m.dt == m.Q[3] - m.UA*(m.T[3]-m.Ta[3]))
+		m.reference.add(0 <= m.Q[5])
+		m.reference.add(m.T[0] + 2*m.T[2] >= -m.T[1])
+		
+		self.assertEqual(str(m.unnamed_constraint0[3].expr),str(m.reference[1].expr))
+		self.assertEqual(str(m.unnamed_constraint6[5].expr),str(m.reference[2].expr))
+		self.assertEqual(sorted(m.shifted.keys()),list(range(1,24)))
+		self.assertEqual(str(m.shifted[1].expr),str(m.reference[3].expr))
+		
+	def test_from_json(self):
+		with open('..//examples//json//ocp1.json', 'r') as myfile:
+			jsonstring=myfile.read()
+		
+		cache = jsonopt.caching.LRUCache()
+		problem1 = jsonopt.Problem.from_json(jsonstring,cache=cache)
+		problem2 = jsonopt.Problem.from_json(jsonstring.replace('"p[j] = 0.20 for j in range(24)"','"p[j] = 0.30 for j in range(24)"'),cache=cache)
+		
+		self.assertEqual(cache.info()['misses'],1)
+		self.assertEqual(cache.info()['hits'],1)
+		self.assertEqual(len(problem2.model.T),25)
+		self.assertEqual(len(problem2.constraints),8)
+		self.assertEqual(problem1.model.p[3].value,0.20)
+		self.assertEqual(problem2.model.p[3].value,0.30)
+		self.assertEqual(problem2.model.objective.expr(),sum(0.30*problem2.model.P[j].value for j in range(24)))
+	
+	def test_from_file(self):
+		problem = jsonopt.Problem.from_file('..//examples//json//ocp1.json')
+		
+		self.assertEqual(len(problem.model.T),25)
+		self.assertEqual(len(problem.constraints),8)
+		self.assertEqual(problem.get_value('p').tolist(),[0.20]*24)
+		
+	def test_from_file_object(self):
+		# the constraints and objective come before the variables they use
+		jsonstring = u'{"constraints": ["x[j] >= A for j in range(3)"], "objective": "sum(x[j] for j in range(3))", "variables": ["Reals x[j] = 2 for j in range(3)"], "parameters": ["A = 1"]}'
+		
+		problem = jsonopt.Problem.from_file(io.StringIO(jsonstring),chunksize=5)
+		
+		self.assertEqual(len(problem.constraints),1)
+		self.assertEqual(problem.get_value('objective'),6)
+		
+	def test_add_parameter_file(self):
+		datadir = tempfile.mkdtemp()
+		try:
+			np.save(os.path.join(datadir,'prices.npy'),np.arange(12.).reshape((4,3)))
+			np.savez(os.path.join(datadir,'profiles.npz'),Ta=np.ones(4),A=np.array(5.))
+			
+			problem = jsonopt.Problem(datadir=datadir)
+			problem.add_parameter('p[i,j] = @file:prices.npy')
+			problem.add_parameter('q[i,j] = @file:prices.npy for i in range(4) for j in range(3)')
+			problem.add_parameter('Ta[j] = @file:profiles.npz:Ta for j in range(4)')
+			problem.add_parameter('A = @file:profiles.npz:A')
+			
+			self.assertEqual(problem.get_value('p').tolist(),np.arange(12.).reshape((4,3)).tolist())
+			self.assertEqual(problem.get_value('q').tolist(),np.arange(12.).reshape((4,3)).tolist())
+			self.assertEqual(problem.get_value('Ta').tolist(),[1.]*4)
+			self.assertEqual(problem.get_value('A'),5.)
+			self.assertRaises(ValueError,problem.add_parameter,'r[j] = @file:prices.npy for j in range(12)')
+			self.assertRaises(ValueError,problem.add_parameter,'r[j] = @file:profiles.npz for j in range(4)')
+			
+		finally:
+			shutil.rmtree(datadir)
+			
+	def test_from_file_datadir(self):
+		datadir = tempfile.mkdtemp()
+		try:
+			np.save(os.path.join(datadir,'prices.npy'),np.linspace(0.1,0.3,24))
+			with open('..//examples//json//ocp1.json', 'r') as myfile:
+				jsonstring = myfile.read().replace('"p[j] = 0.20 for j in range(24)"','"p[j] = @file:prices.npy for j in range(24)"')
+			with open(os.path.join(datadir,'ocp1.json'),'w') as myfile:
+				myfile.write(jsonstring)
+				
+			problem = jsonopt.Problem.from_file(os.path.join(datadir,'ocp1.json'))
+			copy = pickle.loads(pickle.dumps(problem))
+			
+		finally:
+			shutil.rmtree(datadir)
+			
+		self.assertEqual(problem.get_value('p').tolist(),np.linspace(0.1,0.3,24).tolist())
+		self.assertEqual(copy.get_value('p').tolist(),np.linspace(0.1,0.3,24).tolist())
+		
+	def test_save_solution(self):
+		with open('..//examples//json//ocp1.json', 'r') as myfile:
+			jsonstring=myfile.read()
+		
+		problem = jsonopt.Problem(jsonstring=jsonstring)
+		problem.set_values({'p':np.linspace(0.1,0.3,24)})
+		values = problem.get_values()
+		
+		datadir = tempfile.mkdtemp()
+		try:
+			problem.save_solution(os.path.join(datadir,'solution.npz'))
+			problem.save_solution(os.path.join(datadir,'solution.json'),format='json',chunksize=5)
+			problem.save_solution(os.path.join(datadir,'solution.jsonl'),format='jsonl',chunksize=5)
+			
+			with np.load(os.path.join(datadir,'solution.npz')) as data:
+				npzvalues = {key:data[key] for key in data.files}
+			with open(os.path.join(datadir,'solution.json'),'r') as myfile:
+				jsonvalues = json.load(myfile)
+			with open(os.path.join(datadir,'solution.jsonl'),'r') as myfile:
+				jsonlvalues = {line['name']:line['value'] for line in map(json.loads,myfile)}
+				
+		finally:
+			shutil.rmtree(datadir)
+			
+		self.assertEqual(sorted(npzvalues),sorted(values))
+		self.assertEqual(jsonvalues,json.loads(problem.get_json_values()))
+		self.assertEqual(jsonlvalues,jsonvalues)
+		for key in values:
+			self.assertEqual(np.asarray(values[key]).tolist(),npzvalues[key].tolist())
+			
+	def test_save_solution_format(self):
+		problem = jsonopt.Problem()
+		self.assertRaises(ValueError,problem.save_solution,'solution.csv',format='csv')
+		
+	def test_stats(self):
+		with open('..//examples//json//ocp1.json', 'r') as myfile:
+			jsonstring=myfile.read()
+		
+		records = []
+		stats = jsonopt.stats.Stats(memory=True,hooks=[records.append])
+		problem = jsonopt.Problem(jsonstring=jsonstring,stats=stats)
+		problem.add_constraint('P[j] <= Pmax for j in range(24)',name='Pmax_constraint')
+		problem.get_value('T')
+		
+		self.assertIs(problem.stats,stats)
+		self.assertEqual(problem.stats.phases['variable']['calls'],4)
+		self.assertEqual(problem.stats.phases['parameter']['calls'],11)
+		self.assertEqual(problem.stats.phases['constraint']['calls'],9)
+		self.assertEqual(problem.stats.phases['parse']['calls'],4+11+9+1)
+		self.assertEqual(sorted(problem.stats.components['T']),['construct','extract','parse','variable'])
+		self.assertEqual(sorted(problem.stats.components['Pmax_constraint']),['constraint','construct'])
+		self.assertEqual(len(records),sum(phase['calls'] for phase in problem.stats.phases.values()))
+		self.assertTrue(all(record['time'] >= 0 and record['memory'] >= 0 for record in records))
+		
+	def test_stats_without_resource(self):
+		# the resource module is not available on windows
+		script = 'import sys; sys.modules["resource"] = None; import jsonopt; stats = jsonopt.stats.Stats(memory=True); jsonopt.Problem(stats=stats).add_variable("Reals x[j] for j in range(24)"); print(stats.phases["variable"]["memory"])'
+		env = dict(os.environ,PYTHONPATH=os.path.abspath('..'))
+		output = subprocess.check_output([sys.executable,'-c',script],env=env)
+		
+		self.assertGreaterEqual(int(output),0)
+		
+	def test_stats_disabled(self):
+		problem = jsonopt.Problem()
+		problem.add_variable('Reals x')
+		
+		self.assertIsNone(problem.stats)
+		
+	def test_add_linear_constraints(self):
+		problem = jsonopt.Problem()
+		problem.add_variable('Reals x[j] = j+1 for j in range(3)')
+		problem.add_variable('Reals y = 10')
+		
+		name = problem.add_linear_constraints(['x','y'],{'row':[1,0,0,1], 'col':[3,0,2,1], 'data':[1.,1.,2.,3.]},lower=[1.,None],upper=[np.inf,20.])
+		dense = problem.add_linear_constraints(['x'],np.array([[0.,0.,0.],[1.,1.,1.]]),lower=6.,upper=6.,name='dense')
+		
+		self.assertEqual(name,'unnamed_constraint0')
+		self.assertEqual([problem.model.unnamed_constraint0[i].body() for i in range(2)],[1.+2.*3.,3.*2.+10.])
+		self.assertEqual([problem.model.unnamed_constraint0[i].lower for i in range(2)],[1.,None])
+		self.assertEqual([problem.model.unnamed_constraint0[i].upper for i in range(2)],[None,20.])
+		self.assertEqual(dense,'dense')
+		self.assertEqual(list(problem.model.dense.keys()),[1])
+		self.assertTrue(problem.model.dense[1].equality)
+		self.assertEqual(problem.model.dense[1].body(),1.+2.+3.)
+		self.assertRaises(ValueError,problem.add_linear_constraints,['x'],{'row':[0], 'col':[3], 'data':[1.]})
+		self.assertRaises(ValueError,problem.add_linear_constraints,['x'],{'row':[0], 'col':[0], 'data':[1.], 'shape':[1,4]})
+		self.assertRaises(KeyError,problem.add_linear_constraints,['z'],{'row':[0], 'col':[0], 'data':[1.]})
+		
+	def test_linear_constraints_json(self):
+		datadir = tempfile.mkdtemp()
+		try:
+			# the keys written by scipy.sparse.save_npz
+			np.savez(os.path.join(datadir,'A.npz'),format=np.array(b'csr'),shape=np.array([2,3]),indptr=np.array([0,1,3]),indices=np.array([2,0,1]),data=np.array([2.,1.,1.]))
+			np.save(os.path.join(datadir,'b.npy'),np.array([4.,2.]))
+			
+			jsonstring = json.dumps({
+				'variables': ['Reals x[j] = 1 for j in range(3)'],
+				'parameters': [],
+				'constraints': [],
+				'linear_constraints': [
+					{'name':'capacity', 'variables':['x'], 'format':'csr', 'indptr':[0,2,3], 'indices':[0,2,1], 'data':[1.,2.,3.], 'upper':[4.,5.]},
+					{'name':'fromfile', 'variables':['x'], 'file':'A.npz', 'lower':'@file:b.npy'},
+				],
+				'objective': 'sum(x[j] for j in range(3))',
+			})
+			problem = jsonopt.Problem(jsonstring=jsonstring,datadir=datadir)
+			streamed = jsonopt.Problem.from_file(io.StringIO(jsonstring.decode() if isinstance(jsonstring,bytes) else jsonstring),datadir=datadir)
+			copy = pickle.loads(pickle.dumps(problem))
+			
+		finally:
+			shutil.rmtree(datadir)
+			
+		for p in [problem,streamed,copy]:
+			self.assertEqual(sorted(p.constraints.keys()),['capacity','fromfile'])
+			self.assertEqual([p.model.capacity[i].body() for i in range(2)],[3.,3.])
+			self.assertEqual([p.model.capacity[i].upper for i in range(2)],[4.,5.])
+			self.assertEqual([p.model.fromfile[i].body() for i in range(2)],[2.,2.])
+			self.assertEqual([p.model.fromfile[i].lower for i in range(2)],[4.,2.])
+			
+	def test_add_parameter_array_backed(self):
+		for backend in ['pyomo','nl']:
+			problem = jsonopt.Problem(backend=backend)
+			problem.add_variable('Reals x[j] for j in range(3)')
+			problem.add_parameter('p[i,j] = i+0.1*j for i in range(1000) for j in range(1,4)')
+			problem.add_constraint('x[j] <= p[10,j+1] for j in range(3)')
+			
+			# only the data used in the constraint is created
+			self.assertEqual(sorted(problem.model.p._data.keys()),[(10,1),(10,2),(10,3)])
+			self.assertEqual(problem.model.p[10,3].value,10.3)
+			self.assertEqual(problem.get_value('p').shape,(1000,4))
+			self.assertEqual(problem.get_value('p')[999].tolist(),[0,999.1,999.2,999.3])
+			
+			problem.set_values({'p':np.ones((1000,4))})
+			self.assertEqual(problem.model.p[10,1].value,1)
+			self.assertEqual(problem.get_value('p').sum(),4000)
+			self.assertEqual(sorted(problem.model.p._data.keys()),[(10,1),(10,2),(10,3)])
+			
+			problem.update_parameters(['p[i,j] = 2 for i in range(1000) for j in range(1,4)'])
+			self.assertEqual(problem.model.p[10,2].value,2)
+			self.assertRaises(ValueError,problem.update_parameters,['p[i,j] = 2 for i in range(1000) for j in range(4)'])
+			
+	def test_update_parameters(self):
+		with open('..//examples//json//ocp1.json', 'r') as myfile:
+			jsonstring=myfile.read()
+		
+		problem = jsonopt.Problem(jsonstring=jsonstring)
+		model = problem.model
+		constraint = problem.model.unnamed_constraint0
+		
+		problem.update_parameters('{"parameters": ["p[j] = 0.30 for j in range(24)", "C = 2e6"]}')
+		self.assertEqual(problem.get_value('p').tolist(),[0.30]*24)
+		self.assertEqual(problem.get_value('C'),2e6)
+		
+		problem.update_parameters(['Ta[j] = 0.1*j for j in range(24)'])
+		problem.update_parameters({'p': np.arange(24.), 'UA': 'UA = 300', 'COP0': 4})
+		self.assertEqual(problem.get_value('Ta').tolist(),[0.1*j for j in range(24)])
+		self.assertEqual(problem.get_value('p').tolist(),list(np.arange(24.)))
+		self.assertEqual(problem.get_value('UA'),300)
+		self.assertEqual(problem.get_value('COP0'),4)
+		self.assertEqual(problem.get_value('objective'),sum(j*0. for j in range(24)))
+		
+		self.assertIs(problem.model,model)
+		self.assertIs(problem.model.unnamed_constraint0,constraint)
+		
+	def test_update_parameters_validation(self):
+		with open('..//examples//json//ocp1.json', 'r') as myfile:
+			jsonstring=myfile.read()
+		
+		problem = jsonopt.Problem(jsonstring=jsonstring)
+		
+		self.assertRaises(ValueError,problem.update_parameters,['C = 2e6','p[j] = 0.30 for j in range(25)'])
+		self.assertRaises(ValueError,problem.update_parameters,['p[i,j] = 0.30 for i in range(24) for j in range(2)'])
+		self.assertRaises(ValueError,problem.update_parameters,['C[j] = 1 for j in range(2)'])
+		self.assertRaises(ValueError,problem.update_parameters,{'p':np.ones(25)})
+		self.assertRaises(ValueError,problem.update_parameters,{'C':'UA = 300'})
+		self.assertRaises(KeyError,problem.update_parameters,['T[j] = 0 for j in range(25)'])
+		self.assertRaises(KeyError,problem.update_parameters,{'x':1})
+		
+		# nothing changed
+		self.assertEqual(problem.get_value('C'),1e6)
+		self.assertEqual(problem.get_value('p').tolist(),[0.20]*24)
+		
+	def test_pickle(self):
+		with open('..//examples//json//ocp1.json', 'r') as myfile:
+			jsonstring=myfile.read()
+		
+		problem = jsonopt.Problem(jsonstring=jsonstring)
+		problem.add_constraint('P[j] <= Pmax for j in range(24)',name='Pmax_constraint')
+		problem.set_values({'p':np.arange(24.),'T':21.})
+		
+		copy = pickle.loads(pickle.dumps(problem))
+		
+		self.assertEqual(sorted(copy.constraints.keys()),sorted(problem.constraints.keys()))
+		self.assertEqual(copy.get_value('p').tolist(),list(np.arange(24.)))
+		self.assertEqual(copy.get_value('T').tolist(),[21.]*25)
+		self.assertEqual(copy.get_value('objective'),problem.get_value('objective'))
+		
 	def test_set_value(self):
 		problem = jsonopt.Problem()
 		problem.add_parameter('A = 5')
@@ -130,6 +433,46 @@ class TestProblemDefinition(unittest.TestCase):
 		
 		self.assertEqual(problem.model.p[1,1] ,1)
 		
+	def test_set_values(self):
+		problem = jsonopt.Problem()
+		problem.add_variable('Reals x[j] for j in range(5)')
+		problem.add_parameter('p[i,j] = 0.20 for i in range(3) for j in range(2)')
+		problem.add_parameter('A = 5')
+		problem.set_values({'x':np.arange(5.), 'p':np.ones((3,2)), 'A':1.})
+		
+		self.assertEqual([problem.model.x[j].value for j in range(5)],[0.,1.,2.,3.,4.])
+		self.assertEqual([problem.model.p[i,j].value for i in range(3) for j in range(2)],[1.]*6)
+		self.assertEqual(problem.model.A.value,1.)
+		
+	def test_set_values_scalar(self):
+		problem = jsonopt.Problem()
+		problem.add_parameter('p[j] = 0.20 for j in range(24)')
+		problem.set_values({'p':0.5})
+		
+		self.assertEqual([problem.model.p[j].value for j in range(24)],[0.5]*24)
+		
+	def test_set_values_shape(self):
+		problem = jsonopt.Problem()
+		problem.add_parameter('p[j] = 0.20 for j in range(24)')
+		
+		self.assertRaises(ValueError,problem.set_values,{'p':np.ones(23)})
+		
+	def test_setitem(self):
+		problem = jsonopt.Problem()
+		problem.add_parameter('p[j] = 0.20 for j in range(24)')
+		problem['p'] = np.arange(24.)
+		
+		self.assertEqual(problem.model.p[3].value,3.)
+		
+	def test_setattr_slice(self):
+		problem = jsonopt.Problem()
+		problem.add_parameter('p[j] = 0.20 for j in range(24)')
+		problem.p[...] = np.arange(24.)
+		problem.p[3] = 10.
+		
+		self.assertEqual(problem.model.p[2].value,2.)
+		self.assertEqual(problem.model.p[3].value,10.)
+		
 		
 		
 		
@@ -18,11 +18,52 @@
 ################################################################################
 
 import unittest
+import os
+import time
+import shutil
+import tempfile
 import numpy as np
 
 import jsonopt
 
 
+def _running(pid):
+	"""
+	returns True when a process is running and is not a zombie
+	"""
+	try:
+		os.kill(pid,0)
+	except OSError:
+		return False
+	stat = '/proc/{}/stat'.format(pid)
+	if os.path.exists(stat):
+		with open(stat) as f:
+			return f.read().split()[2] != 'Z'
+	return True
+	
+	
+ipopt_output = """
+This is Ipopt version 3.12.13, running with linear solver mumps.
+
+iter    objective    inf_pr   inf_du lg(mu)  ||d||  lg(rg) alpha_du alpha_pr  ls
+   0  1.6109693e+01 1.12e+01 5.28e-01   0.0 0.00e+00    -  0.00e+00 0.00e+00   0
+   1  1.7410406e+01 8.38e-01 2.25e+01  -0.3 7.97e-01    -  3.19e-01 1.00e+00f  1
+   2r 1.8001613e+01 1.06e-02 4.96e+00  -0.3 5.60e-02   2.0 9.97e-01 1.00e+00h  1
+
+Number of Iterations....: 2
+
+                                   (scaled)                 (unscaled)
+Objective...............:   1.7014017145179164e+01    1.7014017145179164e+01
+Dual infeasibility......:   1.0722198572453474e-13    1.0722198572453474e-13
+Constraint violation....:   1.0000000000000000e-14    2.0000000000000000e-14
+
+Total CPU secs in IPOPT (w/o function evaluations)   =      0.002
+Total CPU secs in NLP function evaluations           =      0.001
+
+EXIT: Optimal Solution Found.
+"""
+
+
 class TestProblemSolution(unittest.TestCase):
 
 	
@@ -57,6 +98,233 @@ class TestProblemSolution(unittest.TestCase):
 		self.assertLess(maxdelta,1e-3)
 		
 		
+	def test_solve_warm_start(self):
+		with open('..//examples//json//ocp1.json', 'r') as myfile:
+			jsonstring=myfile.read()
+			
+		problem = jsonopt.Problem(jsonstring=jsonstring)
+		problem.solve(verbosity=0,warm_start=True)
+		objective = problem.get_value('objective')
+		
+		problem.set_values({'p':np.array([0.20 if j<12 else 0.30 for j in range(24)])})
+		problem.solve(verbosity=0,warm_start=True)
+		
+		self.assertTrue(len(problem.model.ipopt_zL_in) > 0)
+		self.assertGreater(problem.get_value('objective'),objective)
+		
+	def test_solve_batch(self):
+		with open('..//examples//json//ocp1.json', 'r') as myfile:
+			jsonstring=myfile.read()
+			
+		problem = jsonopt.Problem(jsonstring=jsonstring)
+		scenarios = [{'p':0.1*k*np.ones(24)} for k in range(1,5)]
+		
+		results = list(problem.solve_batch(scenarios,workers=2))
+		
+		self.assertEqual(sorted(index for index,values,status in results),range(4))
+		for index,values,status in results:
+			self.assertEqual(status,'optimal')
+			self.assertEqual(values['P'].shape,(24,))
+			
+	def test_solve_result(self):
+		with open('..//examples//json//hs071.json', 'r') as myfile:
+			jsonstring=myfile.read()
+			
+		problem = jsonopt.Problem(jsonstring=jsonstring)
+		result = problem.solve(verbosity=0)
+		
+		self.assertEqual(result.termination_condition,'optimal')
+		self.assertEqual(result.name,'ipopt')
+		self.assertEqual(len(result.log),result.iterations+1)
+		self.assertAlmostEqual(result.objective,17.0140173,places=4)
+		self.assertLess(result.infeasibility,1e-6)
+		self.assertEqual(sorted(result.times),['read','solver','total','write'])
+		
+	def test_solve_result_scipy(self):
+		with open('..//examples//json//ocp1.json', 'r') as myfile:
+			jsonstring=myfile.read()
+			
+		problem = jsonopt.Problem(jsonstring=jsonstring,backend='scipy')
+		result = problem.solve(solver='SLSQP',verbosity=0)
+		
+		self.assertTrue(result.success)
+		self.assertEqual(result.solver.termination_condition,'optimal')
+		self.assertEqual(result.name,'SLSQP')
+		self.assertEqual(len(result.log),result.iterations)
+		self.assertAlmostEqual(result.objective,problem.get_value('objective'))
+		self.assertLess(result.infeasibility,1e-6)
+		self.assertEqual(sorted(result.times),['compile','solver','total'])
+		self.assertNotIn('results',result.to_dict())
+		
+	def test_parse_ipopt_log(self):
+		(log,summary) = jsonopt.stats.parse_ipopt_log(ipopt_output)
+		
+		self.assertEqual([iteration['iter'] for iteration in log],[0,1,2])
+		self.assertEqual([iteration['restoration'] for iteration in log],[False,False,True])
+		self.assertEqual(log[1]['inf_pr'],8.38e-01)
+		self.assertEqual(log[1]['alpha_pr'],1.)
+		self.assertEqual(log[1]['lg_rg'],None)
+		self.assertEqual(log[2]['lg_rg'],2.)
+		self.assertEqual(summary['iterations'],2)
+		self.assertEqual(summary['objective'],17.014017145179164)
+		self.assertEqual(summary['infeasibility'],2e-14)
+		self.assertAlmostEqual(summary['solver_time'],0.003)
+		self.assertEqual(summary['message'],'Optimal Solution Found.')
+		
+	def test_summarize(self):
+		results = [
+			jsonopt.stats.SolveResult('ok','optimal',iterations=10,times={'total':1.}),
+			jsonopt.stats.SolveResult('warning','maxIterations',iterations=30,times={'total':3.}).to_dict(),
+			jsonopt.stats.SolveResult('ok','optimal',times={'total':2.}),
+		]
+		summary = jsonopt.stats.summarize(results)
+		
+		self.assertEqual(summary['solves'],3)
+		self.assertEqual(summary['termination_conditions'],{'optimal':2, 'maxIterations':1})
+		self.assertEqual(summary['iterations'],{'count':2, 'total':40, 'mean':20., 'min':10, 'max':30})
+		self.assertEqual(summary['times']['total']['max'],3.)
+		self.assertEqual(summary['solver_time']['count'],0)
+		
+	def test_solve_batch_results(self):
+		with open('..//examples//json//ocp1.json', 'r') as myfile:
+			jsonstring=myfile.read()
+			
+		problem = jsonopt.Problem(jsonstring=jsonstring,backend='scipy')
+		scenarios = [{'p':0.1*k*np.ones(24)} for k in range(1,5)]
+		
+		results = [values['result'] for index,values,status in problem.solve_batch(scenarios,workers=2,solver='SLSQP')]
+		summary = jsonopt.stats.summarize(results)
+		
+		self.assertEqual(summary['solves'],4)
+		self.assertEqual(summary['termination_conditions'],{'optimal':4})
+		self.assertGreater(summary['iterations']['min'],0)
+		self.assertEqual(summary['times']['solver']['count'],4)
+		
+	def test_solve_async_result(self):
+		with open('..//examples//json//ocp1.json', 'r') as myfile:
+			jsonstring=myfile.read()
+			
+		problem = jsonopt.Problem(jsonstring=jsonstring,backend='scipy')
+		future = problem.solve_async(solver='SLSQP',timeout=60)
+		
+		self.assertEqual(future.result(),'optimal')
+		self.assertEqual(future.solve_result['termination_condition'],'optimal')
+		self.assertGreater(future.solve_result['times']['total'],0)
+	
+	def test_solve_async_unused_variable(self):
+		problem = jsonopt.Problem(backend='scipy')
+		problem.add_variable('Reals x = 1')
+		problem.add_variable('Reals z[j] for j in range(2)')
+		problem.set_objective('(x-2)**2')
+		
+		self.assertEqual(problem.solve_async(solver='SLSQP',timeout=60).result(),'optimal')
+		
+		# the variable without a value is not set to nan
+		self.assertAlmostEqual(problem.get_value('x'),2.,places=4)
+		self.assertEqual([problem.model.z[j].value for j in range(2)],[None,None])
+		self.assertTrue(np.all(np.isnan(problem.get_value('z'))))
+		
+	def test_solve_batch_uninitialized(self):
+		with open('..//examples//json//hs071.json', 'r') as myfile:
+			jsonstring=myfile.read()
+			
+		problem = jsonopt.Problem(jsonstring=jsonstring,backend='scipy')
+		scenarios = [{'A':25},{'A':26},{'A':27}]
+		
+		# a single worker restores the variables without a value before each scenario
+		results = sorted(problem.solve_batch(scenarios,workers=1))
+		
+		for index,values,status in results:
+			self.assertEqual(status,'optimal')
+			self.assertFalse(np.any(np.isnan(values['x'])))
+		self.assertLess(results[0][1]['objective'],results[2][1]['objective'])
+		self.assertTrue(np.all(np.isnan(problem.get_value('x'))))
+		
+	def test_solve_batch_error(self):
+		problem = jsonopt.Problem()
+		problem.add_variable('Reals x')
+		problem.add_parameter('A = 1')
+		problem.set_objective('(x-A)**2')
+		
+		results = list(problem.solve_batch([{'A':1},{'A':2}],workers=2,solver='nonexistent_solver'))
+		
+		self.assertEqual(sorted(index for index,values,status in results),[0,1])
+		for index,values,status in results:
+			self.assertTrue(status.startswith('error'))
+			
+	def test_solve_async(self):
+		with open('..//examples//json//hs071.json', 'r') as myfile:
+			jsonstring=myfile.read()
+			
+		problem = jsonopt.Problem(jsonstring=jsonstring)
+		future = problem.solve_async(timeout=60)
+		
+		self.assertEqual(future.result(),'optimal')
+		self.assertTrue(future.done())
+		self.assertAlmostEqual(problem.get_value('objective'),17.0140173,places=3)
+		
+	def test_solve_async_error(self):
+		problem = jsonopt.Problem()
+		problem.add_variable('Reals x')
+		problem.set_objective('x**2')
+		problem.set_value('x',1.)
+		
+		future = problem.solve_async(solver='nonexistent_solver')
+		
+		self.assertRaises(RuntimeError,future.result,10)
+		self.assertTrue(future.done())
+		self.assertFalse(future.cancelled())
+		self.assertEqual(problem.get_value('x'),1.)
+		
+	def test_solve_async_cancel(self):
+		problem = jsonopt.Problem()
+		problem.add_variable('Reals x')
+		problem.set_objective('x**2')
+		
+		called = []
+		semaphore = jsonopt.parallel._semaphore
+		jsonopt.parallel.set_max_concurrent_solves(1)
+		try:
+			with jsonopt.parallel._semaphore:
+				future = problem.solve_async(solver='nonexistent_solver')
+				future.add_done_callback(called.append)
+				self.assertFalse(future.done())
+				self.assertTrue(future.cancel())
+		finally:
+			jsonopt.parallel._semaphore = semaphore
+			
+		self.assertTrue(future.cancelled())
+		self.assertEqual(called,[future])
+		self.assertRaises(RuntimeError,future.result,10)
+		
+	@unittest.skipUnless(hasattr(os,'killpg'),'process groups are not available')
+	def test_solve_async_timeout_terminates_solver(self):
+		# a solver executable which writes its process id and does not finish
+		directory = tempfile.mkdtemp()
+		try:
+			solver = os.path.join(directory,'sleepsolver')
+			with open(solver,'w') as f:
+				f.write('#!/bin/sh\necho $$ > "{}"\nexec sleep 60\n'.format(os.path.join(directory,'pid')))
+			os.chmod(solver,0o755)
+			
+			problem = jsonopt.Problem(backend='nl')
+			problem.add_variable('Reals x')
+			problem.set_objective('x**2')
+			
+			future = problem.solve_async(solver=solver,timeout=2)
+			self.assertRaises(RuntimeError,future.result,30)
+			
+			with open(os.path.join(directory,'pid')) as f:
+				pid = int(f.read())
+			for i in range(50):
+				if not _running(pid):
+					break
+				time.sleep(0.1)
+			else:
+				self.fail('The solver process was not terminated')
+		finally:
+			shutil.rmtree(directory)
+			
 	def test_get_value_nd(self):
 		problem = jsonopt.Problem()
 		problem.add_parameter('p[i,j] = 0.20 if j==0 else 0.30 for i in range(24) for j in range(5)')
@@ -65,6 +333,33 @@ class TestProblemSolution(unittest.TestCase):
 		self.assertEqual(maxdelta,0)
 
 		
+	def test_get_value_cached(self):
+		problem = jsonopt.Problem()
+		problem.add_parameter('p[j] = 0.20 for j in range(24)')
+		
+		value = problem.get_value('p')
+		value[0] = 1.
+		self.assertEqual(problem.get_value('p')[0],0.20)
+		
+		problem.set_values({'p':np.ones(24)})
+		self.assertEqual(problem.get_value('p')[0],1.)
+		
+	def test_get_value_variable_cached(self):
+		for backend in ['pyomo','nl']:
+			problem = jsonopt.Problem(backend=backend)
+			problem.add_variable('Reals x[i,j] = i+j for i in range(2) for j in range(3)')
+			self.assertEqual(problem.get_value('x').tolist(),[[0,1,2],[1,2,3]])
+			
+			problem.set_values({'x':np.ones((2,3))})
+			self.assertEqual(problem.get_value('x').tolist(),[[1,1,1],[1,1,1]])
+		
+	def test_get_value_uninitialized(self):
+		problem = jsonopt.Problem()
+		problem.add_variable('Reals x[i,j] for i in range(2) for j in range(3)')
+		
+		self.assertEqual(problem.get_value('x').shape,(2,3))
+		self.assertTrue(np.all(np.isnan(problem.get_value('x'))))
+		
 	def test_get_values(self):
 		with open('..//examples//json//hs071.json', 'r') as myfile:
 			jsonstring=myfile.read()
@@ -124,4 +419,4 @@ class TestProblemSolution(unittest.TestCase):
 			
 		
 if __name__ == '__main__':
-	unittest.main()
\ No newline at end of file
+	unittest.main()
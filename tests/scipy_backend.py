@@ -0,0 +1,150 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright 2016 Brecht Baeten
+#    This file is part of jsonopt.
+#
+#    jsonopt is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    jsonopt is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with jsonopt.  If not, see <http://www.gnu.org/licenses/>.
+################################################################################
+
+
+import unittest
+import os
+import pickle
+import shutil
+import tempfile
+import numpy as np
+
+import jsonopt
+
+from nl_backend import evaluate_nl
+
+
+examples = ['hs071','hs101','ocp1']
+
+def read_example(name):
+	with open('..//examples//json//{}.json'.format(name), 'r') as myfile:
+		return myfile.read()
+
+
+class TestScipyBackend(unittest.TestCase):
+
+	def test_create_problem(self):
+		problem = jsonopt.Problem(read_example('ocp1'),backend='scipy')
+		self.assertEqual(problem.backend,'scipy')
+		self.assertIsInstance(problem.model,jsonopt.nl.ConcreteModel)
+
+	def test_derivatives(self):
+		np.random.seed(0)
+		for name in examples:
+			problem = jsonopt.Problem(read_example(name),backend='scipy')
+			callbacks = jsonopt.callbacks.Callbacks(problem.model)
+			x = np.random.uniform(0.5,2.,len(callbacks.x0))
+
+			jacobian = callbacks.jacobian(x).toarray()
+			gradient = callbacks.gradient(x)
+			step = 1e-6
+			for i in range(len(x)):
+				dx = np.zeros(len(x))
+				dx[i] = step
+				difference = (callbacks.constraints(x+dx)-callbacks.constraints(x-dx))/(2*step)
+				self.assertLess(np.max(np.abs(jacobian[:,i]-difference)),1e-5*max(1,np.max(np.abs(jacobian))),name)
+				difference = (callbacks.objective(x+dx)-callbacks.objective(x-dx))/(2*step)
+				self.assertAlmostEqual(gradient[i],difference,delta=1e-5*max(1,np.max(np.abs(gradient))),msg=name)
+
+	def test_structure(self):
+		problem = jsonopt.Problem(read_example('ocp1'),backend='scipy')
+		callbacks = jsonopt.callbacks.Callbacks(problem.model)
+		jacobian = callbacks.jacobian(np.random.uniform(0.5,2.,len(callbacks.x0)))
+		(rows,cols) = callbacks.structure()
+		self.assertEqual(len(rows),jacobian.nnz)
+		self.assertEqual(sorted(zip(rows,cols)),sorted(zip(*jacobian.nonzero())))
+
+	def test_values(self):
+		# the constraints and objective compared to the .nl file of the same model
+		directory = tempfile.mkdtemp()
+		try:
+			for name in examples:
+				problem = jsonopt.Problem(read_example(name),backend='scipy')
+				callbacks = jsonopt.callbacks.Callbacks(problem.model)
+				x = np.random.uniform(0.5,2.,len(callbacks.x0))
+
+				path = os.path.join(directory,'{}.nl'.format(name))
+				jsonopt.nl.write(problem.model,path,names=True)
+				(constraints,objective) = evaluate_nl(path,dict((var.label(),value) for var,value in zip(callbacks.variables,x)))
+
+				self.assertAlmostEqual(callbacks.objective(x),objective,places=6)
+				for label,value,lower,upper in zip(callbacks.labels,callbacks.constraints(x),callbacks.lower,callbacks.upper):
+					(body,nllower,nlupper) = constraints[label]
+					self.assertAlmostEqual(value,body,places=6)
+					self.assertEqual(lower,-np.inf if nllower is None else nllower)
+					self.assertEqual(upper,np.inf if nlupper is None else nlupper)
+		finally:
+			shutil.rmtree(directory)
+
+	def test_bounds(self):
+		problem = jsonopt.Problem(read_example('hs071'),backend='scipy')
+		callbacks = jsonopt.callbacks.Callbacks(problem.model)
+		self.assertEqual(callbacks.lb.tolist(),[1.]*4)
+		self.assertEqual(callbacks.ub.tolist(),[5.]*4)
+		self.assertEqual(callbacks.x0.tolist(),[1.]*4)
+		self.assertEqual(callbacks.lower.tolist(),[25.,40.])
+
+	def test_solve(self):
+		problem = jsonopt.Problem(read_example('hs071'),backend='scipy')
+		results = problem.solve(verbosity=0)
+		self.assertEqual(str(results.solver.termination_condition),'optimal')
+		self.assertLess(np.max(np.abs(problem.get_value('x')-[0.99999999,4.74299964,3.82114998,1.37940829])),1e-4)
+		self.assertAlmostEqual(problem.get_value('objective'),17.0140173,places=4)
+
+	def test_solve_slsqp(self):
+		problem = jsonopt.Problem(read_example('ocp1'),backend='scipy')
+		results = problem.solve(solver='SLSQP',verbosity=0)
+		self.assertEqual(str(results.solver.termination_condition),'optimal')
+
+		callbacks = jsonopt.callbacks.Callbacks(problem.model)
+		values = callbacks.constraints(callbacks.x0)
+		self.assertLess(np.max(np.maximum(callbacks.lower-values,values-callbacks.upper)),1e-6)
+
+	def test_solve_special_functions(self):
+		problem = jsonopt.Problem(backend='scipy')
+		problem.add_variable('Reals x[j] for j in range(3)')
+		problem.add_constraint('x[j] >= 0.5*exp(1.0) + sin(j) for j in range(3)')
+		problem.add_constraint('x[0] + cos(1.0)*x[1] <= 10')
+		problem.set_objective('sum(x[j]**2 for j in range(3))')
+		
+		results = problem.solve(solver='SLSQP',verbosity=0)
+		self.assertEqual(str(results.solver.termination_condition),'optimal')
+		self.assertLess(np.max(np.abs(problem.get_value('x')-(0.5*np.exp(1.0)+np.sin(np.arange(3))))),1e-6)
+		
+	def test_solve_invalid_method(self):
+		problem = jsonopt.Problem(read_example('hs071'),backend='scipy')
+		self.assertRaises(ValueError,problem.solve,solver='ipopt',verbosity=0)
+
+	def test_discrete_variables(self):
+		problem = jsonopt.Problem(backend='scipy')
+		problem.add_variable('Integers x')
+		problem.add_constraint('x >= 1.5')
+		problem.set_objective('x')
+		self.assertRaises(ValueError,jsonopt.callbacks.Callbacks,problem.model)
+
+	def test_pickle(self):
+		problem = jsonopt.Problem(read_example('hs071'),backend='scipy')
+		copy = pickle.loads(pickle.dumps(problem))
+		self.assertEqual(copy.backend,'scipy')
+		copy.solve(verbosity=0)
+		self.assertAlmostEqual(copy.get_value('objective'),17.0140173,places=4)
+
+
+if __name__ == '__main__':
+	unittest.main()
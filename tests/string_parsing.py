@@ -18,6 +18,10 @@
 ################################################################################
 
 import unittest
+import io
+import os
+import sys
+import subprocess
 
 import numpy as np
 
@@ -63,10 +67,87 @@ class TestStringParsing(unittest.TestCase):
 		self.assertEqual(list(value),[2 for j in range(10)])
 		
 		
+	def test_parse_variable_vectorized(self):
+		(name,indexvalue,value)	= jsonopt.parse.variable('Ta[j] = 2.0 + 2.0*sin(2*3.14159*j/24.) for j in range(24)')
+		self.assertEqual(value.shape,(24,))
+		self.assertLess(np.max(np.abs(value-np.array([2.0 + 2.0*np.sin(2*3.14159*j/24.) for j in range(24)]))),1e-12)
+		
+	def test_parse_variable_integer_overflow(self):
+		(name,indexvalue,value)	= jsonopt.parse.variable('p[j] = 2**j for j in range(70)')
+		self.assertEqual(value[-1],2**69)
+		self.assertEqual(value[10],1024)
+		
+	def test_parse_variable_classic_division(self):
+		(name,indexvalue,value)	= jsonopt.parse.variable('p[j] = j/2 for j in range(4)')
+		self.assertEqual(value.tolist(),[0,0,1,1])
+		
+	def test_parse_variable_zero_division(self):
+		self.assertRaises(ZeroDivisionError,jsonopt.parse.variable,'p[j] = 1/j for j in range(3)')
+		
+	def test_parse_variable_not_broadcastable(self):
+		(name,indexvalue,value)	= jsonopt.parse.variable('x[i,j] = 1 if i==0 else 2 for i in range(2) for j in range(3)')
+		self.assertEqual(value.tolist(),[[1,1,1],[2,2,2]])
+		
+	def test_parse_variable_not_rectangular(self):
+		(name,indexvalue,value)	= jsonopt.parse.variable('x[i,j] = i+j for i in range(3) for j in range(i)')
+		self.assertEqual(indexvalue,[(1,0),(2,0),(2,1)])
+		self.assertEqual(value.tolist(),[1,2,3])
+		
+	def test_parse_index_grid(self):
+		grid = jsonopt.parse.index_grid(['for i in range(2)','for j in range(3)'])
+		self.assertEqual(grid[0].tolist(),[[0,0,0],[1,1,1]])
+		self.assertEqual(grid[1].tolist(),[[0,1,2],[0,1,2]])
+		self.assertIsNone(jsonopt.parse.index_grid(['for i in range(2)','for j in range(i)']))
+		self.assertIsNone(jsonopt.parse.index_grid(['for i in range(4) if i > 1']))
+		
 	def test_parse_matching_braces(self):
 		pairs = jsonopt.parse.matching_braces('x[i,j] = sum(a+b for a in range(i) for b in range(j)) for i in range(2) for j in range(3)',['(',')'])
 		self.assertEqual(pairs,[[12, 52], [31, 33], [49, 51], [68, 70], [86, 88]])
 		
+	def test_parse_matching_braces_unmatched(self):
+		pairs = jsonopt.parse.matching_braces('(a+(b) + c)) + (d',['(',')'])
+		self.assertEqual(pairs,[[0, 10], [3, 5]])
+		
+	def test_parse_scan(self):
+		(pairs,forpos,operators) = jsonopt.parse.scan('x[i] >= sum(a for a in range(i) if a<=i) for i in range(2) for j in [k for k in range(3)]')
+		self.assertEqual(pairs['['],[[1, 3], [68, 88]])
+		self.assertEqual(forpos,[41,59])
+		self.assertEqual(operators,[(5,'>=')])
+		
+	def test_parse_equation_inner_operator(self):
+		(lhs,rhs,type) = jsonopt.parse.equation('x[i] = sum(a for a in range(3) if a>=i)')
+		self.assertEqual((lhs,rhs,type),('x[i] ',' sum(a for a in range(3) if a>=i)','E'))
+		
+	def test_parse_statement(self):
+		statement = jsonopt.parse.statement('Reals x[i,j] = 3*j for i in range(2) for j in range(3)',domain=True)
+		self.assertEqual(statement.domain,'Reals')
+		self.assertEqual(statement.target,'x')
+		self.assertEqual(statement.relation,'E')
+		self.assertEqual(statement.indexlist,['i','j'])
+		self.assertEqual(statement.indexvalue(),[(i,j) for i in range(2) for j in range(3)])
+		
+	def test_parse_statement_inequality(self):
+		statement = jsonopt.parse.statement('Tmin <= T[j] for j in range(24) if j >= 2')
+		self.assertEqual(statement.relation,'L')
+		self.assertEqual(statement.target,'Tmin')
+		self.assertEqual(statement.indexvalue(),range(2,24))
+		
+	def test_parse_statement_no_relation(self):
+		statement = jsonopt.parse.statement('sum(p[j]*P[j] for j in range(24))')
+		self.assertEqual(statement.relation,None)
+		self.assertEqual(statement.rhs,None)
+		self.assertEqual(statement.loops,[])
+		
+	def test_parse_statement_conditional(self):
+		(name,indexvalue,value) = jsonopt.parse.variable('x[j] = 1 if j<=3 else 2 for j in range(6)')
+		self.assertEqual(name,'x')
+		self.assertEqual(value.tolist(),[1,1,1,1,2,2])
+		
+	def test_expr_function_ast(self):
+		statement = jsonopt.parse.statement('x[j+1]-x[j] for j in range(3)')
+		function = jsonopt.expr.function(jsonopt.expr.code(statement.expression,statement.indexlist),{'x':[3*j for j in range(10)]})
+		self.assertEqual([function(j) for j in statement.indexvalue()],[3,3,3])
+		
 	def test_parse_indexed_expression(self):
 		(variable,indexlist) = jsonopt.parse.indexed_expression('x [i , j ]')
 		self.assertEqual(variable,'x')
@@ -77,7 +158,60 @@ class TestStringParsing(unittest.TestCase):
 		self.assertEqual(variable,'x')
 		self.assertEqual(indexlist,[])
 		
+	def test_expr_function(self):
+		namespace = {'x':[3*j for j in range(10)]}
+		function = jsonopt.expr.function(jsonopt.expr.code('x[j+1]-x[j] + sum(x[k] for k in range(j))',['j']),namespace)
+		self.assertEqual([function(j) for j in range(3)],[3,3,6])
+		self.assertNotIn('j',namespace)
+		
+		
+		
+	def test_stream_sections(self):
+		jsonstring = u'{"a": ["x\\"]", 1, {"b": [2, "]"]}], "c": 2.5e3, "d": [], "e": "f"}'
+		
+		sections = [(key,list(items)) for key,items in jsonopt.stream.sections(io.StringIO(jsonstring),chunksize=3)]
+		
+		self.assertEqual(sections,[('a',['x"]',1,{'b':[2,']']}]),('c',[2500.]),('d',[]),('e',['f'])])
+		
+	def test_stream_sections_skip(self):
+		jsonstring = u'{"a": [1, 2, 3], "b": [4]}'
+		
+		keys = [key for key,items in jsonopt.stream.sections(io.StringIO(jsonstring),chunksize=2)]
+		
+		self.assertEqual(keys,['a','b'])
+		
+	def test_parameter_declaration(self):
+		statement = jsonopt.parse.statement('p[i,j] = 0.20 if j==0 else 0.30 for i in range(24) for j in range(5)')
+		
+		self.assertEqual(statement.declaration(),'p[i,j] = 0 for i in range(24) for j in range(5)')
+		
+		
+	def test_parse_ranges(self):
+		self.assertEqual(jsonopt.parse.ranges(['for i in range(2)','for j in range(1,25)','for k in xrange(0,10,3)']),[(0,2,1),(1,25,1),(0,10,3)])
+		self.assertEqual(jsonopt.parse.ranges(jsonopt.parse.statement('p[i] = 0 for i in range(2*12)').loops),[(0,24,1)])
+		
+		self.assertIsNone(jsonopt.parse.ranges(['for i in [0,1,2]']))
+		self.assertIsNone(jsonopt.parse.ranges(['for i in range(2)','for j in range(i+1)']))
+		self.assertIsNone(jsonopt.parse.ranges(['for i in range(10) if i%2==0']))
+		self.assertIsNone(jsonopt.parse.ranges(['for i in range(-2,2)']))
+		self.assertIsNone(jsonopt.parse.ranges(['for i in range(0)']))
+		
+	def test_range_index_map(self):
+		indexmap = jsonopt.util.RangeIndexMap([(1,4,2),(0,3,1)])
+		indexmap2 = jsonopt.util.IndexMap([(i,j) for i in range(1,4,2) for j in range(3)])
+		
+		self.assertEqual(indexmap.shape,indexmap2.shape)
+		self.assertEqual(indexmap.keys,indexmap2.keys)
+		self.assertEqual([p.tolist() for p in indexmap.positions],[p.tolist() for p in indexmap2.positions])
+		self.assertEqual(indexmap.array(np.ones((2,3))).tolist(),[[0,0,0],[1,1,1],[0,0,0],[1,1,1]])
+		
+	def test_import_without_pyomo(self):
+		script = 'import sys, jsonopt.parse, jsonopt.util; jsonopt.parse.variable("p[j] = 0.2*j for j in range(24)"); print(len([m for m in sys.modules if m.startswith("pyomo")]))'
+		env = dict(os.environ,PYTHONPATH=os.path.abspath('..'))
+		output = subprocess.check_output([sys.executable,'-c',script],env=env)
+		
+		self.assertEqual(output.strip(),b'0')
 		
 		
 if __name__ == '__main__':
-	unittest.main()
\ No newline at end of file
+	unittest.main()